@@ -0,0 +1,118 @@
+import asyncio
+from collections import deque
+
+try:
+    from .parser import RootReader, BlockReaderArrayBase, DEFAULT_RESOLVER
+except ImportError:
+    from parser import RootReader, BlockReaderArrayBase, DEFAULT_RESOLVER
+
+async def _readlines(filepath, chunksize, executor):
+    # lines of a file (as iterating a file handle), read in chunks by the executor
+    loop = asyncio.get_running_loop()
+    with open(filepath, "r") as fin:
+        rest = ""
+        while (True):
+            chunk = await loop.run_in_executor(executor, fin.read, chunksize)
+            if (not chunk):
+                break
+            lines = (rest + chunk).split("\n")
+            rest = lines.pop()
+            yield [l + "\n" for l in lines]
+        if (rest):
+            yield [rest]
+
+async def _parsefile(root, filepath, observer, progress, cancel, chunksize, yieldevery, executor):
+    root._openfile(filepath)
+    observers, state = root._beginparse(observer, progress, cancel)
+    root._deferred = deque()
+    reader = _readlines(filepath, chunksize, executor)
+    try:
+        linenumber = -1
+        countdown = yieldevery
+        async for lines in reader:
+            for line in lines:
+                if (cancel is not None and cancel.cancelled):
+                    break
+                linenumber += 1
+                root._parseline = linenumber
+                for o in observers:
+                    o(root, linenumber, line)
+                root.read(line, None)
+                while (root._deferred):
+                    include = root._deferred.popleft()
+                    await _parsefile(include, include._originfile, root._observer, root._progress, cancel,
+                                     chunksize, yieldevery, executor)
+                countdown -= 1
+                if (countdown <= 0):
+                    countdown = yieldevery
+                    await asyncio.sleep(0)
+            if (cancel is not None and cancel.cancelled):
+                break
+    finally:
+        root._deferred = None
+        await reader.aclose()
+    root._endparse(state)
+    return root
+
+async def ingestasync(root, executor = None):
+    """
+        Parse the data lines of all (text backed) array blocks of a tree into arrays
+        (see BlockReaderArrayBase.getdata) in an executor, one block at a time
+    """
+    loop = asyncio.get_running_loop()
+    for block in root.flatten():
+        if (isinstance(block, BlockReaderArrayBase) and not block.isarraybacked()):
+            key = block._datakey()
+            if (block._datacache is not None and block._datacache[0] == key):
+                continue
+            data = await loop.run_in_executor(executor, block.parsedata, list(block._datalines()))
+            if (block._datakey() == key):
+                # unless the block was modified in the meantime
+                block._datacache = (key, data)
+    return root
+
+async def parseinputfileasync(infile, childreaderresolver = DEFAULT_RESOLVER, observer = None, progress = None,
+                              cancel = None, ingest = False, chunksize = 1 << 18, yieldevery = 512, executor = None):
+    """
+    Parse a file without blocking the event loop: the file (and its includes) is read
+    in chunks by the executor and control is yielded to the loop every yieldevery lines,
+    so several files can be parsed concurrently (see parseinputfile)
+
+    e.g.
+        roots = await asyncio.gather(*(parseinputfileasync(f, ingest = True) for f in files))
+
+    Parameters
+    ----------
+    infile : string
+        .inp file.
+    childreaderresolver : function, optional
+        The default is DEFAULT_RESOLVER.
+    observer, progress, cancel : optional
+        see RootReader.parse.
+    ingest : boolean, optional
+        Parse the data lines of the array blocks (nodes, elements, sets) into arrays in the executor
+        afterwards (see ingestasync), else they are parsed on first use. The default is False.
+    chunksize : int, optional
+        characters read at once. The default is 1 << 18.
+    yieldevery : int, optional
+        lines parsed between yielding to the loop (about 5 ms). The default is 512.
+    executor : concurrent.futures.Executor, optional
+        The default is None, the default executor of the loop.
+
+    Returns
+    -------
+    RootReader
+    """
+    root = await _parsefile(RootReader(childreaderresolver), infile, observer, progress, cancel,
+                            chunksize, yieldevery, executor)
+    if (ingest and not (cancel is not None and cancel.cancelled)):
+        await ingestasync(root, executor)
+    return root
+
+async def savetofileasync(root, filename, incremental = False, writeincludes = False, executor = None):
+    """
+        Save a tree (see RootReader.savetofile) in the executor,
+        the tree must not be altered until saved
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, root.savetofile, filename, incremental, writeincludes)
@@ -4,6 +4,11 @@ import functools
 import time
 import sys, os
 
+try:
+    from .metrics import METRICS
+except ImportError:
+    from metrics import METRICS
+
 def deprecated(*args, **kwargs):
     """"
     Decorator to mark a method or class as deprecated
@@ -53,32 +58,35 @@ class StdoutBlocker(object):
 
 def timeit(*args, **kwargs):
     """
-        Function timer decorator
+        Function timer decorator, records every call (time.perf_counter_ns) in the metrics registry 
+        (metrics.METRICS, when enabled) under log_name (default the name of the function), 
+        prints the duration in unit if verbose. Calls are not timed when neither applies.
     """    
     unit = kwargs.get('unit', 'ms')
-    include_time = kwargs.get('include_time', False)
+    verbose = kwargs.get('verbose', False)
+    scale = {"ns": 1, "us": 1e3, "ms": 1e6, "milli": 1e6, "millisec": 1e6, "milliseconds": 1e6, 
+             "s": 1e9, "sec": 1e9, "seconds": 1e9, "m": 60e9, "min": 60e9, "minutes": 60e9, 
+             "h": 3600e9, "hours": 3600e9}
+    if (unit not in scale):
+        raise ValueError("Unknown time unit")
     
     def __wrapper_timeit(method):
+        name = kwargs.get('log_name', method.__name__)
+        
         @functools.wraps(method)
         def timefunction(*ar, **kw):
-            ts = time.time()
-            result = method(*ar, **kw)
-            te = time.time()
-            mtime = (te-ts)
-        
-            if (unit in ["ms", "milli", "millisec", "milliseconds"]):
-                mtime *= 1000
-            elif (unit in ["s", "sec", "seconds"]):
-                pass
-            elif (unit in ["m", "min", "minutes"]):
-                mtime /= 60
-            elif (unit in ["h", "hours"]):
-                mtime /= (60*60)
-            else:
-                raise ValueError("Unknown time unit")
-            
-            print('@timeit \"{:s}\": {:2.2f}{}'.format(kwargs.get('log_name', method.__name__), mtime, unit))
-            return result 
+            if (not (verbose or METRICS.enabled)):
+                # nothing to record: the plain call
+                return method(*ar, **kw)
+            ts = time.perf_counter_ns()
+            try:
+                return method(*ar, **kw)
+            finally:
+                mtime = time.perf_counter_ns() - ts
+                if (METRICS.enabled):
+                    METRICS.record(name, mtime)
+                if (verbose):
+                    print('@timeit \"{:s}\": {:2.2f}{}'.format(name, mtime / scale[unit], unit))
         
         def silent(*ar, **kw):
             return method(*ar, **kw)
@@ -0,0 +1,167 @@
+import numpy as np
+
+try:
+    from .parser import RootReader, BlockReaderElement, BlockReaderElset, BlockReaderMaterial, SectionChildBase
+    from .tree import iterblocks, namekey, headerproperty
+    from .metrics import METRICS
+except ImportError:
+    from parser import RootReader, BlockReaderElement, BlockReaderElset, BlockReaderMaterial, SectionChildBase
+    from tree import iterblocks, namekey, headerproperty
+    from metrics import METRICS
+
+def _names(values):
+    # unique names in order of appearance, None excluded
+    names = []
+    for v in values:
+        if (v is not None and v not in names):
+            names.append(v)
+    return names
+
+class SectionAssignment(object):
+    """
+        Section, material and orientation of every element below a block (part, or root
+        of a model without parts), as indices per element label:
+            labels          [n] sorted element labels
+            section         [n] index into sections, -1 if not assigned
+            material        [n] index into materials, -1 if not assigned
+            orientation     [n] index into orientations, -1 if not assigned
+        built at once by scattering the labels of the elset of every section.
+
+        e.g.
+            assignment = sectionassignment(part)
+            assignment.materialsof([1, 2, 3])               # array of material names
+            assignment.elementsof(material = "STEEL")       # element labels
+    """
+    __slots__ = ("labels", "section", "material", "orientation", "sections", "materials",
+                 "orientations", "materialblocks", "overlaps")
+
+    @METRICS.timed("assignment.build")
+    def __init__(self, elementblocks, elsetblocks, sectionblocks, materialblocks = ()):
+        """
+        Parameters
+        ----------
+        elementblocks : list of BlockReaderElement
+            ..
+        elsetblocks : list of BlockReaderElset
+            elsets the sections refer to (by name, case insensitive).
+        sectionblocks : list of SectionChildBase
+            sections in order of appearance.
+        materialblocks : list of BlockReaderMaterial, optional
+            materials the sections refer to.
+        """
+        labels = np.concatenate([b.getlabels() for b in elementblocks] or [np.empty(0, dtype = np.int64)])
+        labels.sort(kind = "stable")
+        self.labels = labels
+        self.sections = list(sectionblocks)
+        self.materials = _names(headerproperty(s, "material") for s in self.sections)
+        self.orientations = _names(headerproperty(s, "orientation") for s in self.sections)
+        names = {namekey(m): m for m in self.materials}
+        self.materialblocks = {names[namekey(headerproperty(b, "name"))]: b for b in materialblocks
+                               if namekey(headerproperty(b, "name")) in names}
+
+        elsets = {}
+        for b in elsetblocks:
+            elsets.setdefault(namekey(b.getsetname()), []).append(b)
+        n = len(labels)
+        section = np.full(n, -1, dtype = np.int32)
+        counts = np.zeros(n, dtype = np.int32)
+        for i, s in enumerate(self.sections):
+            name = headerproperty(s, "elset")
+            members = [b.toarray() for b in elsets.get(namekey(name), [])] if name is not None else []
+            if (not members or n == 0):
+                continue
+            index = self.indices(np.concatenate(members))
+            index = index[index >= 0]
+            # an element listed twice in the same elset is assigned once
+            assigned = np.zeros(n, dtype = bool)
+            assigned[index] = True
+            section[assigned] = i
+            counts += assigned
+        self.section = section
+        self.overlaps = labels[counts > 1]      # elements assigned by more than one section (the last one holds)
+
+        sectionmaterial = np.array([self.materials.index(m) if m is not None else -1 for m in
+                                    (headerproperty(s, "material") for s in self.sections)] + [-1], dtype = np.int32)
+        sectionorientation = np.array([self.orientations.index(o) if o is not None else -1 for o in
+                                       (headerproperty(s, "orientation") for s in self.sections)] + [-1], dtype = np.int32)
+        # -1 (not assigned) picks the trailing -1
+        self.material = sectionmaterial[section]
+        self.orientation = sectionorientation[section]
+
+    def indices(self, labels):
+        """
+            Positions of element labels in the arrays, -1 for unknown labels
+        """
+        labels = np.asarray(labels, dtype = np.int64)
+        if (len(self.labels) == 0):
+            return np.full(labels.shape, -1, dtype = np.int64)
+        i = np.minimum(np.searchsorted(self.labels, labels), len(self.labels) - 1)
+        return np.where(self.labels[i] == labels, i, -1)
+
+    def _of(self, labels, indices, names):
+        i = self.indices(labels)
+        i = np.where(i >= 0, indices[np.maximum(i, 0)], -1) if len(indices) else i
+        lookup = np.array(list(names) + [None], dtype = object)
+        return lookup[i]
+
+    def materialsof(self, labels):
+        """
+            Material names of elements (array), None if not assigned or unknown
+        """
+        return self._of(labels, self.material, self.materials)
+
+    def orientationsof(self, labels):
+        """
+            Orientation names of elements (array), None if not assigned or unknown
+        """
+        return self._of(labels, self.orientation, self.orientations)
+
+    def sectionsof(self, labels):
+        """
+            Section blocks of elements (array), None if not assigned or unknown
+        """
+        return self._of(labels, self.section, self.sections)
+
+    def elementsof(self, material = None, orientation = None, section = None):
+        """
+            Labels of the elements with a material and/or orientation name (case insensitive)
+            and/or section block
+        """
+        mask = np.ones(len(self.labels), dtype = bool)
+        for value, names, indices in [(material, self.materials, self.material),
+                                      (orientation, self.orientations, self.orientation)]:
+            if (value is not None):
+                matches = [i for i, name in enumerate(names) if namekey(name) == namekey(value)]
+                mask &= np.isin(indices, matches)
+        if (section is not None):
+            mask &= self.section == next((i for i, s in enumerate(self.sections) if s is section), -2)
+        return self.labels[mask]
+
+def sectionassignment(block):
+    """
+    Get the section assignment of the elements below block (part, or root of a model
+    without parts: the element labels must be unique below block), cached on the root
+    until an Element or Elset block is altered or a section or material header changes
+
+    Returns
+    -------
+    SectionAssignment
+    """
+    elementblocks, elsetblocks, sectionblocks = [], [], []
+    for b in iterblocks(block):
+        if (isinstance(b, BlockReaderElement)):
+            elementblocks += [b]
+        elif (isinstance(b, BlockReaderElset)):
+            elsetblocks += [b]
+        elif (isinstance(b, SectionChildBase)):
+            sectionblocks += [b]
+    root = block.getroot()
+    # materials are usually defined at the model level
+    materialblocks = [b for b in (iterblocks(root) if isinstance(root, RootReader) else iterblocks(block))
+                      if isinstance(b, BlockReaderMaterial)]
+    key = (tuple(b.getdatakey() for b in elementblocks + elsetblocks),
+           tuple(repr(b.getheader()) for b in sectionblocks + materialblocks))
+    build = lambda: SectionAssignment(elementblocks, elsetblocks, sectionblocks, materialblocks)
+    if (isinstance(root, RootReader)):
+        return root.getcached(("sectionassignment", id(block)), key, build)
+    return build()
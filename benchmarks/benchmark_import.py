@@ -0,0 +1,75 @@
+"""
+    Import time benchmark: imports modules of the package in fresh interpreters
+    (python -X importtime) and checks the median against a budget, e.g. in CI.
+
+    Usage:
+        python benchmark_import.py [--modules parser operations] [--repeat 5] [--budget 250] [--json]
+
+    The default budget (BUDGET_MS) is about twice the measured import time of parser and
+    operations (~120 ms each). Use --budget 0 to only report the times.
+"""
+import os, sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PACKAGEDIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BUDGET_MS = 250.    # maximum median import time of each module
+
+def importtime(module, cwd = PACKAGEDIR):
+    """
+        Import a module in a fresh interpreter
+
+        Returns
+        -------
+        dict
+            cumulative import time (ms) of the module and of its heaviest dependencies,
+            and whether pandas was imported.
+    """
+    code = "import sys, {:s}; print('pandas' in sys.modules)".format(module)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd = cwd,
+                         capture_output = True, text = True, check = True)
+    times = {}
+    for line in out.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if (not line.startswith("import time:") or "|" not in line):
+            continue
+        parts = line[len("import time:"):].split("|")
+        name = parts[2].strip()
+        if (parts[1].strip().isdigit() and name.lstrip() == name):
+            # top level imports only
+            times[name] = int(parts[1]) / 1e3
+    return {"total": times.get(module, 0.), "numpy": times.get("numpy", 0.), "pandas": times.get("pandas", 0.),
+            "pandasimported": out.stdout.strip() == "True"}
+
+def run(modules, repeat = 5):
+    for module in modules:
+        samples = [importtime(module) for _ in range(repeat)]
+        yield {"module": module, "repeat": repeat,
+               "median_ms": statistics.median(s["total"] for s in samples),
+               "min_ms": min(s["total"] for s in samples),
+               "numpy_ms": statistics.median(s["numpy"] for s in samples),
+               "pandas_ms": statistics.median(s["pandas"] for s in samples),
+               "pandasimported": any(s["pandasimported"] for s in samples)}
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Time importing the package modules in fresh interpreters")
+    argparser.add_argument("--modules", nargs = "+", default = ["parser", "operations"])
+    argparser.add_argument("--repeat", type = int, default = 5)
+    argparser.add_argument("--budget", type = float, default = BUDGET_MS,
+                           help = "maximum median import time (ms) of each module, 0 for none. The default is {:.0f}".format(BUDGET_MS))
+    argparser.add_argument("--json", action = "store_true", help = "print the results as json")
+    args = argparser.parse_args()
+
+    results = list(run(args.modules, args.repeat))
+    if (args.json):
+        print(json.dumps({"benchmark": "import", "budget_ms": args.budget, "results": results}))
+    else:
+        for r in results:
+            print("{:<16s} {:>9.1f} ms (min {:.1f} ms, numpy {:.1f} ms){:s}".format(r["module"], r["median_ms"], r["min_ms"],
+                  r["numpy_ms"], ", imports pandas" if r["pandasimported"] else ""))
+    over = [r["module"] for r in results if args.budget and r["median_ms"] > args.budget]
+    if (over):
+        print("over budget ({:.0f} ms): {:s}".format(args.budget, ", ".join(over)), file = sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,60 @@
+"""
+    Memory benchmark: the memory held by a parsed tree of many small set blocks
+    (per block overhead of the nodes and their headers).
+
+    Usage:
+        python benchmark_memory.py [--sets 200000] [--json]
+"""
+import os, sys
+import gc
+import json
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from parser import RootReader, DEFAULT_RESOLVER
+
+def setsmodel(nsets):
+    """
+        Lines of a part with nsets small elsets and nsets small nsets
+    """
+    yield "*Heading"
+    yield "*Part, name=PART-1"
+    for i in range(nsets):
+        yield "*Elset, elset=E{:d}".format(i)
+        yield " {:d}, {:d}".format(2 * i + 1, 2 * i + 2)
+        yield "*Nset, nset=N{:d}".format(i)
+        yield " {:d}".format(i + 1)
+    yield "*End Part"
+
+def measure(nsets):
+    lines = list(setsmodel(nsets))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    root = RootReader(DEFAULT_RESOLVER).parse(iter(lines))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    nblocks = sum(1 for _ in root.flatten())
+    return {
+        "benchmark": "memory",
+        "sets": nsets,
+        "blocks": nblocks,
+        "bytes": size,
+        "bytesperblock": size / max(nblocks, 1),
+    }
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Memory held by a parsed tree of small set blocks")
+    argparser.add_argument("--sets", type = int, default = 200000, help = "amount of elsets (and nsets)")
+    argparser.add_argument("--json", action = "store_true", help = "print the result as json")
+    args = argparser.parse_args()
+
+    result = measure(args.sets)
+    if (args.json):
+        print(json.dumps(result))
+    else:
+        print("{:d} blocks: {:.1f} MB, {:.0f} bytes per block".format(
+                result["blocks"], result["bytes"] / 1e6, result["bytesperblock"]))
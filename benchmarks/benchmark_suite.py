@@ -0,0 +1,143 @@
+"""
+    Benchmark suite: times parsing, queries, array/dataframe conversion, deletesets,
+    findreferencingelements and saving on synthetic models (see synthetic.py) of several sizes.
+    Results can be stored as json and compared with an earlier run.
+
+    Usage:
+        python benchmark_suite.py [--sizes 10000 100000] [--repeat 3] [--output results.json] [--compare baseline.json]
+"""
+import os, sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from parser import parseinputfile, BlockReaderNode, BlockReaderElement, BlockReaderElset
+from operations import deletesets, findreferencingelements
+from annotations import StdoutBlocker
+from synthetic import writemodel
+
+def timed(run, setup = None, repeat = 3):
+    """
+        Time run(*setup()) repeat times (setup is not timed)
+
+        Returns
+        -------
+        list of float
+            seconds per run.
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        gc.collect()
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+def _arrays(root, cls):
+    return [b for b in root.flatten() if isinstance(b, cls)]
+
+def _smallelset(root, size = 10):
+    # an elset of a few elements (deletesets scales with the amount of deleted nodes)
+    part = next(root.query("Part"))
+    labels = next(b for b in _arrays(root, BlockReaderElement)).getlabels()[:size]
+    return part.addchild(BlockReaderElset.fromlabels("BENCHMARK", labels))
+
+def benchmarks(model, includemodel, outdir):
+    """
+        (name, run, setup) of every benchmark on a model, the trees are clones of a parsed base
+        which is never altered (clones share its lines, not its parsed arrays)
+    """
+    base = parseinputfile(model)
+    fresh = lambda: (base.clone(),)
+    nodes = next(b for b in _arrays(base.clone(), BlockReaderNode)).getlabels()[:10].tolist()
+    return [
+        ("parse", lambda: parseinputfile(model), None),
+        ("parse includes", lambda: parseinputfile(includemodel), None),
+        ("query flatten", lambda root: list(root.query("**")), fresh),
+        ("query elsets", lambda root: list(root.query("Part > Elset")), fresh),
+        ("query attribute", lambda root: list(root.query("Part > Section > Solid Section[material=MAT-1]")), fresh),
+        ("toarray nodes", lambda root: [b.toarray() for b in _arrays(root, BlockReaderNode)], fresh),
+        ("toarray elements", lambda root: [b.toarray() for b in _arrays(root, BlockReaderElement)], fresh),
+        ("todataframe elements", lambda root: [b.todataframe() for b in _arrays(root, BlockReaderElement)], fresh),
+        ("findreferencingelements", lambda root: findreferencingelements(nodes, root), fresh),
+        ("deletesets", lambda root, elset: deletesets([elset], root), lambda: (lambda r: (r, _smallelset(r)))(base.clone())),
+        ("save", lambda root: root.savetofile(os.path.join(outdir, "save.inp"), incremental = False), fresh),
+        ("save incremental", lambda root: root.savetofile(os.path.join(outdir, "save.inp"), incremental = True), fresh),
+    ]
+
+def run(sizes, repeat = 3, sets = 100, includes = 2, names = None):
+    """
+        Run the suite for models of size nodes and size elements
+
+        Yields
+        ------
+        dict
+            result (seconds) per benchmark and size.
+    """
+    workdir = tempfile.mkdtemp(prefix = "dotinp_benchmark_")
+    try:
+        for size in sizes:
+            model, includemodel = os.path.join(workdir, "model.inp"), os.path.join(workdir, "model_includes.inp")
+            writemodel(model, nodes = size, elements = size, sets = sets)
+            writemodel(includemodel, nodes = size, elements = size, sets = sets, includes = includes)
+            nbytes = os.path.getsize(model)
+            with StdoutBlocker():
+                cases = benchmarks(model, includemodel, workdir)
+            for name, fn, setup in cases:
+                if (names and name not in names):
+                    continue
+                with StdoutBlocker():
+                    times = timed(fn, setup, repeat)
+                yield {"name": name, "size": size, "bytes": nbytes, "repeat": repeat,
+                       "min": min(times), "median": statistics.median(times), "max": max(times)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors = True)
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "processor": platform.processor(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(results, baseline):
+    """
+        Ratio of the median times to those of a baseline run (> 1 is slower)
+    """
+    reference = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+    return [(r["name"], r["size"], r["median"] / reference[(r["name"], r["size"])])
+            for r in results["results"] if reference.get((r["name"], r["size"]), 0) > 0]
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Time parsing and operations on synthetic models")
+    argparser.add_argument("--sizes", type = int, nargs = "+", default = [10000, 100000], help = "amount of nodes (and elements) per model")
+    argparser.add_argument("--repeat", type = int, default = 3)
+    argparser.add_argument("--sets", type = int, default = 100, help = "amount of elsets (and nsets)")
+    argparser.add_argument("--only", nargs = "+", default = None, help = "names of the benchmarks to run")
+    argparser.add_argument("--output", default = None, help = "write the results to a json file")
+    argparser.add_argument("--compare", default = None, help = "json file of an earlier run to compare with")
+    argparser.add_argument("--json", action = "store_true", help = "print the results as json")
+    args = argparser.parse_args()
+
+    results = {"benchmark": "suite", "environment": environment(), "results": []}
+    for r in run(args.sizes, args.repeat, args.sets, names = args.only):
+        results["results"].append(r)
+        if (not args.json):
+            print("{:<24s} {:>9d} {:>10.4f} s (min {:.4f} s)".format(r["name"], r["size"], r["median"], r["min"]))
+    if (args.output):
+        with open(args.output, "w") as fout:
+            json.dump(results, fout, indent = 1)
+    if (args.json):
+        print(json.dumps(results))
+    if (args.compare):
+        with open(args.compare, "r") as fin:
+            for name, size, ratio in compare(results, json.load(fin)):
+                print("{:<24s} {:>9d} {:>7.2f}x{:s}".format(name, size, ratio, "  slower" if ratio > 1.1 else ""))
@@ -0,0 +1,144 @@
+"""
+    Synthetic .inp models for benchmarks: a part with N nodes on a grid, elements of
+    several types, sets (explicit and generated), orientations, sections, materials,
+    includes and steps. The models are reproducible for a given seed.
+
+    Usage:
+        python synthetic.py model.inp [--nodes 100000] [--elements 100000] [--sets 100] ...
+"""
+import os
+import argparse
+import numpy as np
+
+ELEMENTTYPES = [("C3D8", 8), ("C3D4", 4), ("S4R", 4), ("B31", 2)]
+
+def _chunks(labels, size):
+    for i in range(0, len(labels), size):
+        yield ", ".join(map(str, labels[i:i + size]))
+
+def _nodelines(labels, coordinates):
+    for l, (x, y, z) in zip(labels.tolist(), coordinates.tolist()):
+        yield "{:7d}, {!r}, {!r}, {!r}".format(l, x, y, z)
+
+def _elementlines(labels, connectivity):
+    for row in np.column_stack([labels, connectivity]).tolist():
+        yield ", ".join(map(str, row))
+
+def _setlines(name, key, labels, generate):
+    if (generate):
+        yield "*{:s}, {:s}={:s}, generate".format(key.capitalize(), key, name)
+        yield "{:d}, {:d}, 1".format(labels[0], labels[-1])
+    else:
+        yield "*{:s}, {:s}={:s}".format(key.capitalize(), key, name)
+        yield from _chunks(labels, 16)
+
+def writemodel(filepath, nodes = 100000, elements = 100000, sets = 100, sections = 10,
+               orientations = 10, includes = 0, steps = 1, seed = 0):
+    """
+    Write a synthetic model
+
+    Parameters
+    ----------
+    filepath : string
+        output file, include files are written next to it.
+    nodes : int, optional
+        amount of nodes (on a regular grid). The default is 100000.
+    elements : int, optional
+        amount of elements, divided over the element types of ELEMENTTYPES. The default is 100000.
+    sets : int, optional
+        amount of elsets and of nsets (every other set is generated). The default is 100.
+    sections : int, optional
+        amount of solid sections (and materials), assigned to the first elsets. The default is 10.
+    orientations : int, optional
+        amount of orientations, assigned to the sections. The default is 10.
+    includes : int, optional
+        amount of node/element blocks written to include files. The default is 0.
+    steps : int, optional
+        amount of static steps. The default is 1.
+    seed : int, optional
+        seed of the connectivity and set labels. The default is 0.
+
+    Returns
+    -------
+    files : list of string
+        the model file and its include files.
+    """
+    rng = np.random.default_rng(seed)
+    directory, name = os.path.split(os.path.abspath(filepath))
+    stem = os.path.splitext(name)[0]
+    files = [os.path.abspath(filepath)]
+
+    n = max(int(round(nodes ** (1 / 3))), 1)
+    nodelabels = np.arange(1, nodes + 1, dtype = np.int64)
+    grid = np.arange(nodes)
+    coordinates = np.column_stack([grid % n, (grid // n) % n, grid // (n * n)]) * 0.5
+
+    blocks = [("*Node", _nodelines(nodelabels, coordinates))]
+    counts = np.full(len(ELEMENTTYPES), elements // len(ELEMENTTYPES))
+    counts[:elements % len(ELEMENTTYPES)] += 1
+    start = 1
+    for (eltype, nnodes), count in zip(ELEMENTTYPES, counts.tolist()):
+        if (count == 0):
+            continue
+        labels = np.arange(start, start + count, dtype = np.int64)
+        connectivity = rng.integers(1, nodes + 1, size = (count, nnodes))
+        blocks += [("*Element, type={:s}".format(eltype), _elementlines(labels, connectivity))]
+        start += count
+
+    with open(filepath, "w") as fout:
+        fout.write("*Heading\n** Job name: {:s} Model name: synthetic\n".format(stem))
+        fout.write("*Part, name=PART-1\n")
+        for i, (header, lines) in enumerate(blocks):
+            if (i < includes):
+                includefile = "{:s}_{:d}.inp".format(stem, i + 1)
+                with open(os.path.join(directory, includefile), "w") as finc:
+                    finc.write(header + "\n")
+                    finc.writelines(l + "\n" for l in lines)
+                fout.write("*Include, input={:s}\n".format(includefile))
+                files += [os.path.join(directory, includefile)]
+            else:
+                fout.write(header + "\n")
+                fout.writelines(l + "\n" for l in lines)
+
+        for key, total in [("nset", nodes), ("elset", elements)]:
+            for i in range(sets):
+                size = int(rng.integers(1, max(total // max(sets, 1), 1) + 1))
+                first = int(rng.integers(1, max(total - size, 1) + 1))
+                labels = list(range(first, first + size))
+                if (i % 2 == 0):
+                    labels = np.sort(rng.choice(np.arange(1, total + 1), size = size, replace = False)).tolist()
+                fout.writelines(l + "\n" for l in _setlines("{:s}-{:d}".format(key.upper(), i + 1), key, labels, i % 2 == 1))
+
+        for i in range(orientations):
+            fout.write("*Orientation, name=ORI-{:d}\n".format(i + 1))
+            fout.write("1., 0., 0., 0., 1., 0.\n3, {:.1f}\n".format(360. * i / max(orientations, 1)))
+        for i in range(sections):
+            fout.write("** Section: SECTION-{:d}\n".format(i + 1))
+            orientation = ", orientation=ORI-{:d}".format(i % orientations + 1) if orientations > 0 else ""
+            fout.write("*Solid Section, elset=ELSET-{:d}, material=MAT-{:d}{:s}\n,\n".format(i % max(sets, 1) + 1, i + 1, orientation))
+        fout.write("*End Part\n")
+
+        fout.write("*Assembly, name=Assembly\n*Instance, name=PART-1-1, part=PART-1\n*End Instance\n*End Assembly\n")
+        for i in range(sections):
+            fout.write("*Material, name=MAT-{:d}\n*Elastic\n{:.1f}, 0.3\n".format(i + 1, 1000. * (i + 1)))
+        for i in range(steps):
+            fout.write("*Step, name=Step-{:d}, nlgeom=NO\n*Static\n0.1, 1., 1e-05, 1.\n".format(i + 1))
+            fout.write("*Output, field, variable=PRESELECT\n*End Step\n")
+    return files
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Write a synthetic .inp model")
+    argparser.add_argument("filepath", help = "output file")
+    argparser.add_argument("--nodes", type = int, default = 100000)
+    argparser.add_argument("--elements", type = int, default = 100000)
+    argparser.add_argument("--sets", type = int, default = 100, help = "amount of elsets (and nsets)")
+    argparser.add_argument("--sections", type = int, default = 10)
+    argparser.add_argument("--orientations", type = int, default = 10)
+    argparser.add_argument("--includes", type = int, default = 0, help = "amount of node/element blocks in include files")
+    argparser.add_argument("--steps", type = int, default = 1)
+    argparser.add_argument("--seed", type = int, default = 0)
+    args = argparser.parse_args()
+
+    files = writemodel(args.filepath, args.nodes, args.elements, args.sets, args.sections,
+                       args.orientations, args.includes, args.steps, args.seed)
+    print("\n".join(files))
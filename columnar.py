@@ -0,0 +1,342 @@
+import os
+import re
+import json
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from .parser import BlockReaderNode, BlockReaderElement, BlockReaderNset, BlockReaderElset, \
+                        BlockReaderPart, BlockReaderAssembly, ParameterizedLine, formatheader
+    from .tree import scopeof, scopeblock
+    from .metrics import METRICS
+except ImportError:
+    from parser import BlockReaderNode, BlockReaderElement, BlockReaderNset, BlockReaderElset, \
+                       BlockReaderPart, BlockReaderAssembly, ParameterizedLine, formatheader
+    from tree import scopeof, scopeblock
+    from metrics import METRICS
+
+MANIFEST = "manifest.json"
+FORMAT = "dotinp-columnar"
+VERSION = 2     # 2: set properties, containers and instances
+
+def _filename(*parts):
+    return "_".join(re.sub(r"[^\w.-]", "_", str(p)) for p in parts if p != "") + ".npy"
+
+def _writearrays(path, arrays, dtype, ncols = None):
+    """
+    Write the concatenation of arrays to a .npy file,
+    filled block by block into a memory map instead of concatenated in memory
+
+    Returns
+    -------
+    int
+        amount of rows.
+    """
+    n = sum(len(a) for a in arrays)
+    shape = (n,) if ncols is None else (n, ncols)
+    if (n == 0):
+        np.save(path, np.empty(shape, dtype = dtype))
+        return 0
+    out = np.lib.format.open_memmap(path, mode = "w+", dtype = dtype, shape = shape)
+    start = 0
+    for a in arrays:
+        if (ncols is None):
+            out[start:start + len(a)] = a
+        else:
+            # missing columns (e.g. 2D nodes among 3D nodes) are nan
+            out[start:start + len(a), :a.shape[1]] = a
+            if (a.shape[1] < ncols):
+                out[start:start + len(a), a.shape[1]:] = np.nan
+        start += len(a)
+    out.flush()
+    del out
+    return n
+
+def _setproperties(block):
+    """
+        Header properties of a set as written (e.g. instance, internal), except its name 
+        and generate (the labels are exported expanded)
+    """
+    properties = OrderedDict()
+    for segment in block.getheader().getline().split(",")[1:]:
+        key, separator, value = segment.partition("=")
+        key = key.strip()
+        if (key and key.lower() not in (block.setkey, "generate")):
+            properties[key] = value.strip() if separator else None
+    return properties
+
+def _writesets(dirpath, scope, kind, blocks):
+    # all sets of a kind in a single table: labels concatenated, offsets per set (CSR)
+    names = []
+    arrays, properties = OrderedDict(), OrderedDict()
+    for b in blocks:
+        name = b.getsetname()
+        if (name not in arrays):
+            names += [name]
+            arrays[name] = []
+            properties[name] = _setproperties(b)
+        elif (_setproperties(b) != properties[name]):
+            raise ValueError("Set {!s} of {:s} is defined with different properties ({!s} and {!s})".format(
+                                name, scope or "the model", dict(properties[name]), dict(_setproperties(b))))
+        arrays[name] += [b.toarray()]
+    chunks = [a for name in names for a in arrays[name]]
+    offsets = np.zeros(len(names) + 1, dtype = np.int64)
+    offsets[1:] = np.cumsum([sum(len(a) for a in arrays[name]) for name in names])
+    labelsfile, offsetsfile = _filename(scope, kind, "labels"), _filename(scope, kind, "offsets")
+    _writearrays(os.path.join(dirpath, labelsfile), chunks, np.int64)
+    np.save(os.path.join(dirpath, offsetsfile), offsets)
+    return OrderedDict([("names", names), ("properties", [properties[name] for name in names]), 
+                        ("labels", labelsfile), ("offsets", offsetsfile)])
+
+def _instancelines(assembly):
+    # the lines of the *Instance definitions of an assembly
+    lines, ininstance = [], False
+    for line in assembly.content:
+        if (isinstance(line, str)):
+            keyword = line.lstrip(" *").lower() if line.lstrip().startswith("*") else ""
+            ininstance = ininstance or keyword.startswith("instance")
+            if (ininstance):
+                lines += [line]
+                ininstance = not keyword.startswith("end instance")
+    return lines
+
+@METRICS.timed()
+def exportarrays(root, dirpath):
+    """
+    Export the nodes, elements (a table per element type) and sets of a tree
+    to a directory of .npy arrays (memory-mappable, see loadarrays),
+    described by a manifest.json.
+
+    The arrays are grouped per part (labels are only unique within a part),
+    all blocks of the same kind are written to a single table:
+        nodes               labels [n] int64, coordinates [n, 3] float64
+        elements per type   labels [n] int64, connectivity [n, nodes per element] int64
+        nsets/elsets        labels [m] int64 concatenated, offsets [sets + 1] int64
+    The manifest lists the header properties of the sets (e.g. instance=), whether a scope 
+    is a Part or an Assembly and the *Instance definitions of an Assembly.
+
+    e.g.
+        root = parseinputfile("model.inp")
+        exportarrays(root, "model_arrays")
+        arrays = loadarrays("model_arrays")
+        labels, coordinates = arrays["PART-1"]["nodes"]
+
+    Parameters
+    ----------
+    root : INode
+        (root of the) tree to export.
+    dirpath : string
+        output directory, created if it does not exist.
+
+    Raises
+    ------
+    ValueError
+        if the blocks of an element type have varying amounts of nodes, or a set is 
+        defined more than once (in a part) with different properties.
+
+    Returns
+    -------
+    manifest : dict
+        the content of manifest.json.
+    """
+    os.makedirs(dirpath, exist_ok = True)
+    blocks, containers = OrderedDict(), {}
+    for b in root.flatten():
+        if isinstance(b, (BlockReaderNode, BlockReaderElement, BlockReaderNset, BlockReaderElset)) \
+                and b.getheader() is not None:
+            scope = scopeof(b)
+            blocks.setdefault(scope, []).append(b)
+            containers.setdefault(scope, scopeblock(b))
+
+    scopes = OrderedDict()
+    for scope, scopeblocks in blocks.items():
+        entry = OrderedDict()
+        container = containers[scope]
+        if (container is not None):
+            entry["container"] = container.getname()
+            if (isinstance(container, BlockReaderAssembly)):
+                entry["instances"] = _instancelines(container)
+        nodes = [b.toarray() for b in scopeblocks if isinstance(b, BlockReaderNode)]
+        if (nodes):
+            ncols = max(c.shape[1] for _, c in nodes)
+            labelsfile, coordinatesfile = _filename(scope, "nodes", "labels"), _filename(scope, "nodes", "coordinates")
+            count = _writearrays(os.path.join(dirpath, labelsfile), [l for l, _ in nodes], np.int64)
+            _writearrays(os.path.join(dirpath, coordinatesfile), [c for _, c in nodes], np.float64, ncols)
+            entry["nodes"] = OrderedDict([("count", count), ("labels", labelsfile), ("coordinates", coordinatesfile)])
+
+        elements = OrderedDict()
+        for b in scopeblocks:
+            if isinstance(b, BlockReaderElement):
+                elements.setdefault(b.gettype(), []).append(b.toarray())
+        if (elements):
+            entry["elements"] = OrderedDict()
+        for eltype, arrays in elements.items():
+            ncols = {c.shape[1] for _, c in arrays}
+            if (len(ncols) > 1):
+                raise ValueError("Element type {:s} has varying amounts of nodes {:s}".format(eltype, str(sorted(ncols))))
+            labelsfile, connectivityfile = _filename(scope, "elements", eltype, "labels"), _filename(scope, "elements", eltype, "connectivity")
+            count = _writearrays(os.path.join(dirpath, labelsfile), [l for l, _ in arrays], np.int64)
+            _writearrays(os.path.join(dirpath, connectivityfile), [c for _, c in arrays], np.int64, ncols.pop())
+            entry["elements"][eltype] = OrderedDict([("count", count), ("labels", labelsfile), ("connectivity", connectivityfile)])
+
+        for kind, cls in [("nsets", BlockReaderNset), ("elsets", BlockReaderElset)]:
+            sets = [b for b in scopeblocks if isinstance(b, cls)]
+            if (sets):
+                entry[kind] = _writesets(dirpath, scope, kind, sets)
+        scopes[scope] = entry
+
+    manifest = OrderedDict([("format", FORMAT), ("version", VERSION), ("scopes", scopes)])
+    with open(os.path.join(dirpath, MANIFEST), "w") as fout:
+        json.dump(manifest, fout, indent = 1)
+    return manifest
+
+def loadarrays(dirpath, mmap_mode = "r"):
+    """
+    Load arrays exported by exportarrays, memory-mapped by default
+
+    Parameters
+    ----------
+    dirpath : string
+        directory written by exportarrays.
+    mmap_mode : string or None, optional
+        see numpy.load, None reads the arrays into memory. The default is "r".
+
+    Returns
+    -------
+    dict
+        {part name: {"nodes": (labels, coordinates),
+                     "elements": {element type: (labels, connectivity)},
+                     "nsets": {name: labels},
+                     "elsets": {name: labels},
+                     "nsetproperties": {name: {property: value}},
+                     "elsetproperties": {name: {property: value}},
+                     "container": "Part", "Assembly" or None (model level),
+                     "instances": lines of the *Instance definitions of an Assembly}}
+        sets are views of a single (memory-mapped) labels table.
+    """
+    with open(os.path.join(dirpath, MANIFEST), "r") as fin:
+        manifest = json.load(fin, object_pairs_hook = OrderedDict)
+    if (manifest.get("format", None) != FORMAT):
+        raise ValueError("Not a {:s} directory: {:s}".format(FORMAT, dirpath))
+    if (manifest.get("version", 0) > VERSION):
+        raise ValueError("Unsupported {:s} version {:d}".format(FORMAT, manifest["version"]))
+
+    load = lambda filename: np.load(os.path.join(dirpath, filename), mmap_mode = mmap_mode)
+    scopes = OrderedDict()
+    for scope, entry in manifest["scopes"].items():
+        arrays = OrderedDict()
+        if ("nodes" in entry):
+            arrays["nodes"] = (load(entry["nodes"]["labels"]), load(entry["nodes"]["coordinates"]))
+        arrays["elements"] = OrderedDict((eltype, (load(e["labels"]), load(e["connectivity"])))
+                                         for eltype, e in entry.get("elements", {}).items())
+        for kind in ["nsets", "elsets"]:
+            arrays[kind] = OrderedDict()
+            properties = arrays[kind[:-1] + "properties"] = OrderedDict()
+            if (kind in entry):
+                labels, offsets = load(entry[kind]["labels"]), load(entry[kind]["offsets"])
+                for i, name in enumerate(entry[kind]["names"]):
+                    arrays[kind][name] = labels[offsets[i]:offsets[i + 1]]
+                    # version 1 exports have no properties
+                    properties[name] = entry[kind]["properties"][i] if "properties" in entry[kind] else OrderedDict()
+        arrays["container"] = entry.get("container", "Part" if scope != "" else None)
+        arrays["instances"] = entry.get("instances", [])
+        scopes[scope] = arrays
+    return scopes
+
+def splicearrays(part, nodes = None, elements = None, nsets = None, elsets = None, realign = True,
+                 nsetproperties = None, elsetproperties = None):
+    """
+    Add Node, Element, Nset and Elset blocks built from arrays to a part (or any block),
+    the arrays are not formatted until the tree is written
+
+    e.g.
+        part = next(root.query("Part[name=PART-1]"))
+        splicearrays(part, nodes = (labels, coordinates), 
+                     elements = {"C3D8": (elementlabels, connectivity)},
+                     elsets = {"BODY": elementlabels})
+
+    Parameters
+    ----------
+    part : BlockReaderBase
+        block to add the blocks to.
+    nodes : tuple, optional
+        (labels [n], coordinates [n, dimensions]). The default is None.
+    elements : dict, optional
+        {element type: (labels [n], connectivity [n, nodes per element])}. The default is None.
+    nsets : dict, optional
+        {name: labels}. The default is None.
+    elsets : dict, optional
+        {name: labels}. The default is None.
+    realign : boolean, optional
+        realign the line numbers of the tree afterwards. The default is True.
+    nsetproperties : dict, optional
+        {name: {property: value}} additional header properties of the nsets (e.g. instance). 
+        The default is None.
+    elsetproperties : dict, optional
+        {name: {property: value}} additional header properties of the elsets. The default is None.
+
+    Returns
+    -------
+    blocks : list of BlockReaderBase
+        the added blocks.
+    """
+    blocks = []
+    if (nodes is not None):
+        blocks += [BlockReaderNode.fromarrays(*nodes)]
+    for eltype, (labels, connectivity) in (elements or {}).items():
+        blocks += [BlockReaderElement.fromarrays(eltype, labels, connectivity)]
+    for cls, sets, properties in [(BlockReaderNset, nsets, nsetproperties), (BlockReaderElset, elsets, elsetproperties)]:
+        for name, labels in (sets or {}).items():
+            blocks += [cls.fromlabels(name, labels, **(properties or {}).get(name, {}))]
+    for b in blocks:
+        part.addchild(b, realign = False)
+    if (realign and blocks):
+        part.getroot().realignlinenumbers()
+    return blocks
+
+def _newcontainer(container, name, instances = ()):
+    # a Part or an Assembly (with its instances)
+    block = BlockReaderAssembly() if container == "Assembly" else BlockReaderPart()
+    block.header = ParameterizedLine.fromheader(formatheader(block.getname(), OrderedDict([("name", name)])))
+    block.startlinenumber = 0
+    block.content = list(instances) + ["*End " + block.getname()]
+    return block
+
+@METRICS.timed()
+def importarrays(root, source, mmap_mode = "r"):
+    """
+    Add the arrays of an export (see exportarrays) to a tree, to the parts (or assemblies) of 
+    the same name. Parts and assemblies (with their instances) which do not exist yet are created, 
+    arrays of the model level ("") are added to root. Sets keep their header properties.
+
+    Parameters
+    ----------
+    root : RootReader
+        tree to add the blocks to.
+    source : string or dict
+        directory written by exportarrays or the dict returned by loadarrays.
+    mmap_mode : string or None, optional
+        see loadarrays. The default is "r".
+
+    Returns
+    -------
+    blocks : list of BlockReaderBase
+        the added blocks.
+    """
+    arrays = loadarrays(source, mmap_mode = mmap_mode) if isinstance(source, str) else source
+    blocks = []
+    for scope, entry in arrays.items():
+        if (scope == ""):
+            container = root
+        else:
+            container = next((p for p in root.flatten() if isinstance(p, (BlockReaderPart, BlockReaderAssembly)) 
+                              and p.getheader() is not None and p.getheader().properties.get("name", None) == scope), None)
+            if (container is None):
+                container = root.addchild(_newcontainer(entry.get("container", None), scope, entry.get("instances", ())), 
+                                          realign = False)
+        blocks += splicearrays(container, entry.get("nodes", None), entry.get("elements", None), 
+                               entry.get("nsets", None), entry.get("elsets", None), realign = False, 
+                               nsetproperties = entry.get("nsetproperties", None), 
+                               elsetproperties = entry.get("elsetproperties", None))
+    root.realignlinenumbers()
+    return blocks
@@ -0,0 +1,342 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from .parser import INode, RootReader, ParameterizedLine, BlockReaderArrayBase, \
+                        BlockReaderSetBase, BlockReaderNode, BlockReaderElement
+    from .metrics import METRICS
+except ImportError:
+    from parser import INode, RootReader, ParameterizedLine, BlockReaderArrayBase, \
+                       BlockReaderSetBase, BlockReaderNode, BlockReaderElement
+    from metrics import METRICS
+
+ADDED = "added"         # block (and its children) only in the new tree
+REMOVED = "removed"     # block (and its children) only in the old tree
+HEADER = "header"       # header line changed
+CONTENT = "content"     # lines (not the children) of a block changed
+LABELS = "labels"       # labels added, removed or modified in a Node, Element or set block
+DATA = "data"           # arrays of a Node or Element block replaced as a whole
+
+def _keyedchildren(node):
+    """
+        Children of a node with their key: (id, occurrence of the id among the siblings)
+    """
+    counts = {}
+    for c in node._currentchildren():
+        i = c.getid()
+        counts[i] = counts.get(i, -1) + 1
+        yield (i, counts[i]), c
+
+def _ownlines(block):
+    return [l if isinstance(l, str) else repr(l) for l in block.content if not isinstance(l, INode)]
+
+def _istextbacked(block):
+    return not isinstance(block, BlockReaderArrayBase) or not block.isarraybacked()
+
+def blockdigest(block):
+    """
+    Hash of the header and content of a block, excluding its children
+
+    Returns
+    -------
+    bytes
+        digest, equal for equal blocks (array-backed blocks hash their arrays, not their lines).
+    """
+    h = hashlib.blake2b(digest_size = 16)
+    header = block.getheader()
+    h.update(b"" if header is None else repr(header).encode())
+    h.update(b"\0")
+    if (_istextbacked(block)):
+        lines = _ownlines(block)
+        for i in range(0, len(lines), 65536):
+            h.update("\n".join(lines[i:i + 65536]).encode())
+            h.update(b"\n")
+    else:
+        data = block.getdata()
+        for a in (data if isinstance(data, tuple) else (data,)):
+            h.update("{:s}{:s}".format(a.dtype.str, str(a.shape)).encode())
+            h.update(np.ascontiguousarray(a).tobytes())
+    return h.digest()
+
+def _isidentical(a, b):
+    # cheap checks first: a clone shares the lines or arrays of its unaltered blocks
+    if (repr(a.getheader()) != repr(b.getheader())):
+        return False
+    if (_istextbacked(a) and _istextbacked(b)):
+        if (a.content is b.content):
+            return True
+        if (len(a.content) != len(b.content)):
+            return False
+    elif (_istextbacked(a) != _istextbacked(b)):
+        # lines and arrays: compared as arrays
+        return False
+    elif (a.getdata() is b.getdata()):
+        return True
+    return blockdigest(a) == blockdigest(b)
+
+def _isunique(labels):
+    s = np.sort(labels)
+    return not np.any(s[1:] == s[:-1])
+
+def _rowsdiff(la, va, lb, vb):
+    """
+        Added, removed and modified labels of (labels, rows) tables with unique labels (vectorized)
+    """
+    common, ia, ib = np.intersect1d(la, lb, assume_unique = True, return_indices = True)
+    removed = np.setdiff1d(la, common, assume_unique = True)
+    added = ~np.isin(lb, common, assume_unique = True)
+    modified = np.any(va[ia] != vb[ib], axis = 1)
+    return OrderedDict([("added", lb[added]), ("addedrows", vb[added]), ("removed", removed),
+                        ("modified", common[modified]), ("modifiedrows", vb[ib[modified]])])
+
+def _datachange(a, b):
+    """
+        LABELS or DATA change of an array-backed block, None if equal
+    """
+    if (isinstance(a, BlockReaderSetBase)):
+        la, lb = a.tolabelset().toarray(), b.tolabelset().toarray()
+        added, removed = np.setdiff1d(lb, la, assume_unique = True), np.setdiff1d(la, lb, assume_unique = True)
+        if (len(added) == 0 and len(removed) == 0):
+            return None
+        return LABELS, OrderedDict([("added", added), ("removed", removed)])
+    (la, va), (lb, vb) = a.getdata(), b.getdata()
+    if (va.shape[1] != vb.shape[1] or not _isunique(la) or not _isunique(lb)):
+        # e.g. 2D and 3D nodes or duplicate labels: replace the arrays
+        return DATA, OrderedDict([("data", (lb, vb))])
+    rows = _rowsdiff(la, va, lb, vb)
+    if (len(rows["added"]) == 0 and len(rows["removed"]) == 0 and len(rows["modified"]) == 0):
+        return None
+    return LABELS, rows
+
+class Change(object):
+    """
+        A change of a single block, at the path of (id, occurrence) keys from the root
+    """
+    __slots__ = ("kind", "path", "data")
+
+    def __init__(self, kind, path, **data):
+        self.kind = kind
+        self.path = path
+        self.data = OrderedDict(data)
+
+    def getpathname(self):
+        return " > ".join(i if n == 0 else "{:s}#{:d}".format(i, n) for i, n in self.path)
+
+    def __str__(self):
+        if (self.kind == HEADER):
+            detail = "{:s} -> {:s}".format(self.data["old"], self.data["new"])
+        elif (self.kind == LABELS):
+            detail = " ".join("{:s} {:d}".format(k, len(self.data[k]))
+                              for k in ["added", "removed", "modified"] if k in self.data)
+        elif (self.kind == CONTENT):
+            detail = "{:d} lines".format(sum(1 for l in self.data["lines"] if l is not None))
+        elif (self.kind == DATA):
+            detail = "{:d} rows".format(len(self.data["data"][0]))
+        else:
+            detail = ""
+        return "{:<8s} {:s} {:s}".format(self.kind, self.getpathname(), detail).rstrip()
+
+class Patch(object):
+    """
+        Structural changes between two trees (see diff), which can be applied to a tree
+    """
+    __slots__ = ("changes",)
+
+    def __init__(self, changes = None):
+        self.changes = [] if changes is None else changes
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __str__(self):
+        return "\n".join(str(c) for c in self.changes)
+
+    def apply(self, root):
+        """
+        Apply the changes to a tree (in place), e.g. to the old tree of the diff or a clone of it.
+
+        Blocks are found by their path. Changed headers replace the header if it still
+        equals the old header, else only the changed properties are set. Removed rows
+        and labels are dropped, modified rows are replaced and added rows are appended.
+
+        Parameters
+        ----------
+        root : INode
+            tree to alter.
+
+        Raises
+        ------
+        KeyError
+            if the path of a change is not found in the tree.
+        ValueError
+            if modified labels are not found in a block.
+
+        Returns
+        -------
+        root : INode
+        """
+        # find all blocks before altering the tree: removing a block shifts the occurrence of its siblings
+        # (blocks at or below an added path are found when added)
+        nodes = {}
+        added = {c.path for c in self.changes if c.kind == ADDED}
+        for c in self.changes:
+            paths = [c.path] if c.kind != ADDED else [c.path[:-1]] + ([c.path[:-1] + (c.data["after"],)]
+                                                                    if c.data["after"] is not None else [])
+            for path in paths:
+                if (path not in nodes and not any(path[:i] in added for i in range(1, len(path) + 1))):
+                    nodes[path] = findpath(root, path)
+        for c in self.changes:
+            if (c.kind == REMOVED):
+                node = nodes[c.path]
+                parent = node.getparent()
+                content = parent.getcontent()
+                del content[next(i for i, x in enumerate(content) if x is node)]
+                node._setparent(None)
+        for c in self.changes:
+            if (c.kind == ADDED):
+                parent, after = nodes[c.path[:-1]], None
+                if (c.data["after"] is not None):
+                    after = nodes[c.path[:-1] + (c.data["after"],)]
+                block = c.data["block"].clone()
+                nodes[c.path] = parent.addchild(block, after = after, realign = False) if after is not None \
+                                else _insertfirst(parent, block)
+        for c in self.changes:
+            if (c.kind not in (ADDED, REMOVED)):
+                _applychange(nodes[c.path], c)
+        if (isinstance(root, RootReader)):
+            root.realignlinenumbers()
+        return root
+
+def _insertfirst(parent, block):
+    content = parent.getcontent()
+    index = next((i for i, x in enumerate(content) if isinstance(x, INode)), None)
+    if (index is None):
+        # no children: before a closing line such as *End Part
+        return parent.addchild(block, realign = False)
+    content.insert(index, block._setparent(parent))
+    return block
+
+def _applychange(block, change):
+    if (change.kind == HEADER):
+        header = block.getheader()
+        if (header is None or repr(header) == change.data["old"]):
+            block.header = ParameterizedLine.fromheader(change.data["new"])
+        else:
+            old, new = ParameterizedLine.fromheader(change.data["old"]), ParameterizedLine.fromheader(change.data["new"])
+            for k in old.properties:
+                if (k not in new.properties):
+                    header.delproperty(k)
+            for k, v in new.properties.items():
+                if (k not in old.properties or old.properties[k] != v):
+                    header.setproperty(k, v)
+    elif (change.kind == CONTENT):
+        children = list(block.getchildren())
+        content = []
+        for l in change.data["lines"]:
+            if (l is None):
+                if (children):
+                    content.append(children.pop(0))
+            else:
+                content.append(l)
+        block.content = content + children
+        block.markdirty()
+    elif (change.kind == DATA):
+        block.setdata(change.data["data"])
+    elif (isinstance(block, BlockReaderSetBase)):
+        labels = block.toarray()
+        labels = labels[~np.isin(labels, change.data["removed"])]
+        added = change.data["added"]
+        block.setlabels(np.concatenate([labels, added[~np.isin(added, labels)]]))
+    else:
+        labels, rows = block.getdata()
+        keep = ~np.isin(labels, change.data["removed"])
+        labels, rows = labels[keep], rows[keep]
+        modified = change.data["modified"]
+        if (len(modified) > 0):
+            order = np.argsort(labels, kind = "stable")
+            index = order[np.minimum(np.searchsorted(labels, modified, sorter = order), len(labels) - 1)] \
+                    if len(labels) > 0 else np.zeros(len(modified), dtype = np.int64)
+            if (len(labels) == 0 or np.any(labels[index] != modified)):
+                raise ValueError("[{:^20s}] Modified labels not found".format(block.getid()))
+            rows = rows.copy()
+            rows[index] = change.data["modifiedrows"]
+        block.setdata((np.concatenate([labels, change.data["added"]]),
+                       np.concatenate([rows, change.data["addedrows"].astype(rows.dtype, copy = False)])))
+
+def findpath(root, path):
+    """
+    Find the block at a path of (id, occurrence) keys (see Change)
+
+    Raises
+    ------
+    KeyError
+        if the path is not found.
+    """
+    node = root
+    for key in path:
+        node = next((c for k, c in _keyedchildren(node) if k == key), None)
+        if (node is None):
+            raise KeyError("Path not found: {:s}".format(Change(None, path).getpathname()))
+    return node
+
+def _diff(a, b, path, changes):
+    if (a is b):
+        return
+    if (not _isidentical(a, b)):
+        if (repr(a.getheader()) != repr(b.getheader())):
+            changes.append(Change(HEADER, path, old = repr(a.getheader()), new = repr(b.getheader())))
+        arrays = isinstance(a, (BlockReaderNode, BlockReaderElement, BlockReaderSetBase)) and type(a) == type(b) \
+                 and not a._currentchildren() and not b._currentchildren()
+        if (arrays):
+            change = _datachange(a, b)
+            if (change is not None):
+                changes.append(Change(change[0], path, **change[1]))
+        elif (_ownlines(a) != _ownlines(b)):
+            changes.append(Change(CONTENT, path, lines = [None if isinstance(l, INode) else l for l in b.content]))
+
+    achildren = OrderedDict(_keyedchildren(a))
+    after = None
+    for key, child in _keyedchildren(b):
+        if (key in achildren):
+            _diff(achildren.pop(key), child, path + (key,), changes)
+        else:
+            changes.append(Change(ADDED, path + (key,), block = child.clone(), after = after))
+        after = key
+    for key in achildren:
+        changes.append(Change(REMOVED, path + (key,)))
+
+@METRICS.timed()
+def diff(a, b):
+    """
+    Structural diff of two trees, e.g. two versions of a model.
+
+    Blocks are matched by their path of ids (see INode.getid), identical blocks are
+    skipped by comparing hashes of their header and content (or shared content of clones).
+    Reported are added and removed blocks, changed headers, changed lines and for
+    Node, Element, Nset and Elset blocks the added, removed and modified labels
+    (compared as arrays).
+
+    e.g.
+        patch = diff(parseinputfile("v1.inp"), parseinputfile("v2.inp"))
+        print(patch)
+        patch.apply(parseinputfile("v1_variant.inp"))
+
+    Parameters
+    ----------
+    a : INode
+        old tree.
+    b : INode
+        new tree.
+
+    Returns
+    -------
+    Patch
+        the changes from a to b.
+    """
+    changes = []
+    _diff(a, b, (), changes)
+    return Patch(changes)
@@ -0,0 +1,76 @@
+from collections import deque
+
+SILENT = 0      # nothing
+NOTE = 1        # notes: includes, blocks without reader class
+TRACE = 2       # notes and line level events in the trace buffer
+
+class Logger(object):
+    """
+        Logger of the parser, notes are passed to out (e.g. print or logging.info).
+
+        In TRACE mode the parser records events (each line read, headers, terminated
+        and redone blocks) as (event, line number, block id, line) in a ring buffer
+        of the last tracesize events instead of printing them.
+
+        The parser only checks the level per block and the trace mode per parse,
+        not per line.
+
+        e.g.
+            LOGGER.setlevel(TRACE)
+            root = parseinputfile("model.inp")
+            for event in LOGGER.gettrace()[-20:]:
+                print(event)
+    """
+    __slots__ = ("level", "out", "tracing", "trace", "missing")
+
+    def __init__(self, level = NOTE, out = print, tracesize = 65536):
+        self.out = out
+        self.trace = deque(maxlen = tracesize)
+        self.missing = set()    # notified blocks without reader class
+        self.setlevel(level)
+
+    def setlevel(self, level):
+        self.level = level
+        self.tracing = level >= TRACE
+        return self
+
+    def settracesize(self, tracesize):
+        self.trace = deque(self.trace, maxlen = tracesize)
+        return self
+
+    def isenabled(self, level):
+        return self.level >= level
+
+    def note(self, message):
+        if (self.level >= NOTE):
+            self.out(message)
+
+    def record(self, event, linenumber, blockid = None, line = None):
+        """
+            Add an event to the trace buffer
+        """
+        self.trace.append((event, linenumber, blockid, line))
+
+    def gettrace(self):
+        return list(self.trace)
+
+    def reset(self):
+        """
+            Clear the trace buffer and the notified blocks without reader class
+        """
+        self.trace.clear()
+        self.missing = set()
+        return self
+
+LOGGER = Logger()
+
+def setlogger(logger):
+    """
+        Replace the logger of the parser (e.g. by a subclass of Logger)
+    """
+    global LOGGER
+    LOGGER = logger
+    return logger
+
+def getlogger():
+    return LOGGER
@@ -0,0 +1,94 @@
+import tracemalloc
+from collections import OrderedDict
+
+try:
+    from .parser import RootReader, DEFAULT_RESOLVER
+except ImportError:
+    from parser import RootReader, DEFAULT_RESOLVER
+
+def _innermostreader(root):
+    node = root
+    while (node._activechildreader is not None):
+        node = node._activechildreader
+    return node
+
+class MemoryProfile(object):
+    """
+        Observer of a parse (see RootReader.parse) attributing the traced memory (tracemalloc)
+        to reader classes: the growth of the traced memory while a line is read is attributed
+        to the innermost reader after reading it (e.g. a header line to the block it starts).
+
+        The memory is the net growth during the parse (allocated and not freed since),
+        see INode.getmemoryreport for the memory held by a parsed tree.
+
+        e.g.
+            root, profile = profileparse("model.inp")
+            for name, usage in profile.report().items():
+                print(name, usage["bytes"], usage["fraction"])
+    """
+    __slots__ = ("bytes", "lines", "peak", "_last", "_root", "_started")
+
+    def __init__(self):
+        self.bytes = {}     # {reader class: bytes}
+        self.lines = {}     # {reader class: lines}
+        self.peak = 0
+        self._last = 0
+        self._root = None   # root which read the previous line
+        self._started = False
+
+    def start(self):
+        if (not tracemalloc.is_tracing()):
+            tracemalloc.start()
+            self._started = True
+        self._last = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self):
+        self._attribute()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if (self._started):
+            tracemalloc.stop()
+            self._started = False
+        return self
+
+    def _attribute(self):
+        # attribute the previous line
+        current = tracemalloc.get_traced_memory()[0]
+        if (self._root is not None):
+            name = type(_innermostreader(self._root)).__name__
+            self.bytes[name] = self.bytes.get(name, 0) + current - self._last
+            self.lines[name] = self.lines.get(name, 0) + 1
+        self._last = current
+
+    def __call__(self, root, linenumber, line):
+        self._attribute()
+        self._root = root
+
+    def report(self):
+        """
+        Returns
+        -------
+        OrderedDict
+            {reader class: {"lines": amount, "bytes": bytes, "fraction": of the total}}, largest first.
+        """
+        total = max(sum(self.bytes.values()), 1)
+        report = [(name, OrderedDict([("lines", self.lines[name]), ("bytes", b), ("fraction", b / total)]))
+                  for name, b in self.bytes.items()]
+        return OrderedDict(sorted(report, key = lambda item: -item[1]["bytes"]))
+
+def profileparse(filepath, childreaderresolver = DEFAULT_RESOLVER):
+    """
+    Parse a file while attributing the traced memory to the reader classes (see MemoryProfile),
+    the parse is slower while tracing
+
+    Returns
+    -------
+    root : RootReader
+    profile : MemoryProfile
+    """
+    profile = MemoryProfile().start()
+    try:
+        root = RootReader(childreaderresolver).parseinputfile(filepath, observer = profile)
+    finally:
+        profile.stop()
+    return root, profile
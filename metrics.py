@@ -0,0 +1,160 @@
+import random
+import functools
+from time import perf_counter_ns
+from collections import OrderedDict
+import numpy as np
+
+class Timer(object):
+    """
+        Durations (nanoseconds) recorded under a name: count and total of all
+        durations, percentiles from a fixed size random sample (reservoir) of them
+    """
+    __slots__ = ("name", "count", "total", "max", "samples", "_maxsamples", "_random")
+
+    def __init__(self, name, maxsamples = 65536):
+        self.name = name
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.samples = []
+        self._maxsamples = maxsamples
+        self._random = random.Random(0)
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if (ns > self.max):
+            self.max = ns
+        if (len(self.samples) < self._maxsamples):
+            self.samples.append(ns)
+        else:
+            i = self._random.randrange(self.count)
+            if (i < self._maxsamples):
+                self.samples[i] = ns
+
+    def percentile(self, q):
+        """
+            q-th percentile of the durations (nanoseconds), 0 without durations
+        """
+        return float(np.percentile(self.samples, q)) if self.samples else 0.
+
+    def summary(self):
+        return OrderedDict([("count", self.count), ("total_ms", self.total / 1e6),
+                            ("mean_ms", self.total / max(self.count, 1) / 1e6),
+                            ("p50_ms", self.percentile(50) / 1e6), ("p99_ms", self.percentile(99) / 1e6),
+                            ("max_ms", self.max / 1e6)])
+
+class _TimerContext(object):
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if (self.registry.enabled):
+            self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if (self.start is not None):
+            self.registry.record(self.name, perf_counter_ns() - self.start)
+            self.start = None
+
+class Metrics(object):
+    """
+        Registry of timers and counters, e.g. of the parser phases and the operations.
+
+        Disabled by default: the hooks in the parser and operations only check the
+        enabled flag, nothing is timed or counted until enabled.
+
+        e.g.
+            METRICS.enable()
+            root = parseinputfile("model.inp")
+            METRICS.summary()["timers"]["parser.resolve"]["p99_ms"]
+
+            with METRICS.timer("script.export"):
+                exportarrays(root, "out")
+    """
+    __slots__ = ("enabled", "maxsamples", "timers", "counters")
+
+    def __init__(self, enabled = False, maxsamples = 65536):
+        self.enabled = enabled
+        self.maxsamples = maxsamples    # samples per timer kept for the percentiles
+        self.timers = OrderedDict()
+        self.counters = OrderedDict()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+        return self
+
+    def reset(self):
+        self.timers = OrderedDict()
+        self.counters = OrderedDict()
+        return self
+
+    def record(self, name, ns):
+        """
+            Add a duration (nanoseconds, see time.perf_counter_ns) to a timer
+        """
+        timer = self.timers.get(name, None)
+        if (timer is None):
+            timer = self.timers[name] = Timer(name, self.maxsamples)
+        timer.add(ns)
+
+    def count(self, name, n = 1):
+        """
+            Add n to a counter
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timer(self, name):
+        """
+            Context manager timing its body (when enabled)
+        """
+        return _TimerContext(self, name)
+
+    def timed(self, name = None):
+        """
+            Decorator timing every call (when enabled), by default under the module and name of the function
+        """
+        def _decorator(method):
+            key = name if name is not None else "{:s}.{:s}".format(method.__module__, method.__name__)
+            @functools.wraps(method)
+            def _timed(*args, **kwargs):
+                if (not self.enabled):
+                    return method(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record(key, perf_counter_ns() - start)
+            return _timed
+        return _decorator
+
+    def summary(self):
+        """
+        Aggregates of all timers and counters
+
+        Returns
+        -------
+        OrderedDict
+            {"timers": {name: {count, total_ms, mean_ms, p50_ms, p99_ms, max_ms}},
+             "counters": {name: value}}
+        """
+        return OrderedDict([("timers", OrderedDict((k, t.summary()) for k, t in self.timers.items())),
+                            ("counters", OrderedDict(self.counters))])
+
+    def __str__(self):
+        lines = ["{:<32s} {:>9s} {:>11s} {:>9s} {:>9s}".format("timer", "count", "total ms", "p50 ms", "p99 ms")]
+        for k, t in self.summary()["timers"].items():
+            lines += ["{:<32s} {:>9d} {:>11.3f} {:>9.4f} {:>9.4f}".format(k, t["count"], t["total_ms"], t["p50_ms"], t["p99_ms"])]
+        lines += ["{:<32s} {:>9d}".format(k, v) for k, v in self.counters.items()]
+        return "\n".join(lines)
+
+METRICS = Metrics()
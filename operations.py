@@ -1,24 +1,17 @@
-def isnotebook():
-    try:
-        shell = get_ipython().__class__.__name__
-        if shell == 'ZMQInteractiveShell':
-            return True   # Jupyter notebook or qtconsole
-        elif shell == 'TerminalInteractiveShell' or shell == 'SpyderShell':
-            return False  # Terminal running IPython
-        else:
-            return False  # Other type (?)
-    except NameError:
-        return False      # Probably standard Python interpreter
-
-codedir = None
-if (isnotebook()):
-    codedir = os.path.dirname(os.path.abspath(''))
-else:
-    codedir = os.path.dirname(os.path.realpath(__file__))
-
-sys.path.append(codedir)
+import os, sys
+import itertools
+from collections import OrderedDict
 
-from parser import *
+try:
+    from .parser import *
+    from .spatial import GridIndex
+    from .tree import iterblocks, scopeof, namekey, headerproperty, instanceparts, labelscope
+    from .metrics import METRICS
+except ImportError:
+    from parser import *
+    from spatial import GridIndex
+    from tree import iterblocks, scopeof, namekey, headerproperty, instanceparts, labelscope
+    from metrics import METRICS
 
 def unique(iterable):
     unique_list = []
@@ -27,6 +20,7 @@ def unique(iterable):
             unique_list.append(i)
     return unique_list
     
+@METRICS.timed()
 def findreferencingsets(element, root):
     eln = None
     elsets = []
@@ -40,6 +34,7 @@ def findreferencingsets(element, root):
             elsets += [iset]
     return eln, elsets
     
+@METRICS.timed()
 def findreferencingelements(nodes, root, excludeelements = [], log = False):
     """
         Find which elements reference the given nodes
@@ -62,6 +57,7 @@ def findreferencingelements(nodes, root, excludeelements = [], log = False):
             print(("{:>7s}: {:s}").format(str(k), str(v)))
     return references
     
+@METRICS.timed()
 def deletesets(sets, root = None, insetelements = True, insetnodes = True, log = False, dodelete=True):
     """
      Give a list of elsets/nsets and return all elements and nodes that can be safely deleted,
@@ -73,27 +69,25 @@ def deletesets(sets, root = None, insetelements = True, insetnodes = True, log =
     if (root == None):
         root = sets[0].getroot()
             
-    elements = []
+    elsets = []
     for elset in sets:
         if (isinstance(elset, BlockReaderElset)):
-            elements += list(elset.toarray())
+            elsets += [elset]
         elif (not isinstance(elset, BlockReaderNset)):
             raise ValueError("Unknown datatype" + str(elset))
     
     if (log):
         print("\n".join(map(str, sets)))
-    deletableelements = unique(elements)
-    sharedelements = []
-    nelem = len(elements)
+    deletableelements = LabelSet.union(*elsets)
+    sharedelements = LabelSet()
+    nelem = len(deletableelements)
     
     if insetelements:
-        interferingsets = []
         for otherset in root.query("** > Elset"):
             if (otherset not in sets):
-                otherelements = otherset.toarray()
-                cross_section = np.intersect1d(deletableelements, otherelements)
-                sharedelements += [i for i in deletableelements if i in cross_section]
-                deletableelements = [i for i in deletableelements if i not in cross_section] 
+                cross_section = deletableelements & otherset
+                sharedelements |= cross_section
+                deletableelements -= cross_section
                 if (len(cross_section) > 0 and log):
                     print("{:d} elements are shared with other elset {:s}".format(len(cross_section), otherset.header.getproperty("elset")))
         if (log):
@@ -101,35 +95,29 @@ def deletesets(sets, root = None, insetelements = True, insetnodes = True, log =
     elif log:
         print("Deleting elements: {:d} elements".format(nelem))
     
-    nodes = []
+    nodes = [nset for nset in sets if isinstance(nset, BlockReaderNset)]
     for elemnode in root.query("** > Element"):
         elem_df = elemnode.todataframe()
-        xs = [_el for _el in deletableelements if _el in elem_df.index]
-        if (xs):
-            n = elem_df.loc[xs,:]
-            nodes += list(n.values.flatten())
-    
-    for nset in sets:
-        if isinstance(nset, BlockReaderNset):
-            nodes += list(nset.toarray())
-    
-    deletablenodes = unique(nodes)
-    sharednodes = []
-    nnodes = len(nodes)
+        xs = elem_df.index.isin(deletableelements.toarray())
+        if (xs.any()):
+            nodes += [elem_df.loc[xs,:].values.flatten()]
+    
+    deletablenodes = LabelSet.union(*nodes)
+    sharednodes = LabelSet()
+    nnodes = len(deletablenodes)
     if (insetnodes):
         # exclude the node if other elements also reference the node
-        cross_section = []
-        refelems = findreferencingelements(deletablenodes, root, excludeelements=deletableelements)
-        sharednodes += [i for i in deletablenodes if i in refelems.keys()]
-        deletablenodes = [i for i in deletablenodes if i not in refelems.keys()]
+        refelems = findreferencingelements(deletablenodes, root, excludeelements=deletableelements.toarray())
+        sharednodes |= list(refelems.keys())
+        deletablenodes -= sharednodes
         
         # exclude the node if referenced in a Nset
         for nsetnode in root.query("** > Nset"):
             if (nsetnode not in sets):
                 # remove all nodes in nodesets
-                cross_section = np.intersect1d(nsetnode.toarray(), deletablenodes)
-                sharednodes += [i for i in deletablenodes if i in cross_section]
-                deletablenodes = [i for i in deletablenodes if i not in cross_section]
+                cross_section = deletablenodes & nsetnode
+                sharednodes |= cross_section
+                deletablenodes -= cross_section
                 if (len(cross_section) > 0 and log):
                     print("- shares {:d} nodes with nset {:s}".format(len(cross_section), nsetnode.header.getproperty("nset")))
         if (log):
@@ -137,8 +125,10 @@ def deletesets(sets, root = None, insetelements = True, insetnodes = True, log =
     elif log:
         print("Deleting nodes: {:d} nodes".format(nnodes))
     
-    sharednodes = unique(sharednodes)
-    sharedelements = unique(sharedelements)
+    sharednodes = sharednodes.toarray().tolist()
+    sharedelements = sharedelements.toarray().tolist()
+    deletablenodes = deletablenodes.toarray().tolist()
+    deletableelements = deletableelements.toarray().tolist()
     if log:
         if (deletablenodes):
             print("*Nset, nset=DELETABLE_NODES, instance=PART-1-1")
@@ -160,21 +150,11 @@ def deletesets(sets, root = None, insetelements = True, insetnodes = True, log =
     if (dodelete):
         # delete nodes
         node = next(root.query("Part > Node"))
-        newcontent = []
-        for line in node.getcontent():
-            n = infernumber(line.split(",", 1)[0])
-            if (n not in deletablenodes):
-                newcontent += [line]
-        node.content = newcontent
+        node.content = _withoutlabels(node.getcontent(), deletablenodes)
 
         # delete elements
         for elemnode in root.query("** > Element"):
-            newcontent = []
-            for line in elemnode.getcontent():
-                el = infernumber(line.split(",", 1)[0])
-                if (el not in deletableelements):
-                    newcontent += [line]
-            elemnode.content = newcontent
+            elemnode.content = _withoutlabels(elemnode.getcontent(), deletableelements)
         
         # delete elsets
         for iset in sets:
@@ -186,4 +166,637 @@ def deletesets(sets, root = None, insetelements = True, insetnodes = True, log =
                     sec.getparent().getcontent().remove(sec)
             
     else:
-        return deletableelements, deletablenodes
\ No newline at end of file
+        return deletableelements, deletablenodes
+def _withoutlabels(content, deletable):
+    """
+     The content without the data lines of which the first entry (label) is in deletable
+    """
+    labels = infernumbers([line.split(",", 1)[0] if isinstance(line, str) else "" for line in content])
+    if (isinstance(labels, np.ndarray)):
+        keep = ~np.isin(labels, deletable)
+    else:
+        # e.g. comments or children
+        deletable = set(deletable)
+        keep = [isinstance(l, str) or l not in deletable for l in labels]
+    return [line for line, k in zip(content, keep) if k]
+
+def descendants(root, cls):
+    """
+     All blocks of type cls below root (at any depth)
+    """
+    return [b for b in root.flatten() if isinstance(b, cls)]
+
+def labellookup(old, new):
+    """
+     Create a vectorized lookup function mapping old labels to new labels,
+     labels that are not in old are returned unchanged.
+     
+     A dense lookup table is used when the labels are compact enough, 
+     otherwise a binary search on the sorted old labels.
+     
+     Parameters
+     ----------
+     old : array_like of int
+        labels to be replaced (unique).
+     new : array_like of int
+        replacement labels.
+    
+     Returns
+     -------
+     function
+        taking an array of labels and returning the mapped labels (same shape).
+    """
+    old = np.asarray(old, dtype = np.int64).ravel()
+    new = np.asarray(new, dtype = np.int64).ravel()
+    if (len(old) != len(new)):
+        raise ValueError("Old and new labels differ in length")
+    if (len(old) == 0):
+        return lambda arr: np.asarray(arr, dtype = np.int64)
+    
+    lo, hi = int(old.min()), int(old.max())
+    if (lo >= 0 and hi <= 4 * len(old) + 1024):
+        lut = np.arange(hi + 1, dtype = np.int64)
+        lut[old] = new
+        def lookup(arr):
+            arr = np.asarray(arr, dtype = np.int64)
+            out = arr.copy()
+            inrange = (arr >= 0) & (arr <= hi)
+            out[inrange] = lut[arr[inrange]]
+            return out
+    else:
+        order = np.argsort(old, kind = "stable")
+        sold, snew = old[order], new[order]
+        def lookup(arr):
+            arr = np.asarray(arr, dtype = np.int64)
+            idx = np.minimum(np.searchsorted(sold, arr), len(sold) - 1)
+            return np.where(sold[idx] == arr, snew[idx], arr)
+    return lookup
+
+def _partblocks(root):
+    """
+     Node, Element, Nset, Elset and Orientation blocks below root by the part their labels 
+     refer to (as namekey, see tree.labelscope), including the sets of the assembly outside 
+     of root with an instance of these parts.
+    """
+    blocks = list(itertools.chain([root], iterblocks(root)))
+    model = root.getroot()
+    if (model is not root):
+        # the assembly of the model may be outside of root
+        inside = set(map(id, blocks))
+        blocks += [b for b in iterblocks(model) if id(b) not in inside and 
+                   (isinstance(b, BlockReaderAssembly) or headerproperty(b, "instance") is not None)]
+    nodes, elements, nsets, elsets, orientations = OrderedDict(), OrderedDict(), {}, {}, {}
+    sets, assemblies = [], []
+    for block in blocks:
+        if (isinstance(block, BlockReaderNode)):
+            nodes.setdefault(namekey(scopeof(block)), []).append(block)
+        elif (isinstance(block, BlockReaderElement)):
+            elements.setdefault(namekey(scopeof(block)), []).append(block)
+        elif (isinstance(block, (BlockReaderNset, BlockReaderElset))):
+            sets.append(block)
+        elif (isinstance(block, BlockReaderOrientation)):
+            orientations.setdefault(namekey(scopeof(block)), []).append(block)
+        elif (isinstance(block, BlockReaderAssembly)):
+            assemblies.append(block)
+    instances = instanceparts(assemblies)
+    for block in sets:
+        (nsets if isinstance(block, BlockReaderNset) else elsets).setdefault(labelscope(block, instances), []).append(block)
+    return nodes, elements, nsets, elsets, orientations
+
+def _resolvemap(labelmap, blocks, compact, offset):
+    # (old, new) labels of the blocks of a single part, only the changed ones
+    old = np.unique(np.concatenate([b.getlabels() for b in blocks] 
+                                   or [np.empty(0, dtype = np.int64)]))
+    new = old.copy()
+    if (labelmap is not None):
+        if isinstance(labelmap, dict):
+            labelmap = (list(labelmap.keys()), list(labelmap.values()))
+        new = labellookup(*labelmap)(new)
+    if (compact):
+        new = np.argsort(np.argsort(new, kind = "stable"), kind = "stable") + 1
+    new = new + offset
+    if (len(np.unique(new)) != len(new)):
+        raise ValueError("Renumbering results in duplicate labels")
+    changed = old != new
+    return old[changed], new[changed]
+
+@METRICS.timed()
+def renumber(root, nodemap = None, elementmap = None, compact = False, 
+             nodeoffset = 0, elementoffset = 0, log = False):
+    """
+     Renumber node and element labels of all Node, Element, Nset and Elset blocks 
+     (and node based Orientations) below root.
+     
+     New labels are resolved in order: 
+        1. nodemap/elementmap   (explicit)
+        2. compact              (1..N in order of the current labels)
+        3. offset               (added to all labels)
+     
+     Labels are only unique within a part: the labels of every part (and of the model level) 
+     are renumbered separately, e.g. compact renumbers each part to 1..N. Sets with an 
+     instance= property follow the part of the instance, also when they are outside of root.
+     
+     e.g. close the holes left by deletesets:
+         renumber(next(root.query("Part")), compact = True)
+    
+     Parameters
+     ----------
+     root : INode
+        scope, e.g. the root or a single Part.
+     nodemap : dict or tuple of array_like (old, new), optional
+        explicit new node labels (of every part). The default is None.
+     elementmap : dict or tuple of array_like (old, new), optional
+        explicit new element labels (of every part). The default is None.
+     compact : boolean, optional
+        renumber nodes and elements to 1..N. The default is False.
+     nodeoffset : int, optional
+        offset added to all node labels. The default is 0.
+     elementoffset : int, optional
+        offset added to all element labels. The default is 0.
+     log : boolean, optional
+        print the amount of renumbered labels. The default is False.
+    
+     Returns
+     -------
+     tuple : ((numpy.ndarray, numpy.ndarray), (numpy.ndarray, numpy.ndarray))
+        ((old node labels, new node labels), (old element labels, new element labels)), part after part.
+    """
+    nodes, elements, nsets, elsets, orientations = _partblocks(root)
+    nodesmaps, elementsmaps = [], []
+    for scope in list(nodes) + [s for s in elements if s not in nodes]:
+        nodesmap = _resolvemap(nodemap, nodes.get(scope, []), compact, nodeoffset)
+        elementsmap = _resolvemap(elementmap, elements.get(scope, []), compact, elementoffset)
+        nodelookup = labellookup(*nodesmap)
+        elementlookup = labellookup(*elementsmap)
+        
+        if (len(nodesmap[0]) > 0):
+            for node in nodes.get(scope, []):
+                labels, coordinates = node.toarray()
+                newlabels = nodelookup(labels)
+                if (not np.array_equal(labels, newlabels)):
+                    node.setarrays(newlabels, coordinates)
+            for nset in nsets.get(scope, []):
+                labels = nset.toarray()
+                newlabels = nodelookup(labels)
+                if (not np.array_equal(labels, newlabels)):
+                    nset.setlabels(newlabels)
+            for orientation in orientations.get(scope, []):
+                if (orientation.usesnodes() and orientation.getdefinedorientation() is not None):
+                    definition = orientation.getdefinedorientation()
+                    newnodes = nodelookup(np.asarray(definition[:3], dtype = np.int64)).tolist()
+                    if (newnodes != list(definition[:3])):
+                        orientation.setdefinedorientation(tuple(newnodes) + tuple(definition[3:]))
+        
+        for element in elements.get(scope, []):
+            labels, connectivity = element.toarray()
+            newlabels = elementlookup(labels)
+            newconnectivity = nodelookup(connectivity)
+            if (not (np.array_equal(labels, newlabels) and np.array_equal(connectivity, newconnectivity))):
+                element.setarrays(newlabels, newconnectivity)
+        
+        if (len(elementsmap[0]) > 0):
+            for elset in elsets.get(scope, []):
+                labels = elset.toarray()
+                newlabels = elementlookup(labels)
+                if (not np.array_equal(labels, newlabels)):
+                    elset.setlabels(newlabels)
+        nodesmaps.append(nodesmap)
+        elementsmaps.append(elementsmap)
+    
+    empty = (np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64))
+    nodesmap = tuple(np.concatenate(m) for m in zip(empty, *nodesmaps))
+    elementsmap = tuple(np.concatenate(m) for m in zip(empty, *elementsmaps))
+    if (log):
+        print("Renumbered {:d} nodes and {:d} elements".format(len(nodesmap[0]), len(elementsmap[0])))
+    return nodesmap, elementsmap
+
+def _labelsof(blocks):
+    return LabelSet.union(*[b.getlabels() for b in blocks])
+
+def _offsetfor(target, source):
+    """
+     Offset to add to source labels to avoid collisions with target labels, 0 if none collide
+    """
+    if (len(target) == 0 or len(source) == 0):
+        return 0
+    tlabels, slabels = target.toarray(), source.toarray()
+    # range check first, set check only when the ranges overlap
+    if (slabels[-1] < tlabels[0] or slabels[0] > tlabels[-1]):
+        return 0
+    if (target.isdisjoint(source)):
+        return 0
+    return int(tlabels[-1] - slabels[0] + 1)
+
+def _prefixnames(container, names, prefix, kind):
+    """
+     Rename (prefix) the sets/orientations/materials/sections in names (defined below container), 
+     and the references to them 
+    """
+    renamed = {}
+    if (kind in ["nset", "elset"]):
+        blocks = descendants(container, BlockReaderNset if kind == "nset" else BlockReaderElset)
+        key = kind
+    elif (kind == "orientation"):
+        blocks = descendants(container, BlockReaderOrientation)
+        key = "name"
+    elif (kind == "material"):
+        blocks = descendants(container, BlockReaderMaterial)
+        key = "name"
+    elif (kind == "section"):
+        for sec in list(descendants(container, BlockReaderSection)):
+            name = sec.getheader().name[len("Section:"):].strip()
+            if (name in names):
+                renamed[name] = prefix + name
+                sec.header = ParameterizedLine.fromheader("** Section: " + renamed[name])
+        return renamed
+    
+    for block in blocks:
+        name = block.getheader().properties.get(key, None)
+        if (name in names):
+            renamed[name] = prefix + name
+            block.getheader().setproperty(key, renamed[name])
+    
+    if (len(renamed) > 0):
+        # update references
+        for block in descendants(container, SectionChildBase):
+            value = block.getheader().properties.get(kind, None)
+            if (value in renamed):
+                block.getheader().setproperty(kind, renamed[value])
+    return renamed
+
+def _prefixconflicts(target, source, prefix):
+    """
+     Prefix the sets, orientations and sections of source with the same name as in target
+    """
+    renamed = {}
+    for kind, cls, key in [("nset", BlockReaderNset, "nset"), ("elset", BlockReaderElset, "elset"),
+                           ("orientation", BlockReaderOrientation, "name")]:
+        names = set([b.getheader().properties.get(key, None) for b in descendants(target, cls)])
+        renamed.update(_prefixnames(source, names, prefix, kind))
+    sectionnames = set([s.getheader().name[len("Section:"):].strip() for s in descendants(target, BlockReaderSection)])
+    renamed.update(_prefixnames(source, sectionnames, prefix, "section"))
+    return renamed
+
+def _instancedefinitions(content):
+    """
+     The *Instance definitions in the content of an assembly: (first index, last index + 1, header)
+    """
+    definitions, first = [], None
+    for i, line in enumerate(content):
+        if (isinstance(line, str) and line.lstrip().startswith("*") and not line.lstrip().startswith("**")):
+            keyword = line.lstrip(" *").lower()
+            if (keyword.startswith("instance")):
+                first = i
+            elif (keyword.startswith("end instance") and first is not None):
+                definitions.append((first, i + 1, ParameterizedLine.fromheader(content[first])))
+                first = None
+    return definitions
+
+def _renamereference(value, instances, names):
+    """
+     A reference (e.g. PART-1-1.SET-1 or SET-1) after renaming: instances {old instance (as namekey): 
+     (new instance, {old name: new name} of its part)}, names {old name: new name} of the assembly
+    """
+    if (not isinstance(value, str)):
+        return value
+    instance, dot, name = value.partition(".")
+    if (dot and namekey(instance) in instances):
+        newinstance, renamed = instances[namekey(instance)][:2]
+        return newinstance + "." + renamed.get(name, name)
+    return names.get(value, value)
+
+def _renamereferences(block, instances, names):
+    """
+     Rename the references in the header properties and the lines of block and its children
+     (see _renamereference), the names the blocks define themselves are left as they are
+    """
+    for b in itertools.chain([block], iterblocks(block)):
+        header = b.getheader()
+        if (isinstance(header, ParameterizedLine) and b is not block):
+            for key, value in list(header.properties.items()):
+                if (str(key).lower() == "instance"):
+                    new = instances[namekey(value)][0] if namekey(value) in instances else value
+                elif (str(key).lower() not in ("name", "nset", "elset")):
+                    new = _renamereference(value, instances, names)
+                else:
+                    continue
+                if (new != value):
+                    header.setproperty(key, new)
+        if (isinstance(b, BlockReaderArrayBase)):
+            continue
+        content = b.content
+        for i, line in enumerate(content):
+            if (not isinstance(line, str) or line.lstrip().startswith("**")):
+                continue
+            if (line.lstrip().startswith("*")):
+                keyline = ParameterizedLine.fromheader(line)
+                for key, value in list(keyline.properties.items()):
+                    new = _renamereference(value, instances, names) if str(key).lower() not in ("name", "nset", "elset") else value
+                    if (new != value):
+                        keyline.setproperty(key, new)
+                new = keyline.getline()
+            else:
+                tokens = line.split(",")
+                for j, token in enumerate(tokens):
+                    reference = _renamereference(token.strip(), instances, names)
+                    if (reference != token.strip()):
+                        tokens[j] = token.replace(token.strip(), reference)
+                new = ",".join(tokens)
+            if (new != line):
+                b.getcontent()[i] = new
+
+def _mergeassembly(root, other, parts, prefix, log):
+    """
+     Merge the assembly of other into the assembly of root (created if needed), after merging the parts:
+     parts {part of other (as namekey): (part of root, node offset, element offset, renamed, added)}.
+     
+     The instances of added parts are added (renamed if their name is taken), instances of parts merged 
+     into a part of root are replaced by the instance of root. The other blocks and lines of the assembly 
+     follow: sets with an instance= are offset with their part, conflicting names are prefixed and 
+     instance.name references follow the renamed instances and names.
+    """
+    sources = list(other.query("Assembly"))
+    targets = list(root.query("Assembly"))
+    if (sources):
+        source = sources[0].clone()
+    elif (targets and any(added for _, _, _, _, added in parts.values())):
+        # other has no assembly: a default instance per added part
+        source = _newassembly("Assembly", [line for rootpart, _, _, _, added in parts.values() if added 
+                                           for line in ["*Instance, name={!s}-1, part={!s}".format(rootpart, rootpart), "*End Instance"]])
+    else:
+        return []
+    if (targets):
+        target = targets[0]
+    else:
+        target = _newassembly(str(headerproperty(source, "name") or "Assembly"))
+        rootparts = list(root.query("Part"))
+        root.addchild(target, after = rootparts[-1] if rootparts else None, realign = False)
+    
+    rootinstances = [(str(h.getproperty("name")), namekey(h.getproperty("part"))) for _, _, h in _instancedefinitions(target.content)]
+    taken = set(namekey(name) for name, _ in rootinstances)
+    instances, lines, added = {}, [], []
+    content = source.getcontent()
+    for first, last, header in reversed(_instancedefinitions(content)):
+        name, part = str(header.getproperty("name")), header.getproperty("part")
+        definition = content[first:last]
+        del content[first:last]
+        if (namekey(part) not in parts):
+            continue
+        rootpart, nodeoffset, elementoffset, renamed, isadded = parts[namekey(part)]
+        existing = None if isadded else next((n for n, p in rootinstances if p == namekey(rootpart)), None)
+        if (existing is not None):
+            instances[namekey(name)] = (existing, renamed, nodeoffset, elementoffset)
+            continue
+        newname = prefix + name if namekey(name) in taken else name
+        taken.add(namekey(newname))
+        if (newname != name):
+            header.setproperty("name", newname)
+        if (str(rootpart) != str(part)):
+            header.setproperty("part", rootpart)
+        instances[namekey(name)] = (newname, renamed, nodeoffset, elementoffset)
+        lines = [header.getline()] + definition[1:] + lines
+        added.append(newname)
+    
+    for block in iterblocks(source):
+        instance = headerproperty(block, "instance")
+        if (isinstance(block, (BlockReaderNset, BlockReaderElset)) and instance is not None and namekey(instance) in instances):
+            offset = instances[namekey(instance)][2 if isinstance(block, BlockReaderNset) else 3]
+            if (offset != 0):
+                block.setlabels(block.toarray() + offset)
+    names = _prefixconflicts(target, source, prefix)
+    _renamereferences(source, instances, names)
+    
+    # the instances before the other definitions
+    targetcontent = target.getcontent()
+    definitions = _instancedefinitions(targetcontent)
+    index = definitions[-1][1] if definitions else 0
+    targetcontent[index:index] = lines
+    mergepart(target, source, prefix = prefix)
+    if (log):
+        for name in added:
+            print("Added instance {:s}".format(name))
+    return added
+
+def _newassembly(name, lines = ()):
+    assembly = BlockReaderAssembly()
+    assembly.header = ParameterizedLine.fromheader(formatheader(assembly.getname(), OrderedDict([("name", name)])))
+    assembly.startlinenumber = 0
+    assembly.content = list(lines) + ["*End Assembly"]
+    return assembly
+
+@METRICS.timed()
+def mergepart(target, source, prefix = "MERGED_", log = False):
+    """
+     Merge the content of part source into part target (or any other container e.g. a root). 
+     
+     Node and element labels of source are offset in bulk when they collide with labels in target. 
+     Sets, orientations and sections of source with the same name as in target are prefixed 
+     (and the references to them updated). source is left unaltered: a clone of it (see INode.clone) 
+     is merged, sharing its strings and arrays.
+    
+     Parameters
+     ----------
+     target : INode
+        Part to merge into.
+     source : INode
+        Part to merge, is left unaltered.
+     prefix : string, optional
+        prefix for conflicting names. The default is "MERGED_".
+     log : boolean, optional
+        print what was offset and renamed. The default is False.
+    
+     Returns
+     -------
+     tuple : (int, int, dict)
+        (node offset, element offset, renamed {old name: new name})
+    """
+    source = source.clone()
+    
+    nodeoffset = _offsetfor(_labelsof(descendants(target, BlockReaderNode)), _labelsof(descendants(source, BlockReaderNode)))
+    elementoffset = _offsetfor(_labelsof(descendants(target, BlockReaderElement)), _labelsof(descendants(source, BlockReaderElement)))
+    if (nodeoffset != 0 or elementoffset != 0):
+        renumber(source, nodeoffset = nodeoffset, elementoffset = elementoffset)
+    
+    renamed = _prefixconflicts(target, source, prefix)
+    closing = ("end " + source.getname()).lower()
+    for item in source.getcontent():
+        if (isinstance(item, INode)):
+            target.addchild(item, realign = False)
+        elif (not item.lstrip("* ").lower().startswith(("end part", closing))):
+            # before *End Part
+            content = target.getcontent()
+            closed = len(content) > 0 and isinstance(content[-1], str) and content[-1].lstrip("* ").lower().startswith("end")
+            content.insert(len(content) - 1 if closed else len(content), item)
+    target.getroot().realignlinenumbers()
+    
+    if (log):
+        print("Merged {:s} into {:s}: node offset {:d}, element offset {:d}".format(source.getid(), target.getid(), nodeoffset, elementoffset))
+        for k, v in renamed.items():
+            print("- renamed {:s} to {:s}".format(k, v))
+    return nodeoffset, elementoffset, renamed
+
+@METRICS.timed()
+def merge(root, other, prefix = None, log = False):
+    """
+     Merge the parts and materials of the parsed model other into root 
+     (use mergepart for models without parts).
+     
+     Parts of other with the same name as a part in root are merged into that part (see mergepart),
+     other parts are added. Materials are added, identical materials are shared and 
+     conflicting materials are prefixed. 
+     
+     The assembly of other is merged into the assembly of root: added parts keep their instances 
+     (or get a default instance, renamed if the name is taken), the instances of parts merged into 
+     a part of root are replaced by the instance of root. Sets with an instance= property are offset 
+     with their part, conflicting names are prefixed and references (instance.name) follow the renamed 
+     instances, sets and sections. Other blocks of other (e.g. steps) are not merged.
+     
+     Parameters
+     ----------
+     root : RootReader
+        model to merge into.
+     other : RootReader
+        model to merge, is left unaltered.
+     prefix : string, optional
+        prefix for conflicting names. The default is the name of the file of other.
+     log : boolean, optional
+        print what was merged. The default is False.
+    
+     Returns
+     -------
+     root : RootReader
+    """
+    if (prefix is None):
+        origin = getattr(other, "_originfile", None)
+        prefix = (os.path.splitext(os.path.basename(origin))[0] if origin else "MERGED") + "_"
+    
+    # materials
+    materials = {m.getheader().getproperty("name"): m for m in root.query("Material")}
+    renamedmaterials = {}
+    for material in other.query("Material"):
+        name = material.getheader().getproperty("name")
+        if (name in materials):
+            if (repr(material) == repr(materials[name])):
+                continue
+            renamedmaterials[name] = prefix + name
+        material = material.clone()
+        if (name in renamedmaterials):
+            material.getheader().setproperty("name", renamedmaterials[name])
+        root.addchild(material, realign = False)
+    
+    parts = {p.getheader().getproperty("name"): p for p in root.query("Part")}
+    merged = {}
+    for part in other.query("Part"):
+        name = part.getheader().getproperty("name")
+        if (name in parts):
+            nodeoffset, elementoffset, renamed = mergepart(parts[name], part, prefix = prefix, log = log)
+            target = parts[name]
+            merged[namekey(name)] = (name, nodeoffset, elementoffset, renamed, False)
+        else:
+            target = root.addchild(part.clone(), realign = False)
+            merged[namekey(name)] = (name, 0, 0, {}, True)
+            if (log):
+                print("Added {:s}".format(target.getid()))
+        # references to renamed materials
+        for section in descendants(target, SectionChildBase):
+            if (section.getheader().properties.get("material", None) in renamedmaterials):
+                section.getheader().setproperty("material", renamedmaterials[section.getheader().getproperty("material")])
+    
+    _mergeassembly(root, other, merged, prefix, log)
+    
+    if (log):
+        for k, v in renamedmaterials.items():
+            print("- renamed material {:s} to {:s}".format(k, v))
+    root.realignlinenumbers()
+    return root
+
+@METRICS.timed()
+def mergecoincidentnodes(root, tolerance = 1e-6, log = False):
+    """
+     Merge nodes within tolerance of each other (e.g. duplicate nodes of meshes imported from 
+     several sources) into the node with the lowest label, using a spatial grid index.
+     Element connectivity, Nsets and node based Orientations are rewritten accordingly.
+     
+     Labels are only unique within a part: the nodes of every part (and of the model level) 
+     are merged separately, sets with an instance= property follow the part of the instance 
+     (also when they are outside of root).
+    
+     Parameters
+     ----------
+     root : INode
+        scope, e.g. the root or a single Part.
+     tolerance : float, optional
+        maximum distance between nodes to be merged. The default is 1e-6.
+     log : boolean, optional
+        print what was merged. The default is False.
+    
+     Returns
+     -------
+     tuple : (numpy.ndarray, numpy.ndarray)
+        (labels of the removed nodes, labels of the nodes replacing them), part after part.
+    """
+    nodes, elements, nsets, _, orientations = _partblocks(root)
+    removed, kept = [np.empty(0, dtype = np.int64)], [np.empty(0, dtype = np.int64)]
+    for scope, nodeblocks in nodes.items():
+        r, k = _mergecoincident(nodeblocks, elements.get(scope, []), nsets.get(scope, []), 
+                                orientations.get(scope, []), tolerance, log)
+        removed.append(r)
+        kept.append(k)
+    removed, kept = np.concatenate(removed), np.concatenate(kept)
+    
+    if (log):
+        print("Merged {:d} coincident nodes (tolerance {:g})".format(len(removed), tolerance))
+        for r, k in zip(removed[:20].tolist(), kept[:20].tolist()):
+            print("{:>7d} -> {:d}".format(r, k))
+        if (len(removed) > 20):
+            print("...")
+    return removed, kept
+
+def _mergecoincident(nodeblocks, elementblocks, nsets, orientations, tolerance, log):
+    # merge the nodes of a single part
+    labels = np.concatenate([b.getlabels() for b in nodeblocks])
+    coordinates = np.concatenate([b.getcoordinates() for b in nodeblocks])
+    
+    # sort by label, so the representative of each group is the lowest label
+    order = np.argsort(labels, kind = "stable")
+    labels, coordinates = labels[order], coordinates[order]
+    rep = GridIndex(coordinates, tolerance).clusters(tolerance)
+    merged = rep != np.arange(len(labels))
+    removed, kept = labels[merged], labels[rep[merged]]
+    if (len(removed) == 0):
+        return removed, kept
+    
+    lookup = labellookup(removed, kept)
+    for node in nodeblocks:
+        nlabels, ncoordinates = node.toarray()
+        keep = ~np.isin(nlabels, removed)
+        if (not keep.all()):
+            node.setarrays(nlabels[keep], ncoordinates[keep])
+    
+    degenerate = 0
+    for element in elementblocks:
+        elabels, connectivity = element.toarray()
+        newconnectivity = lookup(connectivity)
+        if (not np.array_equal(connectivity, newconnectivity)):
+            element.setarrays(elabels, newconnectivity)
+            srt = np.sort(newconnectivity, axis = 1)
+            degenerate += int((srt[:, 1:] == srt[:, :-1]).any(axis = 1).sum())
+    
+    for nset in nsets:
+        slabels = nset.toarray()
+        newlabels = lookup(slabels)
+        if (not np.array_equal(slabels, newlabels)):
+            # drop duplicates, keep order of first occurrence
+            _, first = np.unique(newlabels, return_index = True)
+            nset.setlabels(newlabels[np.sort(first)])
+    
+    for orientation in orientations:
+        if (orientation.usesnodes() and orientation.getdefinedorientation() is not None):
+            definition = orientation.getdefinedorientation()
+            nodes = lookup(np.asarray(definition[:3], dtype = np.int64)).tolist()
+            if (nodes != list(definition[:3])):
+                orientation.setdefinedorientation(tuple(nodes) + tuple(definition[3:]))
+    
+    if (log and degenerate > 0):
+        print("WARNING: {:d} elements reference a merged node more than once".format(degenerate))
+    return removed, kept
@@ -4,14 +4,13 @@ import os
 from enum import Enum
 from io import StringIO
 import numpy as np
-import pandas as pd 
 import sys
 from collections import OrderedDict
 import itertools, operator
+import warnings
 
-MISSING_READER_ALERT = [None]
-LOG_LEVEL = 1
 REGEX_ENABLER_PREFIX = "ø"
+_VERSIONS = itertools.count(1)  # versions of the blocks, unique over all blocks (see BlockReaderBase.markdirty)
 
 # TODO:
 # x allow semantic tree to be converted to simple block e.g. ([Controls, Material > User Material] etc.
@@ -24,27 +23,15 @@ REGEX_ENABLER_PREFIX = "ø"
 
 
 
-def isnotebook():
-    try:
-        shell = get_ipython().__class__.__name__
-        if shell == 'ZMQInteractiveShell':
-            return True   # Jupyter notebook or qtconsole
-        elif shell == 'TerminalInteractiveShell' or shell == 'SpyderShell':
-            return False  # Terminal running IPython
-        else:
-            return False  # Other type (?)
-    except NameError:
-        return False      # Probably standard Python interpreter
-
-codedir = None
-if (isnotebook()):
-    codedir = os.path.dirname(os.path.abspath(''))
-else:
-    codedir = os.path.dirname(os.path.realpath(__file__))
-
-sys.path.append(codedir)
-
-import annotations
+try:
+    from . import annotations, logger
+    from .metrics import METRICS, perf_counter_ns
+    from .progress import ProgressReporter
+except ImportError:
+    # not imported as a package (e.g. run as a script)
+    import annotations, logger
+    from metrics import METRICS, perf_counter_ns
+    from progress import ProgressReporter
 
 
 
@@ -74,6 +61,9 @@ def infernumber(s, explicit=False):
          or string if it cannot be cast.
      
      """
+    if (s.lstrip()[:1] not in _NUMBERSTART):
+        # e.g. names, without the cost of an exception
+        return s
     try:
         a = float(s)
         if (explicit and "." in s):
@@ -81,8 +71,65 @@ def infernumber(s, explicit=False):
             return a
         # downcast to int if no information is lost    
         return int(a) if (a == int(a)) else a
-    except ValueError:
+    except (ValueError, OverflowError):
         return s
+
+_NUMBERSTART = set("+-.0123456789")
+# an empty token (preceded by a separator), which numpy would read as -1
+_BLANKTOKEN = re.compile(r",\s*(?:,|$)")
+
+def infernumbers(tokens, explicit = False):
+    """
+     Cast a sequence of strings to numbers at once (vectorized), see infernumber
+     
+     e.g.
+        ["1", " 2", "3e2"]  becomes array([1, 2, 300])
+        ["1", "2.5"]        becomes array([1. , 2.5])
+        ["1", "ALL"]        becomes [1, "ALL"]
+        ["1", "nan"]        becomes [1, "nan"]
+     
+     The values agree with infernumber per token: names, empty tokens and tokens which are 
+     not finite numbers (nan, inf, 1e400) stay strings. Only the types differ: an array has 
+     a single dtype, so where infernumber gives ints and floats (e.g. ["1", "2.5"], or with 
+     explicit ["1", "2.0"]) or ints beyond int64 all values are floats.
+     
+     Parameters
+     ----------
+     tokens : sequence of strings
+        strings to be cast to numbers
+     explicit : boolean, optional
+        keep floats if declared as float (contains "."), see infernumber. The default is False.
+     
+     Returns
+     -------
+     numpy.ndarray or list
+        int64 array if all tokens are integral numbers, float64 array if all tokens are numbers,
+        else a list of numbers and strings (as infernumber per token).
+     
+     """
+    tokens = list(tokens)
+    if (len(tokens) == 0):
+        return np.empty(0, dtype = np.int64)
+    text = ",".join(tokens)
+    if (text.count(",") != len(tokens) - 1 or _BLANKTOKEN.search("," + text) is not None):
+        # tokens containing separators or empty tokens
+        return [infernumber(t, explicit) for t in tokens]
+    arr = None
+    with warnings.catch_warnings():
+        # older numpy versions only warn on unmatched data
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            arr = np.fromstring(text, dtype = np.float64, sep = ",")
+        except (ValueError, DeprecationWarning):
+            pass
+    if (arr is None or len(arr) != len(tokens) or not np.isfinite(arr).all()):
+        # e.g. "-nan" or "1e400", which infernumber keeps as string
+        return [infernumber(t, explicit) for t in tokens]
+    if (explicit and "." in text):
+        return arr
+    if ((arr == np.round(arr)).all() and (np.abs(arr) < 2.**63).all()):
+        return arr.astype(np.int64)
+    return arr
         
 def findblockbyname(stck, name, regex = False):
     """
@@ -139,15 +186,16 @@ def parseheader(line):
     """
     segments = line.split(",")
     name =  segments[0]
-    name = name.lstrip("* ")
+    name = sys.intern(name.lstrip("* "))
     properties = OrderedDict()
     for i in segments[1:]:
+        # keywords and property names repeat over all blocks: interned (shared)
         if ("=" in i):
             k, v = i.split("=")
             v = v.strip()
-            properties[k.strip()] = infernumber(v)
+            properties[sys.intern(k.strip())] = infernumber(v)
         else:
-            properties[i.strip()] = None
+            properties[sys.intern(i.strip())] = None
     return name, properties
 
 def matchdict2str(dic, attrs, regex = True):
@@ -210,9 +258,424 @@ def matchdict2str(dic, attrs, regex = True):
             return False
     return True
 
+def formatheader(name, properties):
+    """
+    Format a header line from its name and properties, the inverse of parseheader
+    
+    e.g.
+        name = Nset,
+        properties = {
+            "nset": "N1",
+            "generate": None
+        }
+    becomes:
+        *Nset, nset=N1, generate
+
+    Parameters
+    ----------
+    name : string
+        name of header.
+    properties : dict
+        properties listed in header.
+
+    Returns
+    -------
+    string
+        header line.
+
+    """
+    segments = ["*" + name]
+    for k, v in properties.items():
+        segments += [str(k) if v is None else "{:s}={:s}".format(str(k), str(v))]
+    return ", ".join(segments)
+
+def _replaceproperty(line, key, value = None, remove = False):
+    """
+        Set, add or remove (remove = True) a single property of a header line, 
+        the other segments of the line keep their text (e.g. name=007 is not reformatted)
+    """
+    segments = line.split(",")
+    found = [i for i in range(1, len(segments)) if segments[i].split("=")[0].strip() == key]
+    if (remove):
+        for i in reversed(found):
+            del segments[i]
+        return ",".join(segments)
+    text = str(key) if value is None else "{:s}={:s}".format(str(key), str(value))
+    if (found):
+        segment = segments[found[-1]]
+        segments[found[-1]] = segment[:len(segment) - len(segment.lstrip())] + text
+    elif (len(segments) > 1 and segments[-1].strip() == ""):
+        # before a trailing comma
+        segments.insert(len(segments) - 1, " " + text)
+    else:
+        segments.append(" " + text)
+    return ",".join(segments)
+
+def numbersfromtext(lines, dtype = np.int64):
+    """
+    Parse comma seperated numbers from a list of data lines in bulk
+    
+    e.g.
+        [" 1, 2, 3,", " 4, 5"]
+    becomes:
+        array([1, 2, 3, 4, 5])
+
+    Parameters
+    ----------
+    lines : list of strings
+        data lines, comments and empty lines are skipped.
+    dtype : numpy dtype, optional
+        dtype of the result. The default is np.int64.
+
+    Raises
+    ------
+    ValueError
+        if the lines contain entries that cannot be cast to dtype.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D array with all numbers in order.
+
+    """
+    text = ",".join([l.strip(" \t\n,") for l in lines if not l.lstrip().startswith("**") and l.strip(" \t\n,")])
+    if (text == ""):
+        return np.empty(0, dtype = dtype)
+    with warnings.catch_warnings():
+        # older numpy versions only warn on unmatched data
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype = dtype, sep = ",")
+        except (ValueError, DeprecationWarning):
+            # e.g. labels written as floats "1., 2."
+            arr = infernumbers(text.split(","))
+            if (isinstance(arr, np.ndarray) and (arr.dtype.kind == "i" or not np.issubdtype(dtype, np.integer))):
+                return arr.astype(dtype)
+            raise ValueError("Cannot parse data lines as {:s}".format(str(np.dtype(dtype))))
+
+def formatlabels(labels, span = 16):
+    """
+    Format labels as data lines of a set block, 
+    at most span labels per line (Abaqus allows 16)
+
+    Parameters
+    ----------
+    labels : array_like of int
+        labels.
+    span : int, optional
+        labels per line. The default is 16.
+
+    Returns
+    -------
+    list of strings
+        data lines.
+
+    """
+    return [l for text in iterformatlabels(labels, span) for l in text.split("\n")]
+
+def iterformatlabels(labels, span = 16, chunk = 4096):
+    """
+    Format labels as data lines of a set block in chunks of text (see formatlabels)
+
+    Parameters
+    ----------
+    labels : array_like of int
+        labels.
+    span : int, optional
+        labels per line. The default is 16.
+    chunk : int, optional
+        lines per chunk. The default is 4096.
+
+    Yields
+    ------
+    string
+        chunk of data lines, joined by newlines (without trailing newline).
+
+    """
+    labels = np.asarray(labels, dtype = np.int64)
+    n = len(labels)
+    nfull = n - n % span
+    fmt = None
+    for i in range(0, nfull, span * chunk):
+        # format many lines at once with a single format operation
+        part = labels[i:min(i + span * chunk, nfull)]
+        if (fmt is None or len(part) != span * chunk):
+            fmt = "\n".join([" " + ", ".join(["%d"]*span)]*(len(part) // span))
+        yield fmt % tuple(part.tolist())
+    if (nfull < n):
+        yield " " + ", ".join(map(str, labels[nfull:].tolist()))
+
+def formatrows(labels, values, labelfmt = "%d", valuefmt = "%d", span = 16):
+    """
+    Format labelled rows as data lines (e.g. nodes or elements), 
+    rows longer than span entries are continued on the next line (trailing comma)
+    
+    e.g.
+        labels = [1, 2], values = [[1, 2, 3], [2, 3, 4]]
+    becomes:
+        ["1, 1, 2, 3", "2, 2, 3, 4"]
+
+    Parameters
+    ----------
+    labels : array_like of int
+        label per row.
+    values : 2D array_like
+        values per row.
+    labelfmt : string, optional
+        % format of a label. The default is "%d".
+    valuefmt : string, optional
+        % format of a value, "%r" gives the shortest exact float. The default is "%d".
+    span : int, optional
+        maximum entries per line. The default is 16.
+
+    Returns
+    -------
+    list of strings
+        data lines.
+
+    """
+    return [l for text in iterformatrows(labels, values, labelfmt, valuefmt, span) for l in text.split("\n")]
+
+def iterformatrows(labels, values, labelfmt = "%d", valuefmt = "%d", span = 16, chunk = 4096):
+    """
+    Format labelled rows as data lines in chunks of text (see formatrows)
+
+    Parameters
+    ----------
+    labels : array_like of int
+        label per row.
+    values : 2D array_like
+        values per row.
+    labelfmt : string, optional
+        % format of a label. The default is "%d".
+    valuefmt : string, optional
+        % format of a value. The default is "%d".
+    span : int, optional
+        maximum entries per line. The default is 16.
+    chunk : int, optional
+        rows per chunk. The default is 4096.
+
+    Yields
+    ------
+    string
+        chunk of data lines, joined by newlines (without trailing newline).
+
+    """
+    labels = np.asarray(labels)
+    values = np.asarray(values)
+    if (len(labels) == 0):
+        return
+    values = values.reshape(len(labels), -1)
+    fmts = [labelfmt] + [valuefmt]*values.shape[1]
+    rowfmt = ",\n".join([", ".join(fmts[i:i+span]) for i in range(0, len(fmts), span)])
+    floats = values.dtype.kind == "f"
+    fmt = None
+    for i in range(0, len(labels), chunk):
+        if (floats):
+            # a float can represent a label exactly and is formatted as int by %d
+            rows = np.column_stack((labels[i:i+chunk].astype(np.float64), values[i:i+chunk]))
+        else:
+            rows = np.column_stack((labels[i:i+chunk], values[i:i+chunk])).astype(np.int64)
+        # format many rows at once with a single format operation
+        if (fmt is None or len(rows) != chunk):
+            fmt = "\n".join([rowfmt]*len(rows))
+        yield fmt % tuple(rows.ravel().tolist())
+
+def writelines(out, lines):
+    """
+    Write lines of text to a text stream at once, each line ending with a newline
+    """
+    if (len(lines) > 0):
+        out.write("\n".join([l.rstrip("\n") for l in lines]))
+        out.write("\n")
+
+class FileOrigin(object):
+    """
+        The file a tree (or include) was parsed from, with its size and modification time
+        at parsing, to verify that byte ranges can still be copied from it.
+    """
+    __slots__ = ("filepath", "stamp", "nlines")
+    
+    def __init__(self, filepath):
+        self.filepath = os.path.realpath(filepath)
+        self.stamp = self._stat()
+        self.nlines = None      # amount of lines, known after parsing
+    
+    def _stat(self):
+        try:
+            stat = os.stat(self.filepath)
+            return (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            return None
+        
+    def isvalid(self):
+        """
+            True if the file is unaltered since parsing
+        """
+        return self.stamp is not None and self._stat() == self.stamp
+
+def lineoffsets(filepath, linenumbers, chunksize = 1 << 24):
+    """
+    Find the byte offsets at which the given lines start, in a single pass over the file
+
+    Parameters
+    ----------
+    filepath : string
+        file.
+    linenumbers : iterable of int
+        line numbers (starting from 0), line numbers beyond the last line give the file size.
+    chunksize : int, optional
+        bytes read at once. The default is 16MB.
+
+    Returns
+    -------
+    dict
+        {linenumber: byte offset}.
+
+    """
+    targets = sorted(set(linenumbers))
+    offsets = {}
+    i = 0
+    while (i < len(targets) and targets[i] <= 0):
+        offsets[targets[i]] = 0
+        i += 1
+    seen = 0    # newlines before the current chunk
+    pos = 0     # byte offset of the current chunk
+    with open(filepath, "rb") as fin:
+        while (i < len(targets)):
+            chunk = fin.read(chunksize)
+            if (not chunk):
+                break
+            count = chunk.count(b"\n")
+            if (targets[i] <= seen + count):
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype = np.uint8) == 10)
+                while (i < len(targets) and targets[i] <= seen + count):
+                    # line k starts after the k-th newline
+                    offsets[targets[i]] = pos + int(newlines[targets[i] - seen - 1]) + 1
+                    i += 1
+            seen += count
+            pos += len(chunk)
+    for t in targets[i:]:
+        offsets[t] = pos
+    return offsets
+
+def copyfilerange(src, dst, offset, count):
+    """
+    Copy a byte range of file src to the current position of file dst,
+    in the kernel (copy_file_range/sendfile) where available
+
+    Parameters
+    ----------
+    src : file object
+        opened for reading (binary).
+    dst : file object
+        opened for writing, buffered content is flushed first.
+    offset : int
+        byte offset in src.
+    count : int
+        amount of bytes.
+
+    Returns
+    -------
+    None.
+
+    """
+    dst.flush()
+    infd, outfd = src.fileno(), dst.fileno()
+    while (count > 0):
+        try:
+            if (hasattr(os, "copy_file_range")):
+                n = os.copy_file_range(infd, outfd, count, offset)
+            else:
+                n = os.sendfile(outfd, infd, offset, count)
+        except (OSError, AttributeError):
+            src.seek(offset)
+            n = os.write(outfd, src.read(min(count, 1 << 24)))
+        if (n == 0):
+            raise IOError("Unexpected end of file: " + src.name)
+        offset += n
+        count -= n
+
+def writeplan(plan, filepath):
+    """
+    Write a save plan (see BlockReaderBase.saveplan) to a file, 
+    via a temporary file so the plan may copy from the file being replaced
+
+    Parameters
+    ----------
+    plan : function
+        returning a new iterator over the plan (the plan is iterated twice).
+    filepath : string
+        output file.
+
+    Returns
+    -------
+    None.
+
+    """
+    plan = _coalesceplan(plan)
+    # first pass: the byte offsets of all copied line ranges
+    ranges = {}
+    for step in plan():
+        if (step[0] == "copy"):
+            ranges.setdefault(step[1], set()).update([step[2], step[2] + step[3]])
+    offsets = {}
+    for origin, lines in ranges.items():
+        # the end of the file needs no scan
+        end = [l for l in lines if origin.nlines is not None and l >= origin.nlines]
+        offsets[origin.filepath] = lineoffsets(origin.filepath, lines.difference(end))
+        offsets[origin.filepath].update({l: origin.stamp[0] for l in end})
+    sources = {}
+    tmppath = filepath + ".tmp"
+    try:
+        with open(tmppath, "w", buffering = 1 << 20) as outf:
+            for step in plan():
+                if (step[0] == "lines"):
+                    writelines(outf, step[1])
+                elif (step[0] == "write"):
+                    step[1].writeto(outf)
+                elif (step[0] == "copy"):
+                    path = step[1].filepath
+                    if (path not in sources):
+                        sources[path] = open(path, "rb")
+                    start = offsets[path][step[2]]
+                    end = offsets[path][step[2] + step[3]]
+                    copyfilerange(sources[path], outf, start, end - start)
+                    if (end > start and not _endswithnewline(sources[path], end)):
+                        # last line of the file
+                        outf.write("\n")
+    finally:
+        for fin in sources.values():
+            fin.close()
+    os.replace(tmppath, filepath)
+
+def _coalesceplan(plan):
+    # merge adjacent copies of the same file into a single copy
+    def coalesced():
+        pending = None
+        for step in plan():
+            if (pending is not None and step[0] == "copy" and step[1] is pending[1] 
+                    and step[2] == pending[2] + pending[3]):
+                pending = ("copy", pending[1], pending[2], pending[3] + step[3])
+                continue
+            if (pending is not None):
+                yield pending
+                pending = None
+            if (step[0] == "copy"):
+                pending = step
+            else:
+                yield step
+        if (pending is not None):
+            yield pending
+    return coalesced
+
+def _endswithnewline(fin, end):
+    fin.seek(end - 1)
+    return fin.read(1) == b"\n"
+
 def matchcontent(content, match, regex = True):
     if (isinstance(content, BlockReaderBase)):
-        content = content.getcontent()
+        content = content.content
     
     if regex:
         for i in content:
@@ -226,11 +689,24 @@ def matchcontent(content, match, regex = True):
                     return True
     return False
     
+def headername(line):
+    """
+    The keyword of a header line, without parsing its properties
+    
+    e.g.
+        *Elset, elset=E1, generate
+    gives:
+        Elset
+    """
+    return sys.intern(line.split(",", 1)[0].lstrip("* "))
+
 class ParameterizedLine(object):
+    __slots__ = ("name", "line", "_properties")
     
-    def __init__(self, line, name):
+    def __init__(self, line, name, properties = None):
         """
-        Line with comma seperated properties, stored as a name and OrderedDict
+        Line with comma seperated properties, stored as a name and OrderedDict.
+        The properties are parsed from the line on first access if not given.
 
         Parameters
         ----------
@@ -238,10 +714,38 @@ class ParameterizedLine(object):
             Original line.
         name : string
             Name of the line.
+        properties : OrderedDict, optional
+            Properties of the line. The default is None (parsed from line when needed).
         """
         self.name = name
         self.line = line
-        self.properties = OrderedDict()
+        self._properties = properties
+    
+    @property
+    def properties(self):
+        if (self._properties is None):
+            self._properties = parseheader(self.line)[1]
+        return self._properties
+    
+    @properties.setter
+    def properties(self, properties):
+        self._properties = properties
+    
+    def isparameterized(self):
+        """
+         Returns
+         -------
+         boolean
+            True if the properties were parsed (or set)
+        """
+        return self._properties is not None
+    
+    def copy(self):
+        """
+         Copy of this line, with a copy of its properties (if parsed)
+        """
+        return type(self)(self.line, self.name, 
+                          None if self._properties is None else OrderedDict(self._properties))
     
     @classmethod
     def fromheader(cls, line):
@@ -264,16 +768,46 @@ class ParameterizedLine(object):
             Instance.
 
         """
-        prs = parseheader(line)
-        paraml = cls(line, prs[0])
-        paraml.properties = prs[1]
-        return paraml
+        # properties are parsed on first access
+        return cls(line, headername(line))
     
     def getline(self):
         return self.line
     
     def getproperty(self, key):
         return self.properties[key]
+    
+    def setproperty(self, key, value = None):
+        """
+        Set (or add) a property and update the line, the other properties keep their text
+
+        Parameters
+        ----------
+        key : string
+            property name.
+        value : string, number or None, optional
+            property value, None for a property without value. The default is None.
+
+        Returns
+        -------
+        self
+        """
+        self.properties[key] = value
+        self.line = _replaceproperty(self.line, key, value)
+        return self
+    
+    def delproperty(self, key):
+        """
+        Remove a property (if present) and update the line
+        
+        Returns
+        -------
+        self
+        """
+        if (key in self.properties):
+            del self.properties[key]
+            self.line = _replaceproperty(self.line, key, remove = True)
+        return self
         
     def __str__(self):
         return "{:s} {:s}".format(
@@ -284,6 +818,73 @@ class ParameterizedLine(object):
     def __repr__(self):
         return self.getline()
 
+_ATOMIC = {type(None), bool, int, float, str, type(lambda: None)}
+_SLOTDESCRIPTORS = {}
+
+def _slotdescriptors(cls):
+    """
+        The slot (member) descriptors of a class and its bases
+    """
+    if (cls not in _SLOTDESCRIPTORS):
+        _SLOTDESCRIPTORS[cls] = [c.__dict__[s] for c in cls.__mro__ 
+                                 for s in c.__dict__.get("__slots__", ())]
+    return _SLOTDESCRIPTORS[cls]
+
+def sizeof(obj, seen = None):
+    """
+    Approximate memory (bytes) held by an object and the strings, containers, headers 
+    and arrays it refers to, INodes and functions are not followed. 
+    
+    Objects in seen (ids) are not counted again, the ids of the counted objects are added.
+    Arrays count the data of the array owning it once (views of it count no data), 
+    memory-mapped or external data is not counted.
+
+    Parameters
+    ----------
+    obj : any
+        e.g. a content list.
+    seen : set, optional
+        ids of objects already counted. The default is None.
+
+    Returns
+    -------
+    int
+        bytes.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while (stack):
+        o = stack.pop()
+        if (id(o) in seen or o is None or isinstance(o, INode) or callable(o)):
+            continue
+        seen.add(id(o))
+        if (isinstance(o, np.ndarray)):
+            # the object, and the data once per array owning it
+            size += sys.getsizeof(o) - (o.nbytes if o.base is None else 0)
+            owner = o
+            while (isinstance(owner.base, np.ndarray)):
+                owner = owner.base
+            if (owner.base is None and ("data", id(owner)) not in seen):
+                seen.add(("data", id(owner)))
+                size += owner.nbytes
+            continue
+        size += sys.getsizeof(o)
+        if (isinstance(o, (str, bytes, int, float, bool))):
+            continue
+        if (isinstance(o, dict)):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif (isinstance(o, (list, tuple, set, frozenset))):
+            stack.extend(o)
+        elif (hasattr(type(o), "__slots__")):
+            for descriptor in _slotdescriptors(type(o)):
+                try:
+                    stack.append(descriptor.__get__(o))
+                except AttributeError:
+                    continue
+    return size
+
 class INode(object):
     """
         INode object, has a header and can store content in order.
@@ -291,6 +892,8 @@ class INode(object):
         an interface to create and utilize an object Tree.
 
     """
+    __slots__ = ("name", "content", "_parent", "header", "_shared")
+    
     def __init__(self, name, parent = None):
         """
 
@@ -307,19 +910,142 @@ class INode(object):
         self.content = []
         self._parent = parent 
         self.header = None
+        self._shared = False    # content shared with a clone (copy on write)
+    
+    def __deepcopy__(self, memo):
+        # copy slot by slot, faster than the generic reduce/reconstruct (a reader is copied for every block parsed)
+        cp = object.__new__(type(self))
+        memo[id(self)] = cp
+        for descriptor in _slotdescriptors(type(self)):
+            try:
+                value = descriptor.__get__(self)
+            except AttributeError:
+                continue
+            descriptor.__set__(cp, value if type(value) in _ATOMIC else deepcopy(value, memo))
+        if (hasattr(self, "__dict__")):
+            cp.__dict__.update(deepcopy(self.__dict__, memo))
+        return cp
+    
+    def clone(self):
+        """
+        Copy-on-write copy of this node and the tree below it, e.g. for variants of a base model.
+        
+        The nodes and their headers are copied, but the lines of blocks without children 
+        and the arrays of array-backed blocks are shared with the original: the lines are only 
+        copied when getcontent() is called on either of them. Replace arrays (setdata, setarrays, 
+        setlabels) instead of altering them in place.
+
+        Returns
+        -------
+        INode
+            the copy (without parent).
+        """
+        return self._clone(None)
+    
+    def _clone(self, parent):
+        cp = object.__new__(type(self))
+        for descriptor in _slotdescriptors(type(self)):
+            try:
+                descriptor.__set__(cp, descriptor.__get__(self))
+            except AttributeError:
+                continue
+        if (hasattr(self, "__dict__")):
+            cp.__dict__.update(self.__dict__)
+        cp._parent = parent
+        if (isinstance(self.header, ParameterizedLine)):
+            cp.header = self.header.copy()
+        children = self._currentchildren()
+        if (children):
+            clones = {id(c): c._clone(cp) for c in children}
+            cp.content = [clones.get(id(i), i) for i in self.content]
+            cp._shared = False
+        else:
+            self._shared = True
+            cp._shared = True
+        return cp
+    
+    def _currentchildren(self):
+        return tuple(self.getchildren())
+    
+    def getmemoryusage(self, deep = False, seen = None):
+        """
+        Approximate memory held by this block: the object, its header, lines, arrays 
+        and other derived data (see sizeof), without its children unless deep.
+        Objects shared between blocks (e.g. with a clone, interned strings) are counted once.
+
+        Parameters
+        ----------
+        deep : boolean, optional
+            include the children (recursively). The default is False.
+        seen : set, optional
+            ids of objects already counted (see sizeof). The default is None.
+
+        Returns
+        -------
+        int
+            bytes.
+        """
+        seen = set() if seen is None else seen
+        size = 0
+        for node in itertools.chain([self], self.flatten() if deep else ()):
+            if (id(node) in seen):
+                continue
+            seen.add(id(node))
+            size += sys.getsizeof(node)
+            for descriptor in _slotdescriptors(type(node)):
+                if (descriptor.__name__ != "_parent"):
+                    try:
+                        size += sizeof(descriptor.__get__(node), seen)
+                    except AttributeError:
+                        continue
+            if (hasattr(node, "__dict__")):
+                size += sizeof(node.__dict__, seen)
+        return size
+    
+    def getmemoryreport(self):
+        """
+        Approximate memory of this block and its children per block class (see getmemoryusage)
+        
+        e.g.
+            for name, usage in root.getmemoryreport().items():
+                print(name, usage["blocks"], usage["bytes"], usage["fraction"])
+
+        Returns
+        -------
+        OrderedDict
+            {class name: {"blocks": amount, "bytes": bytes, "fraction": of the total}}, 
+            largest first.
+        """
+        seen = set()
+        report = {}
+        for node in itertools.chain([self], self.flatten()):
+            usage = report.setdefault(type(node).__name__, OrderedDict([("blocks", 0), ("bytes", 0), ("fraction", 0.)]))
+            usage["blocks"] += 1
+            usage["bytes"] += node.getmemoryusage(seen = seen)
+        total = max(sum(u["bytes"] for u in report.values()), 1)
+        for usage in report.values():
+            usage["fraction"] = usage["bytes"] / total
+        return OrderedDict(sorted(report.items(), key = lambda item: -item[1]["bytes"]))
     
     def findchildrenbyname(self, name, regex=False):
         # TODO: debug should be yield?
-        yield from findblockbyname(self.getcontent(), name, regex)
+        yield from findblockbyname(self.content, name, regex)
        
     def getheader(self):
         return self.header
        
     def getcontent(self):
+        """
+         The content (lines and children) of this node, to read or alter
+        """
+        if (self._shared):
+            # copy on write: the content is shared with a clone
+            self.content = list(self.content)
+            self._shared = False
         return self.content
         
     def getchildren(self):
-        for line in self.getcontent():
+        for line in self.content:
             if isinstance(line, INode):
                 yield line
     
@@ -392,7 +1118,7 @@ class INode(object):
         else:
             yield repr(self.getheader())
         
-        for i in self.getcontent():
+        for i in self.content:
             if isinstance(i, INode):
                 yield from i.flattencontent()
             else:
@@ -547,7 +1273,7 @@ class INode(object):
       
     def __len__(self):
         size = 0 if self.getheader() == None else 1
-        for _x in self.getcontent():
+        for _x in self.content:
             if isinstance(_x, str):
                 size += 1
             else:
@@ -561,15 +1287,43 @@ class INode(object):
         else:
             return "{:<120s} ({:s})".format(self.getname(), "MOCK")
        
-    def __repr__(self):
-        strarr = []
-        content = [self.getheader()] + self.getcontent() if self.getheader() != None else self.getcontent()
-        for _x in content:
-            if isinstance(_x, str):
-                strarr += [_x.rstrip("\n")]
+    def writeto(self, out, chunk = 65536):
+        """
+        Write this node and its content (recursively) to a text stream, 
+        the same text as repr (with a trailing newline) but streamed in chunks of lines
+        instead of built as a whole
+
+        Parameters
+        ----------
+        out : text stream
+            e.g. file handle.
+        chunk : int, optional
+            maximum amount of lines per write. The default is 65536.
+
+        Returns
+        -------
+        None.
+
+        """
+        lines = []
+        if (self.getheader() is not None):
+            lines += [self.getheader() if isinstance(self.getheader(), str) else repr(self.getheader())]
+        for _x in self.content:
+            if isinstance(_x, INode):
+                writelines(out, lines)
+                lines = []
+                _x.writeto(out, chunk)
             else:
-                strarr += [repr(_x)]
-        return "\n".join(strarr)
+                lines += [_x if isinstance(_x, str) else repr(_x)]
+                if (len(lines) >= chunk):
+                    writelines(out, lines)
+                    lines = []
+        writelines(out, lines)
+       
+    def __repr__(self):
+        out = StringIO()
+        self.writeto(out)
+        return out.getvalue()[:-1]
 
 
 """"     
@@ -607,6 +1361,10 @@ class BlockReaderBase(INode):
         a string.
         Specifically designed for Abaqus .inp files
     """
+    __slots__ = ("childreaderresolver", "startlinenumber", "_nlines", "_isreading", "_activechildreader",
+                 "_dirty", "_version", "_cleanstate", "_origin", "_cleanchildren", "acceptchildren", "acceptunimplementedchildren",
+                 "preferchildoversibling", "takesiblingpreference", "stripEOL")
+    
     def __init__(self, name, parent = None, 
                  acceptchildren = True, acceptunimplementedchildren = True, 
                  childreaderresolver = None):
@@ -620,6 +1378,11 @@ class BlockReaderBase(INode):
         self._nlines = 0                # counter for the amount of lines read
         self._isreading = False         # current state
         self._activechildreader = None  # active child reader to which lines are delegated
+        self._dirty = False             # marked as modified (see markdirty)
+        self._version = next(_VERSIONS) # changes with every modification, keys data derived from the block
+        self._cleanstate = None         # header of the block after parsing, see isdirty
+        self._origin = None             # (FileOrigin, first line, amount of lines) this block was parsed from
+        self._cleanchildren = None      # children after parsing
         
         # Behaviour
         self.acceptchildren = acceptchildren                            # accept childreader
@@ -693,17 +1456,19 @@ class BlockReaderBase(INode):
             raise ValueError("[{:^20s}] Start reader first".format(self.getid()))
         if self.stripEOL:
             line = line.rstrip("\n")
-        if LOG_LEVEL >= 2:
-            print("[{:^20s}] received line ({:d}): \"{:s}\" and nextsiblingeader: {:s}".format(self.getid(), self.getendlinenumber(), line, str(nextsiblingeader)))
+        # no logging per line: the lines are traced by RootReader.parse, the events below once per block
         
         if self.getheader() is None:
             self.header = self.parameterizeheader(line)
-            if LOG_LEVEL >= 2:
-                print("[{:^20s}] set header".format(self.getid()))
+            parsingroot = self._parsingroot()
+            if (parsingroot is not None and parsingroot._fileorigin is not None):
+                self._origin = (parsingroot._fileorigin, parsingroot._parseline, 0)
+            if logger.LOGGER.tracing:
+                self._trace("header", line)
         else:
             if self.doterminate(line, nextsiblingeader):
-                if LOG_LEVEL >= 2:
-                    print("[{:^20s}] terminated".format(self.getid()))
+                if logger.LOGGER.tracing:
+                    self._trace("terminated", line)
                 self.stopreading()
                 return ReaderExitCode.REJECT
                 
@@ -720,8 +1485,6 @@ class BlockReaderBase(INode):
             if (not self._hasactivechildreader()):
                 # Read normal line (or property)
                 self.getcontent().append(self.parameterize(line))
-                if LOG_LEVEL >= 2:
-                    print("[{:^20s}] appended content".format(self.getid())) 
             else:
                 # Delegate to child reader
                 rsp = self._activechildreader.read(line, nextchildreader)
@@ -733,27 +1496,51 @@ class BlockReaderBase(INode):
                             # This block can be ommited
                             self._activatechildreader(nextchildreader)
                         
-                        if LOG_LEVEL >= 2:
-                            print("[{:^20s}] redo".format(self.getid()))
+                        if logger.LOGGER.tracing:
+                            self._trace("redo", line)
                         return self.read(line, nextsiblingeader)
         self._nlines += 1   
         return ReaderExitCode.CONTINUE
     
+    def _trace(self, event, line):
+        parsingroot = self._parsingroot()
+        logger.LOGGER.record(event, None if parsingroot is None else parsingroot._parseline + 1, self.getid(), line)
+    
     def _resolvechildreader(self, line):
+        # the (prototype) reader, only copied when activated
         if (self.acceptchildren and self.getchildreaderresolver() is not None):
-            return deepcopy(self.getchildreaderresolver()(line))
+            if (METRICS.enabled):
+                start = perf_counter_ns()
+                reader = self.getchildreaderresolver()(line)
+                METRICS.record("parser.resolve", perf_counter_ns() - start)
+                return reader
+            return self.getchildreaderresolver()(line)
         else:
             return None
     
     def _stopactivechildreader(self):
         self._activechildreader.stopreading()
+        self._activechildreader._markclean()
         self.getcontent().append(self._activechildreader)
         self._activechildreader = None
     
+    def _parsingroot(self):
+        """
+            The (include) root which is parsing the file this block is read from
+        """
+        node = self
+        while (node is not None and not isinstance(node, RootReader)):
+            node = node.getparent()
+        return node
+    
     def _activatechildreader(self, nextchildreader):
-        self._activechildreader = nextchildreader
-        self._activechildreader.startreading(self.getendlinenumber())   
+        start = perf_counter_ns() if METRICS.enabled else None
+        self._activechildreader = deepcopy(nextchildreader)
+        # the lines read so far (getendlinenumber without counting the whole subtree)
+        self._activechildreader.startreading(self.getstartlinenumber() + self._nlines)
         self._activechildreader._setparent(self)
+        if (start is not None):
+            METRICS.record("parser.activate", perf_counter_ns() - start)
     
     def _hasactivechildreader(self):
         """
@@ -824,11 +1611,11 @@ class BlockReaderBase(INode):
             True if this reader should stop
          
         """
-        hasnextchildreader = self._resolvechildreader(line) is not None
+        functional = self.isfunctionalblock(line)
         if (nextsiblingeader is not None):
-            if (self.isfunctionalblock(line)):
+            if (functional):
                 # Dismiss next reader if a child can handle it
-                if (hasnextchildreader):
+                if (self._resolvechildreader(line) is not None):
                     # refuse next sibling reader if:
                     # 1. current reader insists on preference for childreader over siblingreader
                     # 2. next siblingreader does not want preference
@@ -838,17 +1625,18 @@ class BlockReaderBase(INode):
                        
                 # next block
             return True
-        elif (hasnextchildreader):
+        elif (not functional):
+            # data line (only resolved by the parent for headers), no child reader is resolved for every line
+            return False
+        elif (self._resolvechildreader(line) is not None):
+            return False
+        elif (self.iscomment(line)):
             return False
         else:
-            if (self.iscomment(line)):
-                return False
-            elif (self.isfunctionalblock(line)):
-                # child block without corresponding reader class
-                # Notify missing behaviour
-                self.__notifymissingreader(line)
-                return not self.acceptunimplementedchildren
-        return False
+            # child block without corresponding reader class
+            # Notify missing behaviour
+            self.__notifymissingreader(line)
+            return not self.acceptunimplementedchildren
     
     def isreading(self):
         """
@@ -963,34 +1751,203 @@ class BlockReaderBase(INode):
          ----------
          number : int
             New Start line number
-         nextreader: BlockReaderBase
-            Another reader on the same level (sibling), which wants to take-over parsing
          
          Returns
          -------
-         boolean
-            True if this reader should stop
+         None
          
         """
         self.startlinenumber = number
-        children = {i.getheader().line: i for i in self.getchildren()}
-        for n, l in self.numberedflattencontent():
-            if (l in children.keys()):
-                children[l].updatestartlinenumber(n) 
+        n = number if self.getheader() is None else number + 1
+        for i in self.content:
+            if isinstance(i, INode):
+                i.updatestartlinenumber(n)
+                n += len(i)
+            else:
+                n += 1
     
-    def __notifymissingreader(self, line):
-        if (line.lstrip().startswith("**")):
-            pass
+    def addchild(self, child, after = None, realign = True):
+        """
+         Add a finished block (e.g. created from arrays) as child of this block
+         
+         Parameters
+         ----------
+         child : BlockReaderBase
+            The block to add.
+         after : INode, optional
+            Sibling after which the block is inserted. By default the block is inserted 
+            after the last child of the same type, or else after the last child 
+            (but before a closing line such as *End Part).
+         realign : boolean, optional
+            Realign the line numbers of the tree. The default is True.
+         
+         Returns
+         -------
+         child : BlockReaderBase
+            The added block.
+         
+        """
+        content = self.getcontent()
+        if (after is None):
+            siblings = list(self.getchildren())
+            sametype = [i for i in siblings if type(i) == type(child)]
+            after = sametype[-1] if sametype else (siblings[-1] if siblings else None)
+        if (after is not None):
+            index = next(i for i, x in enumerate(content) if x is after) + 1
+        elif (len(content) > 0 and isinstance(content[-1], str) \
+                and content[-1].lstrip("* ").lower().startswith("end")):
+            index = len(content) - 1
+        else:
+            index = len(content)
+        content.insert(index, child._setparent(self))
+        if (not realign):
+            return child
+        
+        root = self.getroot()
+        if (isinstance(root, RootReader)):
+            root.realignlinenumbers()
+        elif (self.startlinenumber is not None):
+            self.updatestartlinenumber(self.startlinenumber)
+        return child
+    
+    def _state(self):
+        # the header (object and line), compared by reference to the parsed header
+        header = self.getheader()
+        return (header, header.line if isinstance(header, ParameterizedLine) else None)
+    
+    def _markclean(self):
+        """
+            Mark the current state as the parsed (unmodified) state
+        """
+        self._dirty = False
+        self._version = next(_VERSIONS)
+        self._cleanstate = self._state()
+        self._cleanchildren = tuple(self.getchildren())
+        if (self._origin is not None):
+            self._origin = (self._origin[0], self._origin[1], self._nlines)
+    
+    def markdirty(self):
+        """
+         Mark this block as modified. getcontent(), addchild, setdata and the setters of 
+         the blocks do so, only required after assigning the content attribute of a block 
+         directly. Replacing the header or altering it with setproperty is detected automatically.
+         
+         Returns
+         -------
+         self
+        """
+        self._dirty = True
+        self._version = next(_VERSIONS)
+        return self
+    
+    def isdirty(self):
+        """
+         Returns
+         -------
+         boolean
+            True if the header or content of this block (not its children)
+            was (possibly) modified since parsing
+        """
+        return self._dirty or self._cleanstate is None or self._cleanstate != self._state()
+    
+    def ismodified(self):
+        """
+         Returns
+         -------
+         boolean
+            True if this block or any of its children was modified since parsing
+        """
+        return self.isdirty() or any(c.ismodified() for c in self._currentchildren())
+    
+    def _currentchildren(self):
+        # an unmodified block still has the children it was parsed with (without a scan of the content)
+        return self._cleanchildren if not self.isdirty() else tuple(self.getchildren())
+    
+    def _clone(self, parent):
+        dirty = self.isdirty()
+        cp = super()._clone(parent)
+        cp._activechildreader = None
+        if (not dirty):
+            # unmodified (since parsing) like the original
+            cp._cleanstate = cp._state()
+            cp._cleanchildren = tuple(i for i in cp.content if isinstance(i, INode)) if self._cleanchildren else ()
+        return cp
+    
+    def getcontent(self):
+        """
+         The content (lines and children) of this block, to alter: the block is marked as 
+         modified (see markdirty) unless it is being read. Iterate over the content attribute 
+         (or flattencontent) to only read it.
+        """
+        content = super().getcontent()
+        if (not self._isreading):
+            # after materializing arrays (which caches them under the current version)
+            self.markdirty()
+        return content
+    
+    def saveplan(self, withheader = True, valid = None):
+        """
+         Plan to write this block: unmodified blocks are copied from the file they were 
+         parsed from, modified blocks are written (their unmodified children copied).
+         
+         Parameters
+         ----------
+         withheader : boolean, optional
+            Include the header. The default is True.
+         valid : dict, optional
+            {FileOrigin: boolean} memo of valid origins. The default is None.
+         
+         Yields
+         -------
+         tuple
+            ("copy", FileOrigin, first line, amount of lines)
+            ("lines", list of strings)
+            ("write", block)
+        """
+        valid = {} if valid is None else valid
+        if (withheader and self._origin is not None and not self.ismodified()):
+            origin = self._origin[0]
+            if (origin not in valid):
+                valid[origin] = origin.isvalid()
+            if (valid[origin]):
+                yield ("copy",) + self._origin
+                return
+        
+        if (isinstance(self, BlockReaderArrayBase) and self.isarraybacked()):
+            yield ("write", self)
+            return
+        lines = []
+        if (withheader and self.getheader() is not None):
+            lines += [self.getheader() if isinstance(self.getheader(), str) else repr(self.getheader())]
+        for _x in self.content:
+            if isinstance(_x, INode):
+                if (lines):
+                    yield ("lines", lines)
+                lines = []
+                if isinstance(_x, BlockReaderBase):
+                    yield from _x.saveplan(valid = valid)
+                else:
+                    yield ("write", _x)
+            else:
+                lines += [_x if isinstance(_x, str) else repr(_x)]
+        if (lines):
+            yield ("lines", lines)
+    
+    def __notifymissingreader(self, line):
+        log = logger.LOGGER
+        if (log.level < logger.NOTE or line.lstrip().startswith("**")):
+            pass
         elif(self.isfunctionalblock(line)):
             readername = line.lstrip(" * ")
             if ("," in readername):
                 readername = readername.split(",", 1)[0]
-            global MISSING_READER_ALERT
             parentstr = [i.getname() for i in self.upstreamhierarchy()][::-1]
             parentstr = " > ".join(parentstr + [self.getname(), readername])
-            if (parentstr.lower() not in MISSING_READER_ALERT):
-                MISSING_READER_ALERT += [parentstr.lower()]
-                print("NOTE: No explicit reader class defined for {:<40s} at line {:d}".format(parentstr, self.getendlinenumber()))
+            if (parentstr.lower() not in log.missing):
+                log.missing.add(parentstr.lower())
+                parsingroot = self._parsingroot()
+                linenumber = parsingroot._parseline + 1 if parsingroot is not None else self.getendlinenumber()
+                log.note("NOTE: No explicit reader class defined for {:<40s} at line {:d}".format(parentstr, linenumber))
         
     def __len__(self):
         if (self.isreading() and self._activechildreader != None):
@@ -1080,35 +2037,134 @@ class RootReaderOld(INode):
     def __str__(self):
         return "Root"        
 
+def _traceline(root, linenumber, line):
+    logger.LOGGER.record("line", linenumber + 1, root.getid(), line)
+
 class RootReader(BlockReaderBase):
+    __slots__ = ("_originfile", "cwd", "_cache", "_fileorigin", "_parseline", "_observer", "_progress", "_cancel", 
+                 "_deferred")
+    
     def __init__(self, childreaderresolver):
         super().__init__("Root", childreaderresolver = childreaderresolver, 
                             acceptchildren = True)
         self.acceptunimplementedchildren = True
         self._originfile = None
         self.cwd = None             # working directory
-    
-    def parse(self, iterable): 
+        self._cache = {}            # derived data e.g. spatial index {name: (key, value)}
+        self._fileorigin = None     # FileOrigin of the file being/been parsed
+        self._parseline = 0         # line of the file being parsed
+        self._observer = None       # observer of the lines being parsed
+        self._progress = None       # ProgressReporter of the parse
+        self._cancel = None         # CancellationToken of the parse
+        self._deferred = None       # includes left to parse by the caller of the parse (see aio)
+    
+    def parse(self, iterable, observer = None, progress = None, cancel = None): 
+        """
+         Parse lines of text into the tree
+         
+         Parameters
+         ----------
+         iterable : iterable of string or string
+            lines (e.g. file handle) or text.
+         observer : callable, optional
+            observer(root, linenumber, line) called before every line is read, also for the lines 
+            of included files (with the include as root), e.g. a memory profile. The default is None.
+         progress : callable or ProgressReporter, optional
+            progress(Progress) called with the lines and bytes consumed, the path of the current block
+            and the throughput, at most every 0.5 s (see progress.ProgressReporter) and once at the end. 
+            The default is None.
+         cancel : CancellationToken, optional
+            stops the parse before the next line when cancelled, the blocks read so far are closed
+            as at the end of the file. The default is None.
+         
+         Returns
+         -------
+         self
+        """
+        size = 0
         if isinstance(iterable, str):
+            size = len(iterable)
             iterable = iter(iterable.split("\n"))
         
+        observers, state = self._beginparse(observer, progress, cancel, size)
+        if (cancel is not None):
+            for linenumber, line in enumerate(iterable):
+                if (cancel.cancelled):
+                    break
+                self._parseline = linenumber
+                for o in observers:
+                    o(self, linenumber, line)
+                self.read(line, None)
+        elif (observers):
+            for linenumber, line in enumerate(iterable):
+                self._parseline = linenumber
+                for o in observers:
+                    o(self, linenumber, line)
+                self.read(line, None)
+        else:
+            for linenumber, line in enumerate(iterable):
+                self._parseline = linenumber
+                self.read(line, None)
+        self._endparse(state)
+        return self
+    
+    def _beginparse(self, observer = None, progress = None, cancel = None, size = 0):
+        # start reading, returns the observers of every line and the state for _endparse
         if (not self.acceptchildren):
             raise ValueError("Root reader must accept children")
         
         # TODO: ROOT file header support
+        start = perf_counter_ns() if METRICS.enabled else None
         self.startreading(0)
-        for line in iterable:
-            self.read(line, None)
+        self._parseline = -1
+        self._observer = observer
+        self._cancel = cancel
+        toplevel = progress is not None and self.getparent() is None
+        if (progress is not None and not isinstance(progress, ProgressReporter)):
+            progress = ProgressReporter(progress)
+        if (toplevel):
+            progress.start()
+        if (progress is not None):
+            progress.addtotal(self._fileorigin.stamp[0] if self._fileorigin is not None and self._fileorigin.stamp is not None else size)
+        self._progress = progress
+        # the trace mode and observers are checked once per file, not for every line
+        observers = ([_traceline] if logger.LOGGER.tracing else []) + ([observer] if observer is not None else []) \
+                    + ([progress] if progress is not None else [])
+        return observers, (start, toplevel)
+    
+    def _endparse(self, state):
+        # stop reading, the tree is marked as parsed
+        start, toplevel = state
+        progress, cancel = self._progress, self._cancel
+        self._observer = self._progress = self._cancel = None
         self.stopreading()
-        return self
-    
-    def parseinputfile(self, filepath): 
+        if (self._fileorigin is not None):
+            # the amount of lines of the file is unknown when cancelled
+            self._fileorigin.nlines = None if cancel is not None and cancel.cancelled else self._parseline + 1
+        self._markclean()
+        if (toplevel):
+            progress.finish(self)
+        if (start is not None):
+            METRICS.record("parser.file", perf_counter_ns() - start)
+            METRICS.count("parser.lines", self._parseline + 1)
+    
+    def _openfile(self, filepath):
         self._originfile = filepath  
+        self._fileorigin = FileOrigin(filepath)
         self.cwd = os.path.dirname(os.path.realpath(filepath))
+    
+    def parseinputfile(self, filepath, observer = None, progress = None, cancel = None): 
+        self._openfile(filepath)
         with open(filepath, 'r') as fin_handle:
-            self.parse(fin_handle)
+            self.parse(fin_handle, observer = observer, progress = progress, cancel = cancel)
         return self           
     
+    def _clone(self, parent):
+        cp = super()._clone(parent)
+        # derived data is keyed by the blocks of this tree
+        cp._cache = {}
+        return cp
+    
     def getcwd(self):
         """
         Returns
@@ -1118,27 +2174,98 @@ class RootReader(BlockReaderBase):
         """
         return self.cwd
     
+    def getcached(self, name, key, build):
+        """
+        Get derived data cached on the root (e.g. a spatial index), 
+        the data is rebuilt when its key changed
+        
+        Parameters
+        ----------
+        name : hashable
+            name of the data.
+        key : hashable
+            state the data is derived from (e.g. datakeys of the blocks).
+        build : function
+            function without arguments building the data.
+
+        Returns
+        -------
+        any
+            the (cached) data.
+        """
+        cached = self._cache.get(name, None)
+        if (cached is None or cached[0] != key):
+            cached = (key, build())
+            self._cache[name] = cached
+        return cached[1]
+    
     def realignlinenumbers(self):
         if (self.getparent() != None):
             self.getroot().realignlinenumbers()
         else:
             self.updatestartlinenumber(0)
     
-    def savetofile(self, filename):
+    @METRICS.timed("parser.save")
+    def savetofile(self, filename, incremental = False, writeincludes = False):
         """
          Write the data tree to a file
+         
+         Parameters
+         ----------
+         filename : string
+            output file, a bare file name (without directory) is placed in the directory 
+            of the parsed model (getcwd), not the working directory of the process.
+         incremental : boolean, optional
+            Copy the byte ranges of unmodified blocks from the file they were parsed from
+            (when unaltered since). The default is False.
+         writeincludes : boolean, optional
+            Write the content of modified (not inline) includes back to their own files, 
+            i.e. alter the files of the parsed model. Otherwise only their Include lines are 
+            written. The default is False.
         """
   
         filepath = None if any(dirslash in filename for dirslash in ["\\", "/"]) else self.getcwd()
         filename = filename if filename.rstrip().endswith(".inp") else filename + ".inp"
-        fullpath = os.path.join(filepath, filename)
-        with open(fullpath, "w") as outf:
-            outf.write(repr(self))
+        fullpath = filename if filepath is None else os.path.join(filepath, filename)
+        if (not incremental):
+            with open(fullpath, "w", buffering = 1 << 20) as outf:
+                # stream the tree, the text is never built as a whole
+                self.writeto(outf)
+        else:
+            valid = {}
+            writeplan(lambda: self.saveplan(valid = valid), fullpath)
+        
+        includes = self.getmodifiedincludes()
+        if (writeincludes):
+            for include in includes:
+                include.savetofile(incremental = incremental)
+        elif (includes):
+            logger.LOGGER.note("NOTE: modified includes not written (see writeincludes, IncludeReader.setinline): " 
+                               + ", ".join(i.getheader().getproperty("input") for i in includes))
+    
+    def getmodifiedincludes(self):
+        """
+         Returns
+         -------
+         list of IncludeReader
+            (not inline) includes of which the included content was modified
+        """
+        includes = []
+        stack = list(self._currentchildren())
+        while (stack):
+            block = stack.pop(0)
+            if (isinstance(block, IncludeReader) and not block.inline and block.iscontentmodified()):
+                includes.append(block)
+            if (isinstance(block, BlockReaderBase)):
+                stack = list(block._currentchildren()) + stack
+        return includes
         
     def __str__(self):
         return self.getname()        
                
 class IncludeReader(RootReader):
+    __slots__ = ("inline",)
+    
     def __init__(self, childreaderresolver = None, inline = False):
         super().__init__(childreaderresolver)
         self.name = "Include"
@@ -1151,8 +2278,7 @@ class IncludeReader(RootReader):
     
     def read(self, line, nextsiblingeader = None):
         if self.getheader() == None:
-            if LOG_LEVEL >=1:
-                print("INCLUDE", line)
+            logger.LOGGER.note("INCLUDE " + line)
             self.header = ParameterizedLine.fromheader(line)
             infile = self.getheader().getproperty("input")
             if (not os.path.isabs(infile)):
@@ -1161,10 +2287,25 @@ class IncludeReader(RootReader):
                     cwd = os.getcwd()
                 infile = os.path.join(cwd, infile)
             
-            self.parseinputfile(infile)
+            parsingroot = self.getparent()._parsingroot() if self.getparent() is not None else None
+            if (parsingroot is not None and parsingroot._fileorigin is not None):
+                self._origin = (parsingroot._fileorigin, parsingroot._parseline, 1)
+            if (parsingroot is not None and parsingroot._deferred is not None):
+                # parsed by the caller of the parse before the next line
+                self._openfile(infile)
+                parsingroot._deferred.append(self)
+                return ReaderExitCode.DONE
+            start = perf_counter_ns() if METRICS.enabled else None
+            if (parsingroot is not None):
+                self.parseinputfile(infile, observer = parsingroot._observer, progress = parsingroot._progress, 
+                                    cancel = parsingroot._cancel)
+            else:
+                self.parseinputfile(infile)
+            if (start is not None):
+                METRICS.record("parser.include", perf_counter_ns() - start)
             return ReaderExitCode.DONE
         else:
-            return super().read(line, nextsiblingreader)
+            return super().read(line, nextsiblingeader)
     
     def setinline(self, inline):
         """
@@ -1174,15 +2315,74 @@ class IncludeReader(RootReader):
         self.inline = inline
         return self
     
+    def relocate(self, filepath, input = None):
+        """
+            Save the included content to another file (see savetofile) and refer to it 
+            in the Include line by input (by default filepath), the included file is 
+            no longer written
+        """
+        self._originfile = filepath
+        self.getheader().setproperty("input", filepath if input is None else input)
+        return self
+    
     def getchildreaderresolver(self):
         if super().getchildreaderresolver() != None:
             super().getchildreaderresolver()
         else:
             return self.getparent().getchildreaderresolver()
     
-    def savetofile(self):
-        # TODO: support for include modifications
-        raise ValueError("Not yet implemented")
+    def _markclean(self):
+        origin = self._origin
+        super()._markclean()
+        # the origin is the Include line in the parent file
+        self._origin = origin
+    
+    def ismodified(self):
+        if (self.inline):
+            # written as a comment followed by the content
+            return True
+        # only the Include line is written in the parent file
+        return self._cleanstate is None or self._cleanstate != self._state()
+    
+    def iscontentmodified(self):
+        """
+         Returns
+         -------
+         boolean
+            True if the content of the included file was modified since parsing
+            (markdirty marks the content as modified)
+        """
+        return self._dirty or self._cleanstate is None or any(c.ismodified() for c in self._currentchildren())
+    
+    def saveplan(self, withheader = True, valid = None):
+        if (not withheader):
+            # the included content
+            yield from super().saveplan(withheader, valid)
+        elif (self.inline):
+            yield ("write", self)
+        elif (self.ismodified() or self._origin is None):
+            yield ("lines", [self.getheader().getline()] if self.getheader() is not None else [self.__str__()])
+        else:
+            yield from super().saveplan(withheader, valid)
+    
+    def savetofile(self, filename = None, incremental = False):
+        """
+         Write the included content (without the Include line) to a file, 
+         by default back to the included file
+        """
+        filename = self._originfile if filename is None else filename
+        if (filename is None):
+            raise ValueError("[{:^20s}] No file to save to".format(self.getid()))
+        if (incremental):
+            valid = {}
+            writeplan(lambda: self.saveplan(withheader = False, valid = valid), filename)
+        else:
+            with open(filename, "w", buffering = 1 << 20) as outf:
+                header, self.header = self.header, None
+                try:
+                    INode.writeto(self, outf)
+                finally:
+                    self.header = header
     
     def __len__(self):
         # TODO: test with #numberedflattencontent
@@ -1191,21 +2391,19 @@ class IncludeReader(RootReader):
         else:
             return 1
     
-    def __repr__(self):
+    def writeto(self, out, chunk = 65536):
         if (self.inline):
             # make comment instead
-            strarr = ["*" + self.getheader().getline()]
-            for _x in self.getcontent():
-                if isinstance(_x, str):
-                    strarr += [_x.rstrip("\n")]
-                else:
-                    strarr += [repr(_x)]
-            return "\n".join(strarr)
+            writelines(out, ["*" + self.getheader().getline()])
+            header, self.header = self.header, None
+            try:
+                super().writeto(out, chunk)
+            finally:
+                self.header = header
+        elif (self.getheader() is not None):
+            writelines(out, [self.getheader().getline()])
         else:
-            if (self.getheader() is not None):
-                return self.getheader().getline()
-            else:
-                return self.__str__()
+            writelines(out, [self.__str__()])
 
 #--------------------------------------------------------------
 #
@@ -1213,7 +2411,409 @@ class IncludeReader(RootReader):
 #
 #--------------------------------------------------------------
 
-class BlockReaderElement(BlockReaderBase):
+class BlockReaderArrayBase(BlockReaderBase):
+    """
+        BlockReaderBase for functional blocks of which the data lines are plain 
+        numbers (labels, coordinates, connectivity).
+        
+        The block is either backed by its lines of text (as parsed), or by numpy 
+        arrays (when created or altered in bulk). In the latter case the lines of 
+        text are only generated when the content is requested.
+        
+        Abstract: subclasses implement parsedata and iterformatdata.
+    """
+    __slots__ = ("_content", "_data", "_datacache")
+    
+    def __init__(self, name, parent = None, 
+                 acceptchildren = True, acceptunimplementedchildren = True, 
+                 childreaderresolver = None):
+        self._data = None       # arrays backing this block (instead of content)
+        self._datacache = None  # (key, arrays) parsed from content
+        super().__init__(name, parent = parent, acceptchildren = acceptchildren, 
+                         acceptunimplementedchildren = acceptunimplementedchildren, 
+                         childreaderresolver = childreaderresolver)
+    
+    @property
+    def content(self):
+        if (self._data is not None):
+            # materialize, the content list can be altered (through getcontent) from here on
+            self._content = self.formatdata(self._data)
+            self._datacache = (self._datakey(), self._data)
+            self._data = None
+        return self._content
+    
+    @content.setter
+    def content(self, content):
+        self._content = content
+        self._data = None
+        self._datacache = None
+        self.markdirty()
+    
+    def isarraybacked(self):
+        """
+         Returns
+         -------
+         boolean
+            True if the block is backed by arrays instead of lines of text
+         
+        """
+        return self._data is not None
+    
+    def getdata(self):
+        """
+         Get the data of this block as numpy arrays, 
+         parsed arrays are cached until the block is modified (see markdirty)
+        
+         Returns
+         -------
+         numpy.ndarray or tuple of numpy.ndarray
+         
+        """
+        if (self._data is not None):
+            return self._data
+        key = self._datakey()
+        if (self._datacache is None or self._datacache[0] != key):
+            start = perf_counter_ns() if METRICS.enabled else None
+            self._datacache = (key, self.parsedata(list(self._datalines())))
+            if (start is not None):
+                METRICS.record("parser.ingest", perf_counter_ns() - start)
+                METRICS.count("parser.ingest.lines", len(self._content))
+        return self._datacache[1]
+    
+    def getdatakey(self):
+        """
+         Returns
+         -------
+         tuple
+            key which changes when the block is modified (see markdirty)
+            or its header changed (to validate data derived from this block)
+         
+        """
+        return (id(self),) + self._datakey()
+    
+    def _datakey(self):
+        # the header, e.g. generate, changes the meaning of the data lines
+        return (self._version,) + self._state()
+    
+    def setdata(self, data):
+        """
+         Replace the content of this block by arrays
+        
+         Parameters
+         ----------
+         data : numpy.ndarray or tuple of numpy.ndarray
+         
+         Returns
+         -------
+         self
+         
+        """
+        self._content = None
+        self._datacache = None
+        self._data = data
+        return self.markdirty()
+    
+    def _datalines(self):
+        for i in self._content:
+            if isinstance(i, INode):
+                # e.g. include
+                yield from itertools.islice(i.flattencontent(), 1, None)
+            else:
+                yield i
+    
+    def parsedata(self, lines):
+        """
+            Parse the data lines of this block into arrays (abstract)
+        """
+        raise NotImplementedError("{:s} does not implement parsedata".format(type(self).__name__))
+    
+    def formatdata(self, data):
+        """
+            Format arrays into data lines of this block
+        """
+        return [l for text in self.iterformatdata(data) for l in text.split("\n")]
+    
+    def iterformatdata(self, data):
+        """
+            Format arrays into chunks of data lines (joined by newlines) of this block (abstract)
+        """
+        raise NotImplementedError("{:s} does not implement iterformatdata".format(type(self).__name__))
+    
+    def countdatalines(self, data):
+        """
+            Amount of data lines formatdata will produce
+        """
+        return len(self.formatdata(data))
+    
+    def getchildren(self):
+        if (self._data is not None):
+            return iter(())
+        return super().getchildren()
+    
+    def flattencontent(self):
+        if (self._data is None):
+            yield from super().flattencontent()
+        else:
+            yield repr(self.getheader())
+            yield from self.formatdata(self._data)
+    
+    def updatestartlinenumber(self, number):
+        if (self._data is None):
+            super().updatestartlinenumber(number)
+        else:
+            self.startlinenumber = number
+    
+    def __len__(self):
+        if (self._data is None):
+            return super().__len__()
+        return (0 if self.getheader() is None else 1) + self.countdatalines(self._data)
+    
+    def writeto(self, out, chunk = 65536):
+        if (self._data is None):
+            return super().writeto(out, chunk)
+        if (self.getheader() is not None):
+            writelines(out, [repr(self.getheader())])
+        # format the arrays in bulk
+        for text in self.iterformatdata(self._data):
+            out.write(text)
+            out.write("\n")
+
+class LabelSet(object):
+    """
+        Set of labels (nodes or elements) stored as a sorted array of unique labels.
+        
+        Supports set algebra with other LabelSets, Nset/Elset blocks and array_likes:
+            a | b       union
+            a & b       intersection
+            a - b       difference
+            a ^ b       symmetric difference
+        
+        e.g.
+            root = parseinputfile("model.inp")
+            e1, e2 = root.query("Part > Elset[elset=E1|E2]")
+            shared = e1 & e2
+            shared.toelset("SHARED", parent = e1.getparent())
+    """
+    __slots__ = ("labels",)
+    
+    def __init__(self, labels = (), assumeunique = False):
+        """
+        Parameters
+        ----------
+        labels : array_like of int
+            labels.
+        assumeunique : boolean, optional
+            Labels are already sorted and unique. The default is False.
+        """
+        labels = np.asarray(labels, dtype = np.int64).ravel()
+        self.labels = labels if assumeunique else np.unique(labels)
+    
+    @classmethod
+    def union(cls, *sets):
+        """
+        Union of any amount of LabelSets, blocks (e.g. a query result) or array_likes
+        
+        e.g.
+            LabelSet.union(*root.query("** > Elset"))
+        """
+        if (len(sets) == 0):
+            return cls()
+        return cls(np.concatenate([tolabels(i) for i in sets]))
+    
+    def toarray(self):
+        """
+         Returns
+         -------
+         numpy.ndarray
+            sorted unique labels
+        """
+        return self.labels
+    
+    def isdisjoint(self, other):
+        return len(self & other) == 0
+    
+    def issubset(self, other):
+        return len(self - other) == 0
+    
+    def tonset(self, name, parent = None, after = None, **properties):
+        """
+         Create a Nset block of these labels, and add it to parent (if given)
+        """
+        return self._toblock(BlockReaderNset, name, parent, after, properties)
+    
+    def toelset(self, name, parent = None, after = None, **properties):
+        """
+         Create an Elset block of these labels, and add it to parent (if given)
+        """
+        return self._toblock(BlockReaderElset, name, parent, after, properties)
+    
+    def _toblock(self, cls, name, parent, after, properties):
+        block = cls.fromlabels(name, self.labels, **properties)
+        if (parent is not None):
+            parent.addchild(block, after = after)
+        return block
+    
+    def __or__(self, other):
+        return LabelSet(np.union1d(self.labels, tolabels(other)), assumeunique = True)
+    
+    def __and__(self, other):
+        return LabelSet(np.intersect1d(self.labels, tolabels(other), assume_unique = True), assumeunique = True)
+    
+    def __sub__(self, other):
+        return LabelSet(np.setdiff1d(self.labels, tolabels(other), assume_unique = True), assumeunique = True)
+    
+    def __xor__(self, other):
+        return LabelSet(np.setxor1d(self.labels, tolabels(other), assume_unique = True), assumeunique = True)
+    
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+    
+    def __rsub__(self, other):
+        return LabelSet(tolabels(other)) - self
+    
+    def __contains__(self, label):
+        i = np.searchsorted(self.labels, label)
+        return i < len(self.labels) and self.labels[i] == label
+    
+    def __iter__(self):
+        return iter(self.labels.tolist())
+    
+    def __len__(self):
+        return len(self.labels)
+    
+    def __str__(self):
+        return "LabelSet ({:d} labels)".format(len(self))
+    
+    def __repr__(self):
+        return self.__str__()
+
+def tolabels(obj):
+    """
+    Get the labels of a LabelSet, a set block or an array_like
+    
+    Returns
+    -------
+    numpy.ndarray
+        sorted unique labels (for LabelSets and set blocks) or the labels as given
+    """
+    if isinstance(obj, LabelSet):
+        return obj.labels
+    elif isinstance(obj, BlockReaderSetBase):
+        return obj.tolabelset().labels
+    return np.unique(np.asarray(obj, dtype = np.int64).ravel())
+
+class BlockReaderSetBase(BlockReaderArrayBase):
+    """
+        Nset or Elset, backed by a 1D array of labels.
+        Supports the set algebra of LabelSet (|, &, -, ^).
+    """
+    __slots__ = ()
+    
+    setkey = None   # header property holding the name of the set
+    
+    def __init__(self, name, childreaderresolver = None):
+        super().__init__(name = name, childreaderresolver = childreaderresolver,
+                        acceptchildren = True, acceptunimplementedchildren = False)
+    
+    @classmethod
+    def fromlabels(cls, name, labels, **properties):
+        """
+        Create a set block from an array of labels
+        
+        e.g.
+            BlockReaderElset.fromlabels("E1", [1, 2, 3], instance = "PART-1-1")
+
+        Parameters
+        ----------
+        name : string
+            name of the set.
+        labels : array_like of int
+            labels.
+        **properties : 
+            additional header properties.
+
+        Returns
+        -------
+        block : BlockReaderSetBase
+        """
+        block = cls()
+        block.header = ParameterizedLine.fromheader(formatheader(block.getname(), 
+                            OrderedDict([(cls.setkey, name)] + list(properties.items()))))
+        block.startlinenumber = 0
+        return block.setdata(np.asarray(labels, dtype = np.int64).ravel())
+    
+    def getid(self):
+        if (self.getheader() != None):
+            return self.name + ":"+str(self.getheader().getproperty(self.setkey))
+        else:
+            return super().getid()
+    
+    def getsetname(self):
+        return self.getheader().getproperty(self.setkey)
+    
+    def isgenerated(self):
+        return self.getheader() is not None and "generate" in self.getheader().properties
+    
+    def toarray(self):
+        """
+         Returns
+         -------
+         numpy.ndarray
+            labels in order of appearance
+        """
+        return self.getdata()
+    
+    def tolabelset(self):
+        """
+         Returns
+         -------
+         LabelSet
+            sorted unique labels
+        """
+        return LabelSet(self.toarray())
+    
+    def setlabels(self, labels):
+        """
+         Replace the labels of this set (a generated set becomes an explicit set)
+        """
+        if (self.isgenerated()):
+            self.getheader().delproperty("generate")
+        return self.setdata(np.asarray(labels, dtype = np.int64).ravel())
+    
+    def parsedata(self, lines):
+        arr = numbersfromtext(lines, dtype = np.int64)
+        if (self.isgenerated()):
+            # first, last, increment
+            rows = arr.reshape(-1, 3)
+            arr = np.concatenate([np.arange(f, l + 1, inc) for f, l, inc in rows.tolist()] 
+                                 or [np.empty(0, dtype = np.int64)])
+        return arr
+    
+    def iterformatdata(self, data):
+        return iterformatlabels(data)
+    
+    def countdatalines(self, data):
+        return -(-len(data) // 16)
+    
+    def __or__(self, other):
+        return self.tolabelset() | other
+    
+    def __and__(self, other):
+        return self.tolabelset() & other
+    
+    def __sub__(self, other):
+        return self.tolabelset() - other
+    
+    def __xor__(self, other):
+        return self.tolabelset() ^ other
+    
+class BlockReaderElement(BlockReaderArrayBase):
+    """
+        Element block, backed by (labels, connectivity) arrays
+    """
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Element", childreaderresolver = childreaderresolver,
                         acceptchildren = True, acceptunimplementedchildren = False)
@@ -1222,6 +2822,35 @@ class BlockReaderElement(BlockReaderBase):
         return not self.iscomment(line) and \
                line.strip("* ").startswith("Element,") 
     
+    @classmethod
+    def fromarrays(cls, eltype, labels, connectivity, **properties):
+        """
+        Create an element block from arrays, formatted in bulk when written
+        
+        e.g.
+            BlockReaderElement.fromarrays("C3D8", labels, connectivity, elset = "BODY")
+
+        Parameters
+        ----------
+        eltype : string
+            element type.
+        labels : array_like of int
+            element labels [n].
+        connectivity : array_like of int
+            connected node labels [n, nodes per element].
+        **properties : 
+            additional header properties.
+
+        Returns
+        -------
+        block : BlockReaderElement
+        """
+        block = cls()
+        block.header = ParameterizedLine.fromheader(formatheader(block.getname(), 
+                            OrderedDict([("type", eltype)] + list(properties.items()))))
+        block.startlinenumber = 0
+        return block.setarrays(labels, connectivity)
+    
     def getid(self):
         if (self.getheader() != None):
             return self.name + ":"+self.getheader().getproperty("type")
@@ -1230,15 +2859,77 @@ class BlockReaderElement(BlockReaderBase):
     
     def gettype(self):
         return self.getheader().getproperty("type")
+    
+    def toarray(self):
+        """
+         Returns
+         -------
+         tuple : (numpy.ndarray, numpy.ndarray)
+            (element labels [n], connected node labels [n, nodes per element])
+        """
+        return self.getdata()
+    
+    def getlabels(self):
+        return self.getdata()[0]
+    
+    def getconnectivity(self):
+        return self.getdata()[1]
+    
+    def setarrays(self, labels, connectivity):
+        """
+         Replace the elements of this block
+         
+         Parameters
+         ----------
+         labels : array_like of int
+            element labels [n].
+         connectivity : array_like of int
+            connected node labels [n, nodes per element].
+         
+         Returns
+         -------
+         self
+        """
+        labels = np.asarray(labels, dtype = np.int64).ravel()
+        connectivity = np.asarray(connectivity, dtype = np.int64).reshape(len(labels), -1)
+        return self.setdata((labels, connectivity))
+    
+    def parsedata(self, lines):
+        lines = [l for l in lines if not l.lstrip().startswith("**") and l.strip() != ""]
+        if (len(lines) == 0):
+            return (np.empty(0, dtype = np.int64), np.empty((0, 0), dtype = np.int64))
+        if (any(l.rstrip().endswith(",") for l in lines)):
+            # join elements continued on the next line
+            rows = []
+            for l in lines:
+                if (len(rows) > 0 and rows[-1].rstrip().endswith(",")):
+                    rows[-1] = rows[-1].rstrip() + l
+                else:
+                    rows += [l]
+            lines = rows
+        ncols = lines[0].count(",") + 1
+        arr = numbersfromtext(lines, dtype = np.int64).reshape(-1, ncols)
+        return (arr[:, 0].copy(), arr[:, 1:].copy())
+    
+    def iterformatdata(self, data):
+        return iterformatrows(data[0], data[1])
+    
+    def countdatalines(self, data):
+        return len(data[0]) * -(-(1 + data[1].shape[1]) // 16)
         
     def todataframe(self):
-        csvStringIO2 = StringIO("\n".join(self.getcontent()).replace(" ", ""))
-        header = ["element"] + ["n{:d}".format(_i) for _i in range(1, len(self.getcontent()[0].split(",")))]
-        df = pd.read_csv(csvStringIO2, sep=",", header=None, names=header, index_col=0)
-        csvStringIO2.close()
-        return df
+        # pandas is only imported when needed
+        import pandas as pd
+        labels, connectivity = self.toarray()
+        header = ["n{:d}".format(_i) for _i in range(1, connectivity.shape[1] + 1)]
+        return pd.DataFrame(connectivity, index = pd.Index(labels, name = "element"), columns = header)
         
-class BlockReaderNode(BlockReaderBase):
+class BlockReaderNode(BlockReaderArrayBase):
+    """
+        Node block, backed by (labels, coordinates) arrays
+    """
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Node", childreaderresolver = childreaderresolver, 
                         acceptchildren = True, acceptunimplementedchildren = False)
@@ -1247,61 +2938,118 @@ class BlockReaderNode(BlockReaderBase):
         namepart = line.split(",")[0]
         return not self.iscomment(namepart) and \
                namepart.rstrip(" \n").endswith("Node")
+    
+    @classmethod
+    def fromarrays(cls, labels, coordinates, **properties):
+        """
+        Create a node block from arrays, formatted in bulk when written
+        
+        e.g.
+            BlockReaderNode.fromarrays(labels, coordinates, nset = "ALL")
+
+        Parameters
+        ----------
+        labels : array_like of int
+            node labels [n].
+        coordinates : array_like of float
+            coordinates [n, dimensions].
+        **properties : 
+            additional header properties.
+
+        Returns
+        -------
+        block : BlockReaderNode
+        """
+        block = cls()
+        block.header = ParameterizedLine.fromheader(formatheader(block.getname(), properties))
+        block.startlinenumber = 0
+        return block.setarrays(labels, coordinates)
+    
+    def toarray(self):
+        """
+         Returns
+         -------
+         tuple : (numpy.ndarray, numpy.ndarray)
+            (node labels [n], coordinates [n, dimensions])
+        """
+        return self.getdata()
+    
+    def getlabels(self):
+        return self.getdata()[0]
+    
+    def getcoordinates(self):
+        return self.getdata()[1]
+    
+    def setarrays(self, labels, coordinates):
+        """
+         Replace the nodes of this block
+         
+         Parameters
+         ----------
+         labels : array_like of int
+            node labels [n].
+         coordinates : array_like of float
+            coordinates [n, dimensions].
+         
+         Returns
+         -------
+         self
+        """
+        labels = np.asarray(labels, dtype = np.int64).ravel()
+        coordinates = np.asarray(coordinates, dtype = np.float64).reshape(len(labels), -1)
+        return self.setdata((labels, coordinates))
+    
+    def parsedata(self, lines):
+        lines = [l for l in lines if not l.lstrip().startswith("**") and l.strip() != ""]
+        if (len(lines) == 0):
+            return (np.empty(0, dtype = np.int64), np.empty((0, 3), dtype = np.float64))
+        ncols = lines[0].rstrip(" ,").count(",") + 1
+        arr = numbersfromtext(lines, dtype = np.float64).reshape(-1, ncols)
+        return (arr[:, 0].astype(np.int64), arr[:, 1:].copy())
+    
+    def iterformatdata(self, data):
+        return iterformatrows(data[0], data[1], labelfmt = "%7d", valuefmt = "%r")
+    
+    def countdatalines(self, data):
+        return len(data[0])
                 
     def todataframe(self):
-        csvStringIO2 = StringIO("\n".join(self.getcontent()).replace(" ", ""))
-        header = ["node", "x", "y", "z"]
-        df = pd.read_csv(csvStringIO2, sep=",", header=None, names=header, index_col=0)
-        csvStringIO2.close()
-        return df
+        # pandas is only imported when needed
+        import pandas as pd
+        labels, coordinates = self.toarray()
+        header = ["x", "y", "z"][:coordinates.shape[1]]
+        return pd.DataFrame(coordinates, index = pd.Index(labels, name = "node"), columns = header)
+    
+class BlockReaderNset(BlockReaderSetBase):
+    __slots__ = ()
+    
+    setkey = "nset"
     
-class BlockReaderNset(BlockReaderBase):
     def __init__(self, childreaderresolver = None):
-        super().__init__(name = "Nset", childreaderresolver = childreaderresolver,
-                        acceptchildren = True, acceptunimplementedchildren = False)
+        super().__init__(name = "Nset", childreaderresolver = childreaderresolver)
         
     def matchheader(self, line):
         return not self.iscomment(line) and \
                line.strip("* ").startswith("Nset,")   
-    
-    def getid(self):
-        if (self.getheader() != None):
-            return self.name + ":"+self.getheader().getproperty("nset")
-        else:
-            return super().getid()
-
-    def toarray(self):
-        csvStringIO = StringIO(",".join(self.getcontent()).replace("\n", "").replace(" ", ""))
-        arr = pd.read_csv(csvStringIO, sep=",", header=None).T.squeeze().values
-        csvStringIO.close()
-        return arr
         
-    def linkednodes(self, node):
-        if (node == Node):
-            node = self.query("root > Part > Node")
+    def linkednodes(self, node = None):
+        if (node == None):
+            node = next(self.query("root > Part > Node"))
         
         nodes = node.todataframe()
         return nodes.loc[self.toarray(),:]
 
-class BlockReaderElset(BlockReaderBase):
+class BlockReaderElset(BlockReaderSetBase):
+    __slots__ = ()
+    
+    setkey = "elset"
+    
     def __init__(self, childreaderresolver = None):
-        super().__init__(name = "Elset", childreaderresolver = childreaderresolver,
-                acceptchildren = True, acceptunimplementedchildren = False)
+        super().__init__(name = "Elset", childreaderresolver = childreaderresolver)
         
     def matchheader(self, line):
         return not self.iscomment(line) and \
                 line.strip("* ").startswith("Elset,")
-    def getid(self):
-        if (self.getheader() != None):
-            return self.name + ":"+self.getheader().getproperty("elset")
-        else:
-            return super().getid()
-            
-    def toarray(self):
-        csvStringIO = StringIO(",".join(self.getcontent()).replace("\n", "").replace(" ", ""))
-        arr = pd.read_csv(csvStringIO, sep=",", header=None).T.squeeze().values
-        csvStringIO.close()
-        return arr
      
     def linkedelements(self, elements = None):
         if (elements == None):
@@ -1314,6 +3062,8 @@ class BlockReaderElset(BlockReaderBase):
                 yield (elem_df.loc[xs,:], i)    
       
 class BlockReaderSurface(BlockReaderBase):
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Surface", childreaderresolver = childreaderresolver,
                 acceptchildren = True, acceptunimplementedchildren = False)
@@ -1323,6 +3073,8 @@ class BlockReaderSurface(BlockReaderBase):
         return line.startswith("*") and line[1:].startswith("Surface,")    
         
 class BlockReaderDistribution(BlockReaderBase):
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Distribution", childreaderresolver = childreaderresolver,
                         acceptchildren = True, acceptunimplementedchildren = False)
@@ -1332,6 +3084,8 @@ class BlockReaderDistribution(BlockReaderBase):
                 line.strip("* ").startswith("Distribution,")
         
 class BlockReaderMaterial(BlockReaderBase):
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Material", childreaderresolver = childreaderresolver,
                         acceptchildren = True, acceptunimplementedchildren = True)
@@ -1341,6 +3095,8 @@ class BlockReaderMaterial(BlockReaderBase):
         return line.startswith("*") and line[1:].startswith("Material,")  
 
 class SectionChildBase(BlockReaderBase):
+    __slots__ = ()
+    
     def __init__(self, name, acceptchildren = False):
         super().__init__(name = name, acceptchildren = acceptchildren)
         
@@ -1370,14 +3126,20 @@ class SectionChildBase(BlockReaderBase):
                 return _o
             
 class BeamSection(SectionChildBase):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(name = "Beam Section", acceptchildren = False)
 
 class SolidSection(SectionChildBase):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(name = "Solid Section", acceptchildren = False)
     
 class ShellSection(SectionChildBase):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(name = "Shell Section", acceptchildren = False)
      
@@ -1385,6 +3147,8 @@ class BlockReaderSection(BlockReaderBase):
     """"
         TODO: **Section is just an auto-generated comment or a block??
     """
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Section", 
             acceptchildren = True, acceptunimplementedchildren = False, 
@@ -1401,18 +3165,58 @@ class BlockReaderSection(BlockReaderBase):
             return super().getid()
         
 class BlockReaderParameter(BlockReaderBase):
+    __slots__ = ()
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Parameter", childreaderresolver = childreaderresolver,
                     acceptchildren = True, acceptunimplementedchildren = False)
         
     def matchheader(self, line):
         line = line.lstrip()
-        return line.startswith("*") and line[1:].startswith("parameter")
+        return line.startswith("*") and line[1:].lower().startswith("parameter")
+    
+    def getparameters(self):
+        """
+         Returns
+         -------
+         OrderedDict
+            {name: value} of the parameter definitions (name = value) in this block
+        """
+        parameters = OrderedDict()
+        for line in self.content:
+            if (isinstance(line, str) and "=" in line and not line.lstrip().startswith("**")):
+                name, value = line.split("=", 1)
+                parameters[name.strip()] = infernumber(value.strip())
+        return parameters
+    
+    def setparameter(self, name, value):
+        """
+         Set the value of a parameter (name = value), added if not defined in this block
+         
+         Returns
+         -------
+         self
+        """
+        line = "{:s} = {:s}".format(name, str(value))
+        content = self.getcontent()
+        for i, l in enumerate(content):
+            if (isinstance(l, str) and "=" in l and not l.lstrip().startswith("**") 
+                    and l.split("=", 1)[0].strip() == name):
+                content[i] = line
+                self.markdirty()
+                return self
+        content.append(line)
+        root = self.getroot()
+        if (isinstance(root, RootReader)):
+            root.realignlinenumbers()
+        return self
         
 class BlockReaderOrientation(BlockReaderBase):
     """
         http://130.149.89.49:2080/v6.11/books/key/default.htm?startat=ch15abk01.html#usb-kws-morientation
     """
+    __slots__ = ("definedorientation", "rotation", "localdirections")
+    
     def __init__(self, childreaderresolver = None):
         super().__init__(name = "Orientation", childreaderresolver = childreaderresolver,
                         acceptchildren = True, acceptunimplementedchildren = False)
@@ -1426,15 +3230,31 @@ class BlockReaderOrientation(BlockReaderBase):
                 line.strip("* ").startswith("Orientation")
         
     def parameterizeheader(self, line):
-        #TODO: cls instantiator
-        prs = parseheader(line) 
-        header = self.OrientationHeader(line, prs[0])
-        header.properties = prs[1]
-        return header
+        return self.OrientationHeader.fromheader(line)
     
     def getdefinedorientation(self):
         return self.definedorientation
         
+    def setdefinedorientation(self, definedorientation):
+        """
+            Replace the first data line (coordinates or node labels) defining the orientation
+        """
+        definedorientation = tuple(definedorientation)
+        content = self.getcontent()
+        for i, line in enumerate(content):
+            if (isinstance(line, str) and not line.lstrip().startswith("*") and line.strip() != ""):
+                content[i] = " " + ", ".join(map(str, definedorientation))
+                self.markdirty()
+                break
+        self.definedorientation = definedorientation
+        return self
+    
+    def usesnodes(self):
+        """
+            True if the orientation is defined by node labels
+        """
+        return self.getheader().getdefinition().lower() in ["nodes", "offset to nodes"]
+        
     def getrotation(self):
         return self.rotation
     
@@ -1470,8 +3290,10 @@ class BlockReaderOrientation(BlockReaderBase):
         return line
      
     class OrientationHeader(ParameterizedLine):
-        def __init__(self, line, name):
-            super().__init__(line, name)
+        __slots__ = ()
+        
+        def __init__(self, line, name, properties = None):
+            super().__init__(line, name, properties)
     
         def getlocaldirections(self):
             """
@@ -1492,6 +3314,8 @@ class BlockReaderOrientation(BlockReaderBase):
             return self.properties.get("definition", "coordinates")
 
 class BlockReaderAssembly(BlockReaderBase):
+    __slots__ = ("_terminatenextline",)
+    
     def __init__(self, childreaderresolver = None):
         self._terminatenextline = False
         super().__init__(name = "Assembly", 
@@ -1508,7 +3332,7 @@ class BlockReaderAssembly(BlockReaderBase):
         else:
             return super().getid()
     
-    def read(self, line, nextsiblingreader = None):
+    def read(self, line, nextsiblingeader = None):
         if ("end assembly" in line.lower()):
             self.stopreading()
             self.getcontent().append(line)
@@ -1522,6 +3346,8 @@ class BlockReaderAssembly(BlockReaderBase):
         return False
 
 class BlockReaderPart(BlockReaderBase):
+    __slots__ = ("_terminatenextline",)
+    
     def __init__(self, childreaderresolver = None):
         self._terminatenextline = False
         super().__init__(name = "Part", 
@@ -1552,6 +3378,8 @@ class BlockReaderPart(BlockReaderBase):
         return False
 
 class BlockReaderStep(BlockReaderBase):
+    __slots__ = ("_terminatenextline",)
+    
     def __init__(self, childreaderresolver = None):
         self._terminatenextline = False
         super().__init__(name = "Step", 
@@ -1602,48 +3430,97 @@ def __DEFAULT_RESOLVER_BUILDER(readers):
     #print(list(map(lambda x: x.getname(),readers)))
     return lambda x: findreader(readers ,x)
 
-__GENERIC_RESOLVER = __DEFAULT_RESOLVER_BUILDER([
-                            IncludeReader()
-                     ])
-__PART_RESOLVER = __FUSE_RESOLVERS(
-    __DEFAULT_RESOLVER_BUILDER([
-        BlockReaderNode(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderElement(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderNset(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderElset(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderSurface(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderMaterial(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderDistribution(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderSection(childreaderresolver = __FUSE_RESOLVERS(__GENERIC_RESOLVER,
-                                                                __DEFAULT_RESOLVER_BUILDER([
-                                                                        SolidSection(),
-                                                                        ShellSection(),
-                                                                        BeamSection(),                                                             
-                                                                    ])
-                                                                )),
-        BlockReaderParameter(childreaderresolver = __GENERIC_RESOLVER),
-        BlockReaderOrientation(childreaderresolver = __GENERIC_RESOLVER),
-    ]),
-    __GENERIC_RESOLVER
-)
-
-__ASSEMBLY_RESOLVER = __PART_RESOLVER
-
-DEFAULT_RESOLVER = __FUSE_RESOLVERS(
-    __DEFAULT_RESOLVER_BUILDER([
-        BlockReaderAssembly(childreaderresolver = __PART_RESOLVER),
-        BlockReaderPart(childreaderresolver = __ASSEMBLY_RESOLVER),
-        BlockReaderStep(childreaderresolver = __GENERIC_RESOLVER),
-    ]),
-    __PART_RESOLVER
-)
-
-def parseinputfile(infile, childreaderresolver = DEFAULT_RESOLVER):
-    return RootReader(childreaderresolver).parseinputfile(infile)
+def __BUILD_DEFAULT_RESOLVER():
+    __GENERIC_RESOLVER = __DEFAULT_RESOLVER_BUILDER([
+                                IncludeReader()
+                         ])
+    __PART_RESOLVER = __FUSE_RESOLVERS(
+        __DEFAULT_RESOLVER_BUILDER([
+            BlockReaderNode(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderElement(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderNset(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderElset(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderSurface(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderMaterial(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderDistribution(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderSection(childreaderresolver = __FUSE_RESOLVERS(__GENERIC_RESOLVER,
+                                                                    __DEFAULT_RESOLVER_BUILDER([
+                                                                            SolidSection(),
+                                                                            ShellSection(),
+                                                                            BeamSection(),                                                             
+                                                                        ])
+                                                                    )),
+            BlockReaderParameter(childreaderresolver = __GENERIC_RESOLVER),
+            BlockReaderOrientation(childreaderresolver = __GENERIC_RESOLVER),
+        ]),
+        __GENERIC_RESOLVER
+    )
+
+    __ASSEMBLY_RESOLVER = __PART_RESOLVER
+
+    return __FUSE_RESOLVERS(
+        __DEFAULT_RESOLVER_BUILDER([
+            BlockReaderAssembly(childreaderresolver = __PART_RESOLVER),
+            BlockReaderPart(childreaderresolver = __ASSEMBLY_RESOLVER),
+            BlockReaderStep(childreaderresolver = __GENERIC_RESOLVER),
+        ]),
+        __PART_RESOLVER
+    )
+
+__DEFAULT_RESOLVERS = []    # built on first use
+
+def getdefaultresolver():
+    """
+        The resolver of the default reader classes, the reader prototypes 
+        are only created on first use (not when importing)
+    """
+    if (not __DEFAULT_RESOLVERS):
+        __DEFAULT_RESOLVERS.append(__BUILD_DEFAULT_RESOLVER())
+    return __DEFAULT_RESOLVERS[0]
 
-if __name__ == "__main__":
-    infile = os.path.join(codedir,'../v13/MUSC_HEALTHY.inp')
-    #infile = os.path.join(codedir,'./TEST_TEMPLATES/SIMPLE_INCLUDE.txt')
+def DEFAULT_RESOLVER(line):
+    return getdefaultresolver()(line)
+
+def parseinputfile(infile, childreaderresolver = DEFAULT_RESOLVER, observer = None, progress = None, cancel = None):
+    return RootReader(childreaderresolver).parseinputfile(infile, observer = observer, progress = progress, cancel = cancel)
+
+class _ParserModule(type(sys)):
+    """
+        The parser module, with the deprecated module globals LOG_LEVEL and MISSING_READER_ALERT 
+        forwarded to the logger (logger.LOGGER) they were replaced by
+    """
+    @property
+    @annotations.deprecated(reason = "use logger.LOGGER.level and logger.LOGGER.setlevel")
+    def LOG_LEVEL(self):
+        return logger.LOGGER.level
     
-    root = parseinputfile(infile)
-    #print("\n".join(map(str, root.query("**"))))
\ No newline at end of file
+    @LOG_LEVEL.setter
+    @annotations.deprecated(reason = "use logger.LOGGER.setlevel")
+    def LOG_LEVEL(self, level):
+        logger.LOGGER.setlevel(level)
+    
+    @property
+    @annotations.deprecated(reason = "use logger.LOGGER.missing")
+    def MISSING_READER_ALERT(self):
+        # the notified blocks without reader class (lower case), now a set
+        return logger.LOGGER.missing
+    
+    @MISSING_READER_ALERT.setter
+    @annotations.deprecated(reason = "use logger.LOGGER.reset")
+    def MISSING_READER_ALERT(self, alerted):
+        logger.LOGGER.missing = set(i for i in alerted if i is not None)
+
+sys.modules[__name__].__class__ = _ParserModule
+
+if __name__ == "__main__":
+    import argparse
+    argparser = argparse.ArgumentParser(description = "Parse a .inp file and print its tree")
+    argparser.add_argument("infile", help = ".inp file")
+    argparser.add_argument("--query", default = None, help = "print the blocks matching a query instead (see INode.query)")
+    args = argparser.parse_args()
+    
+    root = parseinputfile(args.infile)
+    if (args.query is None):
+        root.printchildren()
+    else:
+        print("\n".join(map(str, root.query(args.query))))
@@ -0,0 +1,120 @@
+from time import perf_counter
+
+class Progress(object):
+    """
+        Snapshot of a parse passed to the progress callback
+    """
+    __slots__ = ("bytes", "lines", "total", "path", "elapsed", "linespersecond", "mbpersecond", "done")
+
+    def __init__(self, bytes, lines, total, path, elapsed, done = False):
+        self.bytes = bytes          # characters consumed (bytes for ascii files), includes counted
+        self.lines = lines          # lines consumed, includes counted
+        self.total = total          # size of the files opened so far (0 if unknown)
+        self.path = path            # ids of the blocks being read, e.g. "Part > Element"
+        self.elapsed = elapsed      # seconds since the start of the parse
+        self.linespersecond = lines / elapsed if elapsed > 0 else 0.
+        self.mbpersecond = bytes / elapsed / 1e6 if elapsed > 0 else 0.
+        self.done = done            # last report, the parse finished or was cancelled
+
+    @property
+    def fraction(self):
+        """
+            Fraction of the opened files consumed, None if the size is unknown
+        """
+        return min(self.bytes / self.total, 1.) if self.total > 0 else None
+
+    def __str__(self):
+        fraction = self.fraction
+        return "{:s}{:d} lines, {:.1f} MB, {:.0f} lines/s, {:.2f} MB/s{:s}".format(
+                    "" if fraction is None else "{:5.1f}% ".format(100 * fraction),
+                    self.lines, self.bytes / 1e6, self.linespersecond, self.mbpersecond,
+                    "" if self.done else " @ " + self.path)
+
+class ProgressReporter(object):
+    """
+        Observer of a parse (see RootReader.parse) counting the lines and characters consumed
+        and calling callback(Progress) at most once every interval seconds.
+
+        The clock is only read once every `every` lines and the path of the current block
+        only built when reporting, counting a line costs an addition and a comparison.
+        A plain callable passed as progress to the parser is wrapped in a ProgressReporter.
+
+        e.g.
+            root = parseinputfile("model.inp", progress = print)
+    """
+    __slots__ = ("callback", "interval", "every", "bytes", "lines", "total", "_start", "_last", "_countdown")
+
+    def __init__(self, callback, interval = 0.5, every = 4096):
+        self.callback = callback
+        self.interval = interval
+        self.every = every
+        self.bytes = 0
+        self.lines = 0
+        self.total = 0
+        self._start = None
+        self._last = None
+        self._countdown = every
+
+    def start(self, total = 0):
+        self.bytes = self.lines = 0
+        self.total = total
+        self._start = self._last = perf_counter()
+        self._countdown = self.every
+        return self
+
+    def addtotal(self, size):
+        """
+            Add the size of an opened (include) file
+        """
+        self.total += size
+
+    def __call__(self, root, linenumber, line):
+        self.lines += 1
+        self.bytes += len(line)
+        self._countdown -= 1
+        if (self._countdown <= 0):
+            self._countdown = self.every
+            now = perf_counter()
+            if (now - self._last >= self.interval):
+                self._last = now
+                self.callback(self.snapshot(root))
+
+    def finish(self, root):
+        self.callback(self.snapshot(root, done = True))
+
+    def snapshot(self, root, done = False):
+        return Progress(self.bytes, self.lines, self.total, _readingpath(root),
+                        perf_counter() - self._start, done)
+
+def _readingpath(root):
+    # ids of the blocks being read, from the topmost root
+    node = root.getroot()
+    ids = []
+    while (node._activechildreader is not None):
+        node = node._activechildreader
+        ids.append(node.getid())
+    return " > ".join(ids)
+
+class CancellationToken(object):
+    """
+        Stops a parse (see RootReader.parse) before its next line when cancelled,
+        e.g. from another thread or a progress callback.
+
+        The blocks read so far are closed as at the end of a file: the partial tree
+        is consistent and can be queried and saved, it ends at the last line read.
+
+        e.g.
+            token = CancellationToken()
+            root = parseinputfile("model.inp", cancel = token,
+                                  progress = lambda p: p.elapsed > 60 and token.cancel())
+            if (token.cancelled):
+                ...
+    """
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        return self
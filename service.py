@@ -0,0 +1,256 @@
+"""
+    Long-running worker keeping parsed models in memory: requests (one json object per line)
+    are answered over a unix socket or stdin/stdout against the warm trees of an LRU pool.
+
+    Usage:
+        python service.py --socket /tmp/dotinp.sock [--pool 4]
+        python service.py --stdin
+
+    Requests:
+        {"op": "load", "file": "model.inp"}
+        {"op": "query", "file": "model.inp", "query": "Part > Elset"}
+        {"op": "deletesets", "file": "model.inp", "sets": ["Part > Elset[elset=E1]"]}     # deletable elements and nodes
+        {"op": "deletesets", "file": "model.inp", "sets": [...], "output": "out.inp"}    # save without the sets
+        {"op": "export", "file": "model.inp", "dirpath": "model_arrays"}
+        {"op": "stats"}, {"op": "evict", "file": "model.inp"}, {"op": "shutdown"}
+    Responses:
+        {"id": <id of the request>, "ok": true, "result": ...} or {"id": ..., "ok": false, "error": "..."}
+"""
+import os, sys
+import io
+import json
+import socket
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+
+try:
+    from . import logger
+    from .parser import parseinputfile, IncludeReader, DEFAULT_RESOLVER
+    from .operations import deletesets
+    from .columnar import exportarrays
+    from .metrics import METRICS
+except ImportError:
+    import logger
+    from parser import parseinputfile, IncludeReader, DEFAULT_RESOLVER
+    from operations import deletesets
+    from columnar import exportarrays
+    from metrics import METRICS
+
+def fingerprint(filepath):
+    """
+        (real path, size, modification time) of a file
+    """
+    stat = os.stat(filepath)
+    return (os.path.realpath(filepath), stat.st_size, stat.st_mtime_ns)
+
+class ModelPool(object):
+    """
+        Parsed models keyed by the fingerprint of their file, the least recently used
+        model is evicted beyond maxsize models. A model is parsed again when its file
+        or one of its included files changed.
+
+        The trees are shared by all requests: operations altering a tree work on a clone.
+    """
+    __slots__ = ("maxsize", "childreaderresolver", "hits", "misses", "_models", "_lock")
+
+    def __init__(self, maxsize = 4, childreaderresolver = DEFAULT_RESOLVER):
+        self.maxsize = maxsize
+        self.childreaderresolver = childreaderresolver
+        self.hits = 0
+        self.misses = 0
+        self._models = OrderedDict()    # {fingerprint: (root, FileOrigins of the includes)}
+        self._lock = threading.RLock()
+
+    def get(self, filepath):
+        """
+            The parsed model of a file (parsed if not in the pool or changed since)
+        """
+        key = fingerprint(filepath)
+        with self._lock:
+            entry = self._models.get(key, None)
+            if (entry is not None and all(origin.isvalid() for origin in entry[1])):
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            root = parseinputfile(filepath, self.childreaderresolver)
+            includes = [b._fileorigin for b in root.flatten() if isinstance(b, IncludeReader) and b._fileorigin is not None]
+            self.evict(filepath)
+            self._models[key] = (root, includes)
+            while (len(self._models) > self.maxsize):
+                self._models.popitem(last = False)
+            return root
+
+    def evict(self, filepath):
+        """
+            Remove all models of a file from the pool, returns the amount removed
+        """
+        path = os.path.realpath(filepath)
+        with self._lock:
+            keys = [k for k in self._models if k[0] == path]
+            for k in keys:
+                del self._models[k]
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {"models": [k[0] for k in self._models], "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+def _blockinfo(block):
+    header = block.getheader()
+    return {"id": block.getid(), "header": header if header is None or isinstance(header, str) else repr(header),
+            "line": block.getstartlinenumber()}
+
+def _load(pool, request):
+    root = pool.get(request["file"])
+    return {"blocks": sum(1 for _ in root.flatten())}
+
+def _query(pool, request):
+    root = pool.get(request["file"])
+    return [_blockinfo(b) for b in root.query(request["query"])]
+
+def _deletesets(pool, request):
+    tree = pool.get(request["file"]).clone()
+    sets = [b for query in request["sets"] for b in tree.query(query)]
+    if (not sets):
+        raise KeyError("No sets match {:s}".format(", ".join(request["sets"])))
+    output = request.get("output", None)
+    if (output is None):
+        elements, nodes = deletesets(sets, tree, dodelete = False)
+        return {"elements": len(elements), "nodes": len(nodes)}
+    deletesets(sets, tree)
+    # the pooled model's files (and includes) are never written
+    tree.savetofile(os.path.abspath(output), incremental = False, writeincludes = False)
+    return {"output": output}
+
+def _export(pool, request):
+    root = pool.get(request["file"])
+    exportarrays(root, request["dirpath"])
+    return {"dirpath": request["dirpath"]}
+
+def _stats(pool, request):
+    return pool.stats()
+
+def _evict(pool, request):
+    return {"evicted": pool.evict(request["file"])}
+
+OPERATIONS = {
+    "load": _load,
+    "query": _query,
+    "deletesets": _deletesets,
+    "export": _export,
+    "stats": _stats,
+    "evict": _evict,
+}
+
+def handle(pool, request):
+    """
+        Answer a request (dict), errors are reported in the response
+
+        Returns
+        -------
+        dict
+            {"id", "ok", "result"} or {"id", "ok", "error"}.
+    """
+    response = {"id": request.get("id", None) if isinstance(request, dict) else None, "ok": True}
+    try:
+        operation = OPERATIONS.get(request["op"], None)
+        if (operation is None):
+            raise ValueError("Unknown operation {!r}".format(request["op"]))
+        # the trees are not thread safe, requests are answered one at a time
+        with pool._lock, METRICS.timer("service." + request["op"]):
+            response["result"] = operation(pool, request)
+    except Exception as e:
+        response["ok"] = False
+        response["error"] = "{:s}: {!s}".format(type(e).__name__, e)
+    return response
+
+def serve(pool, fin, fout):
+    """
+        Answer requests (json lines) from fin on fout until a shutdown request or the end of fin
+    """
+    for line in fin:
+        if (not line.strip()):
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            request, response = {}, {"id": None, "ok": False, "error": "ValueError: " + str(e)}
+        else:
+            if (isinstance(request, dict) and request.get("op", None) == "shutdown"):
+                fout.write(json.dumps({"id": request.get("id", None), "ok": True, "result": None}) + "\n")
+                fout.flush()
+                return True
+            response = handle(pool, request)
+        fout.write(json.dumps(response) + "\n")
+        fout.flush()
+    return False
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # line by line, a text wrapper would block reading ahead
+        rfile = (line.decode("utf-8") for line in iter(self.rfile.readline, b""))
+        wfile = io.TextIOWrapper(self.wfile, encoding = "utf-8", write_through = True)
+        if (serve(self.server.pool, rfile, wfile)):
+            threading.Thread(target = self.server.shutdown, daemon = True).start()
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serveunix(socketpath, pool):
+    """
+        Answer the requests of clients connecting to a unix socket until a shutdown request
+    """
+    if (os.path.exists(socketpath)):
+        os.remove(socketpath)
+    with _Server(socketpath, _Handler) as server:
+        server.pool = pool
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socketpath)
+
+def request(socketpath, op, **kwargs):
+    """
+    Send a request to a worker listening on a unix socket
+
+    e.g.
+        request("/tmp/dotinp.sock", "query", file = "model.inp", query = "Part > Elset")
+
+    Raises
+    ------
+    RuntimeError
+        with the error reported by the worker.
+
+    Returns
+    -------
+    result of the request.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socketpath)
+        with client.makefile("rwb") as stream:
+            stream.write((json.dumps(dict(kwargs, op = op)) + "\n").encode("utf-8"))
+            stream.flush()
+            response = json.loads(stream.readline().decode("utf-8"))
+    if (not response["ok"]):
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Worker answering requests against parsed models kept in memory")
+    transport = argparser.add_mutually_exclusive_group(required = True)
+    transport.add_argument("--socket", default = None, help = "unix socket to listen on")
+    transport.add_argument("--stdin", action = "store_true", help = "answer requests from stdin on stdout")
+    argparser.add_argument("--pool", type = int, default = 4, help = "amount of models kept in memory")
+    args = argparser.parse_args()
+
+    # stdout carries the responses
+    logger.setlogger(logger.Logger(out = lambda message: print(message, file = sys.stderr)))
+    pool = ModelPool(args.pool)
+    if (args.stdin):
+        serve(pool, sys.stdin, sys.stdout)
+    else:
+        serveunix(args.socket, pool)
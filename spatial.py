@@ -0,0 +1,380 @@
+import itertools
+import numpy as np
+
+try:
+    from .parser import LabelSet, RootReader, BlockReaderNode, BlockReaderElement
+    from .tree import scopeof, namekey
+except ImportError:
+    from parser import LabelSet, RootReader, BlockReaderNode, BlockReaderElement
+    from tree import scopeof, namekey
+
+# large odd multipliers to hash integer cell coordinates
+_HASH_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype = np.uint64)
+
+class GridIndex(object):
+    """
+        Spatial index of points (e.g. node coordinates), hashing the points
+        into a uniform grid of cubic cells.
+
+        Points are sorted by cell, so that all points in a cell (or a range of cells)
+        are found with a binary search instead of comparing all points (O(n log n) instead of O(n²)).
+    """
+    def __init__(self, points, cellsize):
+        """
+        Parameters
+        ----------
+        points : array_like of float
+            coordinates [n, dimensions].
+        cellsize : float
+            edge length of a grid cell.
+        """
+        self.points = np.asarray(points, dtype = np.float64)
+        if (self.points.ndim == 1):
+            self.points = self.points.reshape(-1, 1)
+        if (cellsize <= 0):
+            raise ValueError("Cell size must be positive")
+        self.cellsize = float(cellsize)
+
+        n, dim = self.points.shape
+        self.origin = self.points.min(axis = 0) if n > 0 else np.zeros(dim)
+        self.cells = self.tocells(self.points)
+        keys = self.encode(self.cells)
+        self.order = np.argsort(keys, kind = "stable")
+        self.keys = keys[self.order]
+        self.cells = self.cells[self.order]
+
+    def tocells(self, points):
+        """
+            Integer cell coordinates [n, dimensions] of points
+        """
+        return np.floor((np.asarray(points, dtype = np.float64) - self.origin) / self.cellsize).astype(np.int64)
+
+    def encode(self, cells):
+        """
+            Hash key per cell, different cells can share a key (which only adds 
+            candidates that are filtered by distance)
+        """
+        cells = np.asarray(cells, dtype = np.int64).astype(np.uint64)
+        return (cells * _HASH_MULTIPLIERS[:cells.shape[1]]).sum(axis = 1, dtype = np.uint64)
+
+    def pairs(self, tolerance = None, chunk = 1000000):
+        """
+        Find all pairs of points within tolerance of each other
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            maximum distance, at most the cell size. The default is the cell size.
+        chunk : int, optional
+            amount of points processed at once (bounds memory). The default is 1000000.
+
+        Returns
+        -------
+        tuple : (numpy.ndarray, numpy.ndarray)
+            indices (i, j) of the points of each pair, with i < j.
+
+        """
+        tolerance = self.cellsize if tolerance is None else tolerance
+        if (tolerance > self.cellsize):
+            raise ValueError("Tolerance cannot exceed the cell size")
+        n, dim = self.points.shape
+        sortedpoints = self.points[self.order]
+
+        # neighbouring cells in one half space (and the cell itself), each pair is found once
+        offsets = [o for o in itertools.product([-1, 0, 1], repeat = dim)
+                   if next((x for x in o if x != 0), 1) > 0]
+
+        found_i, found_j = [], []
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            idx = np.arange(start, stop)
+            for offset in offsets:
+                neighbourkeys = self.keys[start:stop] if not any(offset) \
+                                else self.encode(self.cells[start:stop] + np.asarray(offset, dtype = np.int64))
+                lo = np.searchsorted(self.keys, neighbourkeys, side = "left")
+                hi = np.searchsorted(self.keys, neighbourkeys, side = "right")
+                if (not any(offset)):
+                    # same cell, only points after this point
+                    lo = np.maximum(lo, idx + 1)
+                counts = np.maximum(hi - lo, 0)
+                total = int(counts.sum())
+                if (total == 0):
+                    continue
+                # candidate pairs (i, j) in one go
+                i = np.repeat(idx, counts)
+                j = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+                dist = np.linalg.norm(sortedpoints[i] - sortedpoints[j], axis = 1)
+                within = dist <= tolerance
+                found_i += [i[within]]
+                found_j += [j[within]]
+
+        if (len(found_i) == 0):
+            return np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64)
+        i = self.order[np.concatenate(found_i)]
+        j = self.order[np.concatenate(found_j)]
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        # cells sharing a hash key can yield a pair twice
+        _, first = np.unique(i * n + j, return_index = True)
+        return i[first], j[first]
+
+    def clusters(self, tolerance = None):
+        """
+        Group points that are (transitively) within tolerance of each other
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            maximum distance, at most the cell size. The default is the cell size.
+
+        Returns
+        -------
+        numpy.ndarray
+            per point the index of the representative (lowest index) point of its group.
+
+        """
+        i, j = self.pairs(tolerance)
+        return connectedcomponents(len(self.points), i, j)
+
+def connectedcomponents(n, i, j):
+    """
+    Connected components of a graph given by its edges (i, j),
+    by vectorized label propagation with pointer jumping
+
+    Parameters
+    ----------
+    n : int
+        amount of vertices.
+    i, j : numpy.ndarray
+        vertices of each edge.
+
+    Returns
+    -------
+    numpy.ndarray
+        per vertex the lowest vertex of its component.
+
+    """
+    rep = np.arange(n, dtype = np.int64)
+    if (len(i) == 0):
+        return rep
+    while True:
+        low = np.minimum(rep[i], rep[j])
+        previous = rep.copy()
+        np.minimum.at(rep, i, low)
+        np.minimum.at(rep, j, low)
+        # pointer jumping
+        while True:
+            jumped = rep[rep]
+            if (np.array_equal(jumped, rep)):
+                break
+            rep = jumped
+        if (np.array_equal(rep, previous)):
+            return rep
+
+class MeshIndex(object):
+    """
+        Spatial index of the nodes and element centroids of a single part (labels are only 
+        unique within a part), for selecting nodes/elements by geometry. 
+        
+        The results are LabelSets and can be added to the tree directly, e.g.:
+            index = meshindex(part)
+            index.nodesinbox((0, 0, 0), (1, 1, 1)).tonset("BOX", parent = part)
+            index.elementsbyplane((0, 0, 0), (0, 0, 1)).toelset("TOP", parent = part)
+    """
+    def __init__(self, nodeblocks, elementblocks):
+        """
+        Parameters
+        ----------
+        nodeblocks : list of BlockReaderNode
+            ..
+        elementblocks : list of BlockReaderElement
+            ..
+        """
+        arrays = [b.toarray() for b in nodeblocks]
+        labels = np.concatenate([a[0] for a in arrays] or [np.empty(0, dtype = np.int64)])
+        coordinates = np.concatenate([_pad3(a[1]) for a in arrays] or [np.empty((0, 3))])
+        order = np.argsort(labels, kind = "stable")
+        self.nodelabels = labels[order]
+        self.nodecoordinates = coordinates[order]
+        self.nodeorder = np.argsort(self.nodecoordinates[:, 0], kind = "stable") # sorted along x
+        self.nodex = self.nodecoordinates[self.nodeorder, 0]
+        
+        self.elementlabels = []
+        self.elementnodes = []      # indices into the node arrays, -1 for missing nodes
+        centroids = []
+        for b in elementblocks:
+            elabels, connectivity = b.toarray()
+            idx = np.minimum(np.searchsorted(self.nodelabels, connectivity), max(len(self.nodelabels) - 1, 0))
+            found = (self.nodelabels[idx] == connectivity) if len(self.nodelabels) > 0 else np.zeros(connectivity.shape, dtype = bool)
+            idx = np.where(found, idx, -1)
+            xyz = np.where(found[:, :, None], self.nodecoordinates[np.maximum(idx, 0)] if len(self.nodelabels) > 0 else 0.0, np.nan)
+            self.elementlabels += [elabels]
+            self.elementnodes += [idx]
+            centroids += [np.nanmean(xyz, axis = 1) if connectivity.shape[1] > 0 else np.full((len(elabels), 3), np.nan)]
+        self.centroids = np.concatenate(centroids or [np.empty((0, 3))])
+        self.centroidlabels = np.concatenate(self.elementlabels or [np.empty(0, dtype = np.int64)])
+        self.centroidorder = np.argsort(self.centroids[:, 0], kind = "stable")
+        self.centroidx = self.centroids[self.centroidorder, 0]
+    
+    def _inbox(self, points, order, x, lo, hi):
+        # candidates by a binary search along x, then filter on the other axes
+        i0, i1 = np.searchsorted(x, lo[0], side = "left"), np.searchsorted(x, hi[0], side = "right")
+        candidates = order[i0:i1]
+        p = points[candidates]
+        return candidates[np.all((p >= lo) & (p <= hi), axis = 1)]
+    
+    def _insphere(self, points, order, x, center, radius):
+        candidates = self._inbox(points, order, x, center - radius, center + radius)
+        return candidates[np.linalg.norm(points[candidates] - center, axis = 1) <= radius]
+    
+    def _byplane(self, points, point, normal, tolerance):
+        return np.flatnonzero((points - point) @ normal >= -tolerance)
+    
+    def _elements(self, nodemask, mode):
+        """
+            Element labels selected by the selected nodes (mode "all" or "any")
+        """
+        selected = []
+        for labels, idx in zip(self.elementlabels, self.elementnodes):
+            hit = np.where(idx >= 0, nodemask[np.maximum(idx, 0)], False)
+            selected += [labels[hit.all(axis = 1) if mode == "all" else hit.any(axis = 1)]]
+        return LabelSet(np.concatenate(selected or [np.empty(0, dtype = np.int64)]))
+    
+    def _select(self, nodeselector, centroidselector, mode):
+        if (mode == "centroid"):
+            return LabelSet(self.centroidlabels[centroidselector()])
+        elif (mode in ["all", "any"]):
+            mask = np.zeros(len(self.nodelabels), dtype = bool)
+            mask[nodeselector()] = True
+            return self._elements(mask, mode)
+        raise ValueError("Unknown mode: " + str(mode))
+    
+    def nodesinbox(self, lower, upper):
+        """
+        Nodes inside the axis aligned box [lower, upper] (inclusive)
+
+        Returns
+        -------
+        LabelSet
+            node labels.
+        """
+        lower, upper = _pad3(lower), _pad3(upper)
+        return LabelSet(self.nodelabels[self._inbox(self.nodecoordinates, self.nodeorder, self.nodex, lower, upper)])
+    
+    def nodesinsphere(self, center, radius):
+        """
+        Nodes inside the sphere (inclusive)
+
+        Returns
+        -------
+        LabelSet
+            node labels.
+        """
+        center = _pad3(center)
+        return LabelSet(self.nodelabels[self._insphere(self.nodecoordinates, self.nodeorder, self.nodex, center, radius)])
+    
+    def nodesbyplane(self, point, normal, tolerance = 0.0):
+        """
+        Nodes on the side of the plane the normal points to (or on the plane within tolerance)
+
+        Returns
+        -------
+        LabelSet
+            node labels.
+        """
+        return LabelSet(self.nodelabels[self._byplane(self.nodecoordinates, _pad3(point), _pad3(normal), tolerance)])
+    
+    def elementsinbox(self, lower, upper, mode = "centroid"):
+        """
+        Elements inside the axis aligned box [lower, upper] (inclusive)
+        
+        Parameters
+        ----------
+        mode : string, optional
+            "centroid"  : the centroid of the element is inside,
+            "all"       : all nodes of the element are inside,
+            "any"       : any node of the element is inside.
+            The default is "centroid".
+
+        Returns
+        -------
+        LabelSet
+            element labels.
+        """
+        lower, upper = _pad3(lower), _pad3(upper)
+        return self._select(lambda: self._inbox(self.nodecoordinates, self.nodeorder, self.nodex, lower, upper),
+                            lambda: self._inbox(self.centroids, self.centroidorder, self.centroidx, lower, upper), mode)
+    
+    def elementsinsphere(self, center, radius, mode = "centroid"):
+        """
+        Elements inside the sphere (inclusive), see elementsinbox for mode
+
+        Returns
+        -------
+        LabelSet
+            element labels.
+        """
+        center = _pad3(center)
+        return self._select(lambda: self._insphere(self.nodecoordinates, self.nodeorder, self.nodex, center, radius),
+                            lambda: self._insphere(self.centroids, self.centroidorder, self.centroidx, center, radius), mode)
+    
+    def elementsbyplane(self, point, normal, tolerance = 0.0, mode = "centroid"):
+        """
+        Elements on the side of the plane the normal points to, see elementsinbox for mode
+
+        Returns
+        -------
+        LabelSet
+            element labels.
+        """
+        point, normal = _pad3(point), _pad3(normal)
+        return self._select(lambda: self._byplane(self.nodecoordinates, point, normal, tolerance),
+                            lambda: self._byplane(self.centroids, point, normal, tolerance), mode)
+
+def _pad3(arr):
+    """
+        Pad coordinates of 1D/2D models to 3D
+    """
+    arr = np.asarray(arr, dtype = np.float64)
+    if (arr.shape[-1] < 3):
+        pad = [(0, 0)] * (arr.ndim - 1) + [(0, 3 - arr.shape[-1])]
+        arr = np.pad(arr, pad)
+    return arr
+
+def meshindex(block):
+    """
+    Get the spatial index of the nodes and elements below block (e.g. a part, or the root 
+    of a model with a single part), cached on the root until a Node/Element block below block 
+    is altered, added or removed (the cache is keyed by the datakeys of the blocks, see getdatakey)
+
+    Parameters
+    ----------
+    block : INode
+        part, or root.
+
+    Raises
+    ------
+    ValueError
+        if the nodes and elements below block belong to more than one part.
+
+    Returns
+    -------
+    MeshIndex
+    """
+    nodeblocks, elementblocks, scopes = [], [], set()
+    for b in block.flatten():
+        if isinstance(b, BlockReaderNode):
+            nodeblocks += [b]
+        elif isinstance(b, BlockReaderElement):
+            elementblocks += [b]
+        else:
+            continue
+        scopes.add(namekey(scopeof(b)))
+    if (len(scopes) > 1):
+        raise ValueError("Nodes and elements of several parts ({:s}), labels are only unique within a part: "
+                         "index a single part".format(", ".join(sorted(s or "model" for s in scopes))))
+    key = tuple(b.getdatakey() for b in nodeblocks + elementblocks)
+    build = lambda: MeshIndex(nodeblocks, elementblocks)
+    root = block.getroot()
+    if isinstance(root, RootReader):
+        return root.getcached(("meshindex", id(block)), key, build)
+    return build()
@@ -0,0 +1,4 @@
+import os, sys
+
+# the modules import each other absolutely when not imported as a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
@@ -0,0 +1,34 @@
+import asyncio
+from parser import parseinputfile
+from aio import parseinputfileasync, savetofileasync
+
+MODEL = """*Heading
+*Part, name=P
+*Include, input=nodes.inp
+*Nset, nset=A
+1, 2
+*End Part
+"""
+
+def _write(tmp_path):
+    (tmp_path / "nodes.inp").write_text("*Node\n" + "".join("{:d}, {:d}., 0., 0.\n".format(i, i) for i in range(1, 100)))
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    return str(path)
+
+def test_parse_as_sync(tmp_path):
+    path = _write(tmp_path)
+    # small chunks and yields: lines split over chunks, includes parsed in between
+    root = asyncio.run(parseinputfileasync(path, chunksize = 7, yieldevery = 3, ingest = True))
+    assert repr(root) == repr(parseinputfile(path))
+    assert next(root.query("Part > Include > Node")).toarray()[0].tolist() == list(range(1, 100))
+
+def test_concurrent_parse_and_save(tmp_path):
+    path = _write(tmp_path)
+    async def _run():
+        roots = await asyncio.gather(*(parseinputfileasync(path, yieldevery = 1) for _ in range(3)))
+        await savetofileasync(roots[0], str(tmp_path / "out.inp"))
+        return roots
+    roots = asyncio.run(_run())
+    assert len({repr(r) for r in roots}) == 1
+    assert (tmp_path / "out.inp").read_text() == MODEL
@@ -0,0 +1,62 @@
+from parser import parseinputfile
+from assignment import sectionassignment
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 1., 1., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+7, 1, 3
+*Elset, elset=E1
+1, 2, 7
+** Section: Section-1
+*Solid Section, elset=E1, material=MAT1
+,
+*End Part
+*Material, name=MAT1
+"""
+
+def _parse(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    return parseinputfile(str(path))
+
+def test_inplace_node_edit(tmp_path):
+    root = _parse(tmp_path)
+    node = next(root.query("Part > Node"))
+    assert node.toarray()[1][1].tolist() == [1., 0., 0.]
+    key = node.getdatakey()
+    node.getcontent()[1] = "2, 5., 5., 5."
+    assert node.getdatakey() != key
+    assert node.toarray()[1][1].tolist() == [5., 5., 5.]
+
+def test_inplace_elset_edit(tmp_path):
+    root = _parse(tmp_path)
+    part = next(root.query("Part"))
+    elset = next(part.query("Elset"))
+    assert elset.toarray().tolist() == [1, 2, 7]
+    assert sectionassignment(part).materialsof([1, 7]).tolist() == ["MAT1", "MAT1"]
+    elset.getcontent()[0] = "2"
+    assert elset.toarray().tolist() == [2]
+    assert sectionassignment(part).materialsof([1, 2, 7]).tolist() == [None, "MAT1", None]
+
+def test_generate_changes_data(tmp_path):
+    root = _parse(tmp_path)
+    elset = next(root.query("Part > Elset"))
+    assert elset.toarray().tolist() == [1, 2, 7]
+    elset.getheader().setproperty("generate")
+    # first, last, increment
+    assert elset.toarray().tolist() == [1]
+
+def test_inplace_edit_of_array_backed_block(tmp_path):
+    root = _parse(tmp_path)
+    node = next(root.query("Part > Node"))
+    labels, coordinates = node.toarray()
+    node.setarrays(labels, coordinates + 10.)
+    # the lines are formatted from the arrays, then edited
+    node.getcontent()[0] = "1, 0., 0., 0."
+    assert node.toarray()[1][0].tolist() == [0., 0., 0.]
@@ -0,0 +1,59 @@
+from parser import parseinputfile
+from assignment import sectionassignment
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 1., 1., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+3, 1, 3
+4, 3, 1
+*Elset, elset=E1
+1, 2
+*Elset, elset=E2
+2, 3
+*Orientation, name=O1
+1., 0., 0., 0., 1., 0.
+** Section: Section-1
+*Solid Section, elset=E1, material=STEEL
+,
+** Section: Section-2
+*Solid Section, elset=e2, material=IRON, orientation=O1
+,
+*End Part
+*Material, name=STEEL
+*Material, name=IRON
+"""
+
+def _parse(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    return parseinputfile(str(path))
+
+def test_assignment(tmp_path):
+    part = next(_parse(tmp_path).query("Part"))
+    assignment = sectionassignment(part)
+    assert assignment.materialsof([1, 2, 3, 4, 5]).tolist() == ["STEEL", "IRON", "IRON", None, None]
+    assert assignment.orientationsof([1, 3]).tolist() == [None, "O1"]
+    # element 2 is in both elsets, the last section holds
+    assert assignment.overlaps.tolist() == [2]
+    assert assignment.elementsof(material = "iron").tolist() == [2, 3]
+    sections = list(part.query("** > Solid Section"))
+    assert assignment.sectionsof([1, 4]).tolist() == [sections[0], None]
+    assert assignment.elementsof(section = sections[0]).tolist() == [1]
+    assert set(assignment.materialblocks) == {"STEEL", "IRON"}
+
+def test_cache(tmp_path):
+    root = _parse(tmp_path)
+    part = next(root.query("Part"))
+    assignment = sectionassignment(part)
+    assert sectionassignment(part) is assignment
+    next(part.query("Elset[elset=E2]")).setlabels([4])
+    updated = sectionassignment(part)
+    assert updated is not assignment and updated.materialsof([3, 4]).tolist() == [None, "IRON"]
+    next(part.query("** > Solid Section")).getheader().setproperty("material", "IRON")
+    assert sectionassignment(part).materialsof([1]).tolist() == ["IRON"]
@@ -0,0 +1,52 @@
+import numpy as np
+from parser import parseinputfile
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+*Nset, nset=A
+1
+*End Part
+*Step, name=S1
+*Static
+*End Step
+"""
+
+def _parse(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    return parseinputfile(str(path))
+
+def test_clone_is_parentless_copy(tmp_path):
+    root = _parse(tmp_path)
+    clone = root.clone()
+    assert repr(clone) == repr(root)
+    assert [b.getid() for b in clone.flatten()] == [b.getid() for b in root.flatten()]
+    part = next(clone.query("Part"))
+    assert part.getroot() is clone and part is not next(root.query("Part"))
+
+def test_edits_of_clone_leave_base(tmp_path):
+    root = _parse(tmp_path)
+    text = repr(root)
+    clone = root.clone()
+    node = next(clone.query("Part > Node"))
+    labels, coordinates = node.toarray()
+    node.setarrays(labels, coordinates + 1.)
+    next(clone.query("Step")).getheader().setproperty("nlgeom", "YES")
+    next(clone.query("Part > Nset")).getcontent()[0] = "2"
+    next(clone.query("Part")).getcontent().pop()
+    assert repr(root) == text
+    assert next(root.query("Part > Node")).toarray()[1].tolist() == [[0., 0., 0.], [1., 0., 0.]]
+    assert next(root.query("Part > Nset")).toarray().tolist() == [1]
+    assert not any(b.isdirty() for b in root.flatten())
+    assert repr(next(clone.query("Step")).getheader()) == "*Step, name=S1, nlgeom=YES"
+
+def test_edits_of_base_leave_clone(tmp_path):
+    root = _parse(tmp_path)
+    clone = root.clone()
+    next(root.query("Part > Nset")).setlabels(np.array([1, 2]))
+    next(root.query("Step")).getheader().setproperty("name", "S2")
+    assert next(clone.query("Part > Nset")).toarray().tolist() == [1]
+    assert next(clone.query("Step")).getheader().getproperty("name") == "S1"
@@ -0,0 +1,75 @@
+import numpy as np
+from parser import parseinputfile, BlockReaderAssembly
+from columnar import exportarrays, loadarrays, importarrays
+
+MODEL = """*Heading
+*Part, name=A
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 1., 1., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*Nset, nset=N
+1, 2
+*Elset, elset=E, generate
+1, 2, 1
+*End Part
+*Assembly, name=Assembly
+*Instance, name=A-1, part=A
+1., 0., 0.
+*End Instance
+*Nset, nset=S, instance=A-1
+3
+*Elset, elset=T, internal, instance=A-1
+2
+*End Assembly
+"""
+
+def _parse(tmp_path, text, name = "model.inp"):
+    path = tmp_path / name
+    path.write_text(text)
+    return parseinputfile(str(path))
+
+def test_export_and_load(tmp_path):
+    root = _parse(tmp_path, MODEL)
+    exportarrays(root, str(tmp_path / "arrays"))
+    arrays = loadarrays(str(tmp_path / "arrays"))
+    labels, coordinates = arrays["A"]["nodes"]
+    assert labels.tolist() == [1, 2, 3] and coordinates.shape == (3, 3)
+    assert arrays["A"]["elements"]["T3D2"][1].tolist() == [[1, 2], [2, 3]]
+    # generate sets are exported expanded
+    assert arrays["A"]["elsets"]["E"].tolist() == [1, 2] and arrays["A"]["elsetproperties"]["E"] == {}
+    assert arrays["Assembly"]["container"] == "Assembly"
+    assert arrays["Assembly"]["nsetproperties"]["S"] == {"instance": "A-1"}
+
+def test_round_trip_with_assembly(tmp_path):
+    root = _parse(tmp_path, MODEL)
+    exportarrays(root, str(tmp_path / "arrays"))
+    imported = _parse(tmp_path, "*Heading\n", "empty.inp")
+    importarrays(imported, str(tmp_path / "arrays"))
+    assembly = next(imported.query("Assembly"))
+    assert isinstance(assembly, BlockReaderAssembly) and not list(imported.query("Part[name=Assembly]"))
+    nset = next(assembly.query("Nset"))
+    assert nset.getheader().getproperty("instance") == "A-1" and nset.toarray().tolist() == [3]
+    elset = next(assembly.query("Elset"))
+    assert "internal" in elset.getheader().properties and elset.getheader().getproperty("instance") == "A-1"
+    
+    # written and parsed again, the model has the same meaning
+    out = tmp_path / "out.inp"
+    imported.savetofile(str(out))
+    reparsed = parseinputfile(str(out))
+    assert "*Instance, name=A-1, part=A" in next(reparsed.query("Assembly")).content
+    assert next(reparsed.query("Assembly > Nset")).getheader().getline() == "*Nset, nset=S, instance=A-1"
+    assert next(reparsed.query("Part[name=A] > Elset")).toarray().tolist() == [1, 2]
+    assert np.array_equal(next(reparsed.query("Part[name=A] > Node")).getcoordinates(), 
+                          next(root.query("Part[name=A] > Node")).getcoordinates())
+
+def test_import_into_existing_part(tmp_path):
+    root = _parse(tmp_path, MODEL)
+    exportarrays(next(root.query("Part")), str(tmp_path / "arrays"))
+    target = _parse(tmp_path, "*Heading\n*Part, name=A\n*End Part\n", "target.inp")
+    blocks = importarrays(target, str(tmp_path / "arrays"))
+    assert len(list(target.query("Part"))) == 1 and len(blocks) == 4
+    assert next(target.query("Part > Nset")).toarray().tolist() == [1, 2]
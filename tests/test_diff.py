@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from parser import parseinputfile
+from diff import diff, HEADER, ADDED, REMOVED, LABELS, CONTENT
+
+V1 = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 2., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*Nset, nset=A
+1, 2
+*Elset, elset=E
+1
+*End Part
+*Step, name=S1
+*Static
+*End Step
+"""
+
+V2 = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 5., 0.
+4, 3., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*Nset, nset=A
+1, 2, 4
+*Nset, nset=B
+4
+*End Part
+*Step, name=S1, nlgeom=YES
+*Static
+*End Step
+"""
+
+def _parse(tmp_path, text, name):
+    path = tmp_path / name
+    path.write_text(text)
+    return parseinputfile(str(path))
+
+def _changes(patch):
+    return {(c.kind, c.getpathname()): c for c in patch}
+
+def test_identical_trees(tmp_path):
+    a = _parse(tmp_path, V1, "v1.inp")
+    assert len(diff(a, a.clone())) == 0
+    assert len(diff(a, _parse(tmp_path, V1, "copy.inp"))) == 0
+
+def test_header_and_blocks(tmp_path):
+    patch = diff(_parse(tmp_path, V1, "v1.inp"), _parse(tmp_path, V2, "v2.inp"))
+    changes = _changes(patch)
+    assert changes[(HEADER, "Step:S1")].data["new"] == "*Step, name=S1, nlgeom=YES"
+    assert (ADDED, "Part:P > Nset:B") in changes
+    assert (REMOVED, "Part:P > Elset:E") in changes
+
+def test_array_content(tmp_path):
+    changes = _changes(diff(_parse(tmp_path, V1, "v1.inp"), _parse(tmp_path, V2, "v2.inp")))
+    nodes = changes[(LABELS, "Part:P > Node")].data
+    assert nodes["added"].tolist() == [4] and nodes["removed"].tolist() == [3]
+    assert nodes["modified"].tolist() == [2] and nodes["modifiedrows"].tolist() == [[1., 5., 0.]]
+    nset = changes[(LABELS, "Part:P > Nset:A")].data
+    assert nset["added"].tolist() == [4] and nset["removed"].tolist() == []
+    # unchanged blocks are not reported
+    assert not any("Element" in path for _, path in changes)
+
+def test_apply_to_base(tmp_path):
+    a, b = _parse(tmp_path, V1, "v1.inp"), _parse(tmp_path, V2, "v2.inp")
+    patched = diff(a, b).apply(a.clone())
+    assert len(diff(patched, b)) == 0
+    labels, coordinates = next(patched.query("Part > Node")).toarray()
+    assert labels.tolist() == [1, 2, 4] and coordinates[1].tolist() == [1., 5., 0.]
+    # the base is left unaltered
+    assert len(diff(a, _parse(tmp_path, V1, "copy.inp"))) == 0
+
+def test_apply_to_other_tree(tmp_path):
+    patch = diff(_parse(tmp_path, V1, "v1.inp"), _parse(tmp_path, V2, "v2.inp"))
+    # a variant of the base: another step header and another node
+    other = _parse(tmp_path, V1.replace("*Step, name=S1", "*Step, name=S1, inc=100")
+                               .replace("3, 2., 0., 0.", "3, 2., 0., 0.\n5, 9., 9., 9."), "other.inp")
+    patch.apply(other)
+    # the header differs from the old header: only the changed properties are set
+    assert repr(next(other.query("Step")).getheader()) == "*Step, name=S1, inc=100, nlgeom=YES"
+    labels, coordinates = next(other.query("Part > Node")).toarray()
+    assert labels.tolist() == [1, 2, 5, 4] and coordinates[1].tolist() == [1., 5., 0.]
+    assert not list(other.query("Part > Elset")) and next(other.query("Part > Nset[nset=B]")).toarray().tolist() == [4]
+
+def test_apply_conflicts(tmp_path):
+    patch = diff(_parse(tmp_path, V1, "v1.inp"), _parse(tmp_path, V2, "v2.inp"))
+    # the node modified by the patch does not exist
+    other = _parse(tmp_path, V1.replace("2, 1., 0., 0.\n", "").replace("1, 1, 2\n2, 2, 3", "2, 1, 3"), "other.inp")
+    with pytest.raises(ValueError):
+        patch.apply(other)
+    # a changed block does not exist
+    with pytest.raises(KeyError):
+        patch.apply(_parse(tmp_path, V1.replace("*Step, name=S1", "*Step, name=S2"), "renamed.inp"))
+
+def test_content_lines(tmp_path):
+    a = _parse(tmp_path, V1, "v1.inp")
+    b = _parse(tmp_path, V1.replace("*Static", "*Static\n0.1, 1."), "v2.inp")
+    changes = _changes(diff(a, b))
+    assert [k for k, _ in changes] == [CONTENT]
+    patched = diff(a, b).apply(a.clone())
+    assert len(diff(patched, b)) == 0
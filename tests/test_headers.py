@@ -0,0 +1,25 @@
+from parser import parseinputfile, ParameterizedLine
+
+def test_properties_are_parsed_on_access():
+    header = ParameterizedLine.fromheader("*Nset, nset=N1, generate")
+    assert not header.isparameterized()
+    assert header.getproperty("nset") == "N1" and header.properties["generate"] is None
+    assert header.isparameterized()
+
+def test_setproperty_keeps_the_text_of_other_properties():
+    header = ParameterizedLine.fromheader("*Part, name=007, scale=1.0E+05")
+    header.setproperty("scale", 2)
+    assert header.getline() == "*Part, name=007, scale=2"
+    header.setproperty("internal")
+    assert header.getline() == "*Part, name=007, scale=2, internal"
+    header.delproperty("scale")
+    assert header.getline() == "*Part, name=007, internal"
+
+def test_incremental_save_after_setproperty(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text("*Heading\n*Step, name=007, amplitude=1.0E+05\n*Static\n*End Step\n")
+    root = parseinputfile(str(path))
+    next(root.query("Step")).getheader().setproperty("nlgeom", "YES")
+    out = tmp_path / "out.inp"
+    root.savetofile(str(out), incremental = True)
+    assert "*Step, name=007, amplitude=1.0E+05, nlgeom=YES" in out.read_text().splitlines()
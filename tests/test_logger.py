@@ -0,0 +1,40 @@
+import pytest
+import parser
+import logger
+from parser import parseinputfile
+
+MODEL = "*Heading\n*Unknown Keyword\n1, 2\n*Unknown Keyword\n3, 4\n"
+
+@pytest.fixture
+def notes():
+    previous = logger.LOGGER
+    collected = []
+    logger.setlogger(logger.Logger(out = collected.append))
+    yield collected
+    logger.setlogger(previous)
+
+def test_missing_reader_noted_once(tmp_path, notes):
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    parseinputfile(str(path))
+    assert len(notes) == 1 and "Unknown Keyword" in notes[0]
+
+def test_trace_records_lines(tmp_path, notes):
+    logger.LOGGER.setlevel(logger.TRACE)
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    parseinputfile(str(path))
+    assert [e[1] for e in logger.LOGGER.gettrace() if e[0] == "line"] == [1, 2, 3, 4, 5]
+
+def test_deprecated_globals_forward_to_logger(notes):
+    with pytest.warns(DeprecationWarning):
+        parser.LOG_LEVEL = logger.SILENT
+    assert logger.LOGGER.level == logger.SILENT
+    with pytest.warns(DeprecationWarning):
+        assert parser.LOG_LEVEL == logger.SILENT
+    logger.LOGGER.missing.add("root > unknown")
+    with pytest.warns(DeprecationWarning):
+        assert "root > unknown" in parser.MISSING_READER_ALERT
+    with pytest.warns(DeprecationWarning):
+        parser.MISSING_READER_ALERT = [None]
+    assert logger.LOGGER.missing == set()
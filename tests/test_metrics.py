@@ -0,0 +1,22 @@
+import time
+from metrics import METRICS
+from annotations import timeit
+
+def test_timeit_records_only_when_enabled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(time, "perf_counter_ns", lambda: calls.append(1) or 0)
+    
+    @timeit
+    def f(x):
+        return x + 1
+    
+    METRICS.disable()
+    assert f(1) == 2 and calls == []
+    METRICS.enable()
+    try:
+        METRICS.reset()
+        assert f(2) == 3 and len(calls) == 2
+        assert METRICS.summary()["timers"]["f"]["count"] == 1
+    finally:
+        METRICS.disable()
+        METRICS.reset()
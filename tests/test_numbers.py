@@ -0,0 +1,25 @@
+import itertools
+from parser import infernumber, infernumbers
+
+TOKENS = ["1", " 2", "3e2", "2.5", "1.0", "-0", "+.5e1", ".5", "5.", "1e-400", "9.3e18", "1e300",
+          "nan", "-nan", "inf", "-inf", "infinity", "1e400", "", " ", "ALL", "e5", "1e", "--1", "1 2", "0x10"]
+
+def _agree(tokens, explicit):
+    batch = infernumbers(tokens, explicit)
+    batch = batch.tolist() if hasattr(batch, "tolist") else batch
+    single = [infernumber(t, explicit) for t in tokens]
+    # the same values, strings where infernumber gives strings
+    return len(batch) == len(single) and all(isinstance(a, str) == isinstance(b, str) and a == b
+                                             for a, b in zip(batch, single))
+
+def test_infernumbers_agrees_with_infernumber():
+    for n in (1, 2, 3):
+        for tokens in itertools.product(TOKENS, repeat = n):
+            for explicit in (False, True):
+                assert _agree(list(tokens), explicit), (tokens, explicit)
+
+def test_infernumbers_arrays():
+    assert infernumbers(["1", " 2", "3e2"]).dtype.kind == "i"
+    assert infernumbers(["1", "2.5"]).dtype.kind == "f"
+    assert infernumbers(["1", "2.0"], explicit = True).dtype.kind == "f"
+    assert infernumbers(["1", "nan"]) == [1, "nan"]
@@ -0,0 +1,174 @@
+from parser import parseinputfile
+from operations import renumber, merge, mergecoincidentnodes
+
+PART = """*Part, name={name}
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 1., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 1, 3
+*Nset, nset=N
+2, 3
+*End Part
+"""
+
+RENUMBER = """*Heading
+*Part, name=A
+*Node
+10, 0., 0., 0.
+20, 1., 0., 0.
+*Element, type=T3D2
+5, 10, 20
+*Nset, nset=N
+10, 20
+*End Part
+*Part, name=B
+*Node
+5, 0., 0., 0.
+10, 1., 0., 0.
+30, 2., 0., 0.
+*Element, type=T3D2
+5, 5, 10
+7, 10, 30
+*Elset, elset=E
+7
+*End Part
+*Assembly, name=Assembly
+*Instance, name=B-1, part=B
+*End Instance
+*Nset, nset=S, instance=B-1
+10, 30
+*Elset, elset=T, instance=B-1
+5, 7
+*End Assembly
+"""
+
+def test_renumber_per_part(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(RENUMBER)
+    root = parseinputfile(str(path))
+    renumber(root, compact = True)
+    # each part is compacted to 1..N with its own map
+    assert next(root.query("Part[name=A] > Node")).getlabels().tolist() == [1, 2]
+    assert next(root.query("Part[name=A] > Element")).toarray()[1].tolist() == [[1, 2]]
+    assert next(root.query("Part[name=A] > Nset")).toarray().tolist() == [1, 2]
+    assert next(root.query("Part[name=B] > Node")).getlabels().tolist() == [1, 2, 3]
+    labels, connectivity = next(root.query("Part[name=B] > Element")).toarray()
+    assert labels.tolist() == [1, 2] and connectivity.tolist() == [[1, 2], [2, 3]]
+    assert next(root.query("Part[name=B] > Elset")).toarray().tolist() == [2]
+    # the sets of the instance follow part B
+    assert next(root.query("Assembly > Nset")).toarray().tolist() == [2, 3]
+    assert next(root.query("Assembly > Elset")).toarray().tolist() == [1, 2]
+
+def test_renumber_part_updates_instance_sets(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(RENUMBER)
+    root = parseinputfile(str(path))
+    (oldnodes, newnodes), _ = renumber(next(root.query("Part[name=B]")), nodeoffset = 100)
+    assert oldnodes.tolist() == [5, 10, 30] and newnodes.tolist() == [105, 110, 130]
+    assert next(root.query("Assembly > Nset")).toarray().tolist() == [110, 130]
+    assert next(root.query("Part[name=A] > Node")).getlabels().tolist() == [10, 20]
+    assert next(root.query("Part[name=A] > Nset")).toarray().tolist() == [10, 20]
+
+def test_merge_per_part(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text("*Heading\n" + PART.format(name = "A") + PART.format(name = "B")
+                    + "*Assembly, name=Assembly\n*Instance, name=A-1, part=A\n*End Instance\n"
+                    + "*Nset, nset=S, instance=A-1\n3\n*End Assembly\n")
+    root = parseinputfile(str(path))
+    removed, kept = mergecoincidentnodes(root)
+    # node 3 of each part merges into node 2 of the same part
+    assert removed.tolist() == [3, 3] and kept.tolist() == [2, 2]
+    for part in root.query("Part"):
+        assert next(part.query("Node")).getlabels().tolist() == [1, 2]
+        assert next(part.query("Element")).toarray()[1].tolist() == [[1, 2], [1, 2]]
+        assert next(part.query("Nset")).toarray().tolist() == [2]
+    assert next(root.query("Assembly > Nset")).toarray().tolist() == [2]
+
+def test_merge_part_only(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text("*Heading\n" + PART.format(name = "A") + PART.format(name = "B"))
+    root = parseinputfile(str(path))
+    removed, kept = mergecoincidentnodes(next(root.query("Part[name=B]")))
+    assert removed.tolist() == [3]
+    assert next(root.query("Part[name=A] > Node")).getlabels().tolist() == [1, 2, 3]
+
+BASE = """*Heading
+*Part, name=A
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+*Nset, nset=N
+1, 2
+*End Part
+*Assembly, name=Assembly
+*Instance, name=A-1, part=A
+*End Instance
+*Nset, nset=S, instance=A-1
+1
+*End Assembly
+"""
+
+OTHER = """*Heading
+*Part, name=A
+*Node
+1, 5., 0., 0.
+2, 6., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+*Nset, nset=N
+2
+*End Part
+*Part, name=B
+*Node
+1, 0., 0., 0.
+*End Part
+*Assembly, name=Assembly
+*Instance, name=A-1, part=A
+*End Instance
+*Instance, name=B-1, part=B
+0., 0., 1.
+*End Instance
+*Nset, nset=S, instance=A-1
+2
+*Nset, nset=T, instance=B-1
+1
+*Surface, type=NODE, name=SURF
+A-1.N, 1.
+*End Assembly
+"""
+
+def test_merge_models_with_assemblies(tmp_path):
+    (tmp_path / "base.inp").write_text(BASE)
+    (tmp_path / "other.inp").write_text(OTHER)
+    root, other = parseinputfile(str(tmp_path / "base.inp")), parseinputfile(str(tmp_path / "other.inp"))
+    merge(root, other, prefix = "O_")
+    assembly = next(root.query("Assembly"))
+    out = tmp_path / "out.inp"
+    root.savetofile("out.inp")
+    lines = out.read_text().splitlines()
+    lines = lines[lines.index("*Assembly, name=Assembly"):]
+    # the added part gets its instance, the merged part keeps the instance of root
+    assert "*Instance, name=B-1, part=B" in lines and lines.count("*Instance, name=A-1, part=A") == 1
+    assert lines.index("*Instance, name=B-1, part=B") < lines.index("*Nset, nset=T, instance=B-1")
+    # the sets of the merged part follow its label offset and the renamed set
+    sets = {str(b.getsetname()): b for b in assembly.query("Nset")}
+    assert sets["S"].toarray().tolist() == [1]
+    assert sets["O_S"].getheader().getproperty("instance") == "A-1" and sets["O_S"].toarray().tolist() == [4]
+    assert sets["T"].getheader().getproperty("instance") == "B-1" and sets["T"].toarray().tolist() == [1]
+    assert "A-1.O_N, 1." in lines
+    # other is left unaltered
+    other.savetofile("other2.inp")
+    assert (tmp_path / "other2.inp").read_text().splitlines() == OTHER.splitlines()
+
+def test_merge_part_only_model_gets_default_instance(tmp_path):
+    (tmp_path / "base.inp").write_text(BASE)
+    (tmp_path / "other.inp").write_text("*Heading\n" + PART.format(name = "C"))
+    root = parseinputfile(str(tmp_path / "base.inp"))
+    merge(root, parseinputfile(str(tmp_path / "other.inp")))
+    lines = next(root.query("Assembly")).content
+    assert lines.index("*Instance, name=C-1, part=C") < lines.index("*End Assembly")
@@ -0,0 +1,65 @@
+from parser import parseinputfile, BlockReaderNset
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+*Nset, nset=A
+1
+*End Part
+"""
+
+def _parse(tmp_path, text = MODEL, name = "model.inp"):
+    path = tmp_path / name
+    path.write_text(text)
+    return parseinputfile(str(path))
+
+def test_remove_and_add_set(tmp_path):
+    root = _parse(tmp_path)
+    part = next(root.query("Part"))
+    nset = next(part.query("Nset"))
+    part.getcontent().remove(nset)
+    part.addchild(BlockReaderNset.fromlabels("B", [1]))
+    assert part.isdirty()
+    for incremental in (True, False):
+        out = tmp_path / "out.inp"
+        root.savetofile(str(out), incremental = incremental)
+        text = out.read_text()
+        assert "nset=B" in text and "nset=A" not in text
+
+def test_inplace_line_edit(tmp_path):
+    root = _parse(tmp_path)
+    node = next(root.query("Part > Node"))
+    node.getcontent()[1] = "2, 5., 5., 5."
+    assert node.isdirty()
+    out = tmp_path / "out.inp"
+    root.savetofile(str(out), incremental = True)
+    assert "2, 5., 5., 5." in out.read_text()
+
+def test_inplace_line_edit_of_clone(tmp_path):
+    root = _parse(tmp_path)
+    clone = root.clone()
+    nset = next(clone.query("Part > Nset"))
+    nset.getcontent()[0] = "2"
+    assert not next(root.query("Part > Nset")).isdirty()
+    out = tmp_path / "out.inp"
+    clone.savetofile(str(out), incremental = True)
+    assert out.read_text().splitlines()[6] == "2"
+
+def test_unmodified_incremental_is_identical(tmp_path):
+    root = _parse(tmp_path)
+    out = tmp_path / "out.inp"
+    root.savetofile(str(out), incremental = True)
+    assert out.read_text() == MODEL
+
+def test_includes_are_not_written_by_default(tmp_path):
+    (tmp_path / "nodes.inp").write_text("*Node\n1, 0., 0., 0.\n")
+    root = _parse(tmp_path, "*Heading\n*Include, input=nodes.inp\n")
+    node = next(root.query("Include > Node"))
+    node.getcontent()[0] = "1, 9., 9., 9."
+    (tmp_path / "out").mkdir()
+    root.savetofile(str(tmp_path / "out" / "out.inp"), incremental = True)
+    assert (tmp_path / "nodes.inp").read_text() == "*Node\n1, 0., 0., 0.\n"
+    root.savetofile(str(tmp_path / "model.inp"), incremental = True, writeincludes = True)
+    assert "1, 9., 9., 9." in (tmp_path / "nodes.inp").read_text()
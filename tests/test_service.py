@@ -0,0 +1,100 @@
+import os
+import io
+import json
+from parser import parseinputfile
+from service import ModelPool, handle, serve
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 2., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*Elset, elset=E1
+1
+*Elset, elset=E2
+2
+*End Part
+*Include, input=material.inp
+"""
+
+MATERIAL = """*Material, name=STEEL
+*Density
+7.8e-09,
+"""
+
+def _write(tmp_path):
+    (tmp_path / "material.inp").write_text(MATERIAL)
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    return str(path)
+
+def _result(pool, **request):
+    response = handle(pool, dict(request, id = 7))
+    assert response["id"] == 7 and response["ok"], response
+    return response["result"]
+
+def test_load_and_query(tmp_path):
+    path, pool = _write(tmp_path), ModelPool()
+    assert _result(pool, op = "load", file = path)["blocks"] == len(list(parseinputfile(path).flatten()))
+    blocks = _result(pool, op = "query", file = path, query = "Part > Elset")
+    assert [b["header"] for b in blocks] == ["*Elset, elset=E1", "*Elset, elset=E2"]
+    assert (pool.hits, pool.misses) == (1, 1)
+
+def test_deletesets_leaves_pooled_tree(tmp_path):
+    path, pool = _write(tmp_path), ModelPool()
+    root = pool.get(path)
+    assert _result(pool, op = "deletesets", file = path, sets = ["Part > Elset[elset=E2]"]) == {"elements": 1, "nodes": 1}
+    output = str(tmp_path / "out.inp")
+    assert _result(pool, op = "deletesets", file = path, sets = ["Part > Elset[elset=E2]"], output = output) == {"output": output}
+    # the pooled tree and its files are unaltered
+    assert pool.get(path) is root
+    assert next(root.query("Part > Element")).toarray()[0].tolist() == [1, 2]
+    assert len(list(root.query("Part > Elset"))) == 2
+    assert (tmp_path / "model.inp").read_text() == MODEL
+    saved = parseinputfile(output)
+    assert next(saved.query("Part > Element")).toarray()[0].tolist() == [1]
+    assert [b.getheader().getproperty("elset") for b in saved.query("Part > Elset")] == ["E1"]
+
+def test_errors(tmp_path):
+    path, pool = _write(tmp_path), ModelPool()
+    for request in ({"op": "nope"}, {"op": "deletesets", "file": path, "sets": ["Part > Elset[elset=E3]"]},
+                    {"op": "load", "file": str(tmp_path / "missing.inp")}):
+        response = handle(pool, request)
+        assert not response["ok"] and response["error"]
+
+def test_evict_and_lru(tmp_path):
+    pool = ModelPool(maxsize = 1)
+    a = _write(tmp_path)
+    b = tmp_path / "other.inp"
+    b.write_text("*Heading\n")
+    pool.get(a)
+    pool.get(str(b))
+    assert pool.stats()["models"] == [os.path.realpath(str(b))]
+    assert _result(pool, op = "evict", file = str(b)) == {"evicted": 1}
+    assert _result(pool, op = "evict", file = str(b)) == {"evicted": 0}
+
+def test_reload_on_changed_include(tmp_path):
+    path, pool = _write(tmp_path), ModelPool()
+    root = pool.get(path)
+    assert pool.get(path) is root
+    # the model file itself is unaltered
+    material = tmp_path / "material.inp"
+    material.write_text(MATERIAL.replace("STEEL", "IRON"))
+    stat = os.stat(str(material))
+    os.utime(str(material), ns = (stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    reloaded = pool.get(path)
+    assert reloaded is not root and len(pool.stats()["models"]) == 1
+    assert [b.getheader().getproperty("name") for b in reloaded.query("Include > Material")] == ["IRON"]
+
+def test_serve(tmp_path):
+    path = _write(tmp_path)
+    fin = io.StringIO("\n".join(json.dumps(r) for r in ({"id": 1, "op": "load", "file": path}, {"id": 2, "op": "stats"},
+                                                         {"id": 3, "op": "shutdown"}, {"id": 4, "op": "stats"})) + "\nnot json\n")
+    fout = io.StringIO()
+    assert serve(ModelPool(), fin, fout)
+    responses = [json.loads(line) for line in fout.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == [1, 2, 3] and all(r["ok"] for r in responses)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from parser import parseinputfile
+from spatial import meshindex
+
+PART = """*Part, name={name}
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 2., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*End Part
+"""
+
+def _parse(tmp_path, text):
+    path = tmp_path / "model.inp"
+    path.write_text(text)
+    return parseinputfile(str(path))
+
+def test_select_in_part(tmp_path):
+    root = _parse(tmp_path, "*Heading\n" + PART.format(name = "A"))
+    index = meshindex(next(root.query("Part")))
+    assert index.nodesinbox((0.5, -1, -1), (3, 1, 1)).toarray().tolist() == [2, 3]
+    assert index.elementsinbox((1.2, -1, -1), (3, 1, 1)).toarray().tolist() == [2]
+    assert index.elementsinbox((0.5, -1, -1), (3, 1, 1), mode = "any").toarray().tolist() == [1, 2]
+    # a model with a single part can be indexed from its root
+    assert meshindex(root).nodesinsphere((0, 0, 0), 1.0).toarray().tolist() == [1, 2]
+
+def test_several_parts_raise(tmp_path):
+    root = _parse(tmp_path, "*Heading\n" + PART.format(name = "A") + PART.format(name = "B"))
+    with pytest.raises(ValueError):
+        meshindex(root)
+    assert meshindex(next(root.query("Part[name=B]"))).nodesinbox((1.5, -1, -1), (3, 1, 1)).toarray().tolist() == [3]
+
+def test_cache_follows_modifications(tmp_path):
+    root = _parse(tmp_path, "*Heading\n" + PART.format(name = "A"))
+    part = next(root.query("Part"))
+    index = meshindex(part)
+    assert meshindex(part) is index
+    node = next(part.query("Node"))
+    labels, coordinates = node.toarray()
+    node.setarrays(labels, coordinates + np.array([10., 0., 0.]))
+    assert meshindex(part) is not index
+    assert meshindex(part).nodesinbox((0, -1, -1), (3, 1, 1)).toarray().tolist() == []
+    # an in place edit of the lines
+    node.getcontent()[0] = "1, 0., 0., 0."
+    assert meshindex(part).nodesinbox((0, -1, -1), (3, 1, 1)).toarray().tolist() == [1]
@@ -0,0 +1,67 @@
+from parser import parseinputfile
+from validate import validate, MISSING_NODES, MISSING_MEMBERS, UNRESOLVED_ELSET, UNRESOLVED_MATERIAL, \
+                     UNRESOLVED_ORIENTATION, UNRESOLVED_INSTANCE
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+3, 2., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+2, 2, 3
+*Nset, nset=N1
+1, 3
+*Elset, elset=E1
+1, 2
+*Orientation, name=O1
+1., 0., 0., 0., 1., 0.
+** Section: Section-1
+*Solid Section, elset=E1, material=STEEL, orientation=O1
+,
+*End Part
+*Part, name=Q
+*Node
+1, 0., 0., 0.
+*End Part
+*Assembly, name=A
+*Instance, name=P-1, part=P
+*End Instance
+*Instance, name=Q-1, part=Q
+*End Instance
+*Nset, nset=AN, instance=P-1
+3
+*End Assembly
+*Material, name=steel
+"""
+
+def _parse(tmp_path, text = MODEL):
+    path = tmp_path / "model.inp"
+    path.write_text(text)
+    return parseinputfile(str(path))
+
+def _kinds(problems):
+    return sorted((p.kind, p.block.getid()) for p in problems)
+
+def test_valid_model(tmp_path):
+    assert validate(_parse(tmp_path)) == []
+
+def test_missing_labels(tmp_path):
+    text = (MODEL.replace("2, 2, 3\n", "2, 2, 3\n3, 3, 7\n4, 8, 7\n").replace("1, 3\n", "1, 3, 9\n")
+                 .replace("*Elset, elset=E1\n1, 2\n", "*Elset, elset=E1\n1, 2, 5\n").replace("nset=AN, instance=P-1\n3", "nset=AN, instance=Q-1\n3"))
+    problems = validate(_parse(tmp_path, text))
+    nodes = [p for p in problems if p.kind == MISSING_NODES]
+    assert len(nodes) == 1 and nodes[0].labels.tolist() == [7, 8] and nodes[0].count == 2
+    members = {p.block.getsetname(): p.labels.tolist() for p in problems if p.kind == MISSING_MEMBERS}
+    # labels are joined per part: node 3 is not in part Q
+    assert members == {"N1": [9], "E1": [5], "AN": [3]}
+
+def test_unresolved_names(tmp_path):
+    text = (MODEL.replace("elset=E1, material=STEEL, orientation=O1", "elset=E2, material=IRON, orientation=O2")
+                 .replace("instance=P-1", "instance=R-1"))
+    problems = validate(_parse(tmp_path, text))
+    assert sorted(p.kind for p in problems) == sorted([UNRESOLVED_ELSET, UNRESOLVED_MATERIAL,
+                                                       UNRESOLVED_ORIENTATION, UNRESOLVED_INSTANCE])
+    assert {p.kind: p.name for p in problems}[UNRESOLVED_MATERIAL] == "IRON"
+    assert all(str(p) for p in problems)
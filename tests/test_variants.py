@@ -0,0 +1,39 @@
+from parser import parseinputfile
+from variants import generatevariants
+
+MODEL = """*Heading
+*Include, input=params.inp
+*Include, input=mesh.inp
+*Step, name=Step-1
+*End Step
+"""
+PARAMS = "*Parameter\nE = 100.\n"
+MESH = "*Node\n1, 0., 0., 0.\n"
+
+def _base(tmp_path):
+    (tmp_path / "base").mkdir()
+    (tmp_path / "base" / "model.inp").write_text(MODEL)
+    (tmp_path / "base" / "params.inp").write_text(PARAMS)
+    (tmp_path / "base" / "mesh.inp").write_text(MESH)
+    return parseinputfile(str(tmp_path / "base" / "model.inp"))
+
+def _parameters(filepath):
+    root = parseinputfile(filepath)
+    return next(root.query("Include > Parameter")).getparameters()
+
+def test_variants_own_their_includes(tmp_path):
+    base = _base(tmp_path)
+    outdir = str(tmp_path / "out")
+    files = generatevariants(base, [{"$E": 1.0}, {"$E": 2.0}], outdir, processes = 0)
+    assert (tmp_path / "base" / "params.inp").read_text() == PARAMS
+    assert [_parameters(f)["E"] for f in files] == [1.0, 2.0]
+    for f in files:
+        # the unmodified include refers to the file of the base
+        assert next(parseinputfile(f).query("Include > Node")).toarray()[0].tolist() == [1]
+
+def test_variants_inline_includes(tmp_path):
+    base = _base(tmp_path)
+    files = generatevariants(base, [{"$E": 3.0}], str(tmp_path / "out"), processes = 0, inlineincludes = True)
+    text = open(files[0]).read()
+    assert "E = 3.0" in text and "1, 0., 0., 0." in text
+    assert (tmp_path / "base" / "params.inp").read_text() == PARAMS
@@ -0,0 +1,48 @@
+import io
+import numpy as np
+from parser import parseinputfile, formatlabels, iterformatlabels, formatrows, iterformatrows
+
+MODEL = """*Heading
+*Part, name=P
+*Node
+1, 0., 0., 0.
+2, 1., 0., 0.
+*Element, type=T3D2
+1, 1, 2
+*Nset, nset=A
+1, 2
+*End Part
+"""
+
+def test_chunks_join_to_lines():
+    labels = np.arange(1, 100)
+    for span, chunk in ((16, 1), (16, 2), (7, 3), (16, 4096)):
+        assert "\n".join(iterformatlabels(labels, span, chunk)).split("\n") == formatlabels(labels, span)
+    values = np.arange(2 * 99).reshape(99, 2)
+    assert "\n".join(iterformatrows(labels, values, chunk = 10)).split("\n") == formatrows(labels, values)
+    assert list(iterformatlabels([])) == [] and list(iterformatrows([], [])) == []
+
+def test_writeto_array_backed_block(tmp_path):
+    path = tmp_path / "model.inp"
+    path.write_text(MODEL)
+    root = parseinputfile(str(path))
+    nset = next(root.query("Part > Nset"))
+    nset.setlabels(np.arange(1, 40))
+    out = io.StringIO()
+    nset.writeto(out)
+    assert out.getvalue() == repr(nset) + "\n"
+    assert out.getvalue().splitlines()[1:] == formatlabels(np.arange(1, 40))
+
+def test_savetofile_paths(tmp_path):
+    (tmp_path / "model").mkdir()
+    (tmp_path / "model" / "nodes.inp").write_text("*Node\n1, 0., 0., 0.\n2, 1., 0., 0.\n")
+    path = tmp_path / "model" / "model.inp"
+    path.write_text(MODEL.replace("*Node\n1, 0., 0., 0.\n2, 1., 0., 0.\n", "*Include, input=nodes.inp\n"))
+    root = parseinputfile(str(path))
+    assert next(root.query("Part > Include > Node")).toarray()[0].tolist() == [1, 2]
+    # a path with a directory
+    root.savetofile(str(tmp_path / "out.inp"))
+    assert (tmp_path / "out.inp").read_text() == path.read_text()
+    # a bare file name is placed in the directory of the model
+    root.savetofile("copy")
+    assert (tmp_path / "model" / "copy.inp").read_text() == path.read_text()
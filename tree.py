@@ -0,0 +1,75 @@
+"""
+    Helpers shared by the modules working on parsed trees: walking the blocks,
+    the part a block belongs to and (case insensitive) names of header properties.
+"""
+
+try:
+    from .parser import BlockReaderPart, BlockReaderAssembly, ParameterizedLine
+except ImportError:
+    from parser import BlockReaderPart, BlockReaderAssembly, ParameterizedLine
+
+def iterblocks(root):
+    """
+        All blocks below root (depth first, parents before their children), the children
+        of unmodified blocks are found without a scan of their lines
+    """
+    stack = list(reversed(root._currentchildren()))
+    while (stack):
+        block = stack.pop()
+        yield block
+        stack.extend(reversed(block._currentchildren()))
+
+def scopeblock(block):
+    """
+        The part (or assembly) the labels of a block belong to, None for the model level
+    """
+    for p in block.upstreamhierarchy():
+        if isinstance(p, (BlockReaderPart, BlockReaderAssembly)):
+            return p
+    return None
+
+def scopeof(block):
+    """
+        Name of the part (or assembly) the labels of a block belong to, "" for the model level
+    """
+    p = scopeblock(block)
+    if (p is None):
+        return ""
+    name = headerproperty(p, "name")
+    return p.getname() if name is None else name
+
+def namekey(name):
+    """
+        Key to compare names by, names are case insensitive
+    """
+    return str(name).upper()
+
+def headerproperty(block, key):
+    """
+        Value of a header property of a block, None if the block has no such property
+    """
+    header = block.getheader()
+    return header.getproperty(key) if header is not None and key in header.properties else None
+
+def instanceparts(assemblies):
+    """
+        {instance name: part name} (as namekey) from the *Instance lines of assemblies
+    """
+    instances = {}
+    for assembly in assemblies:
+        for line in assembly.content:
+            if (isinstance(line, str) and line.lstrip(" *").lower().startswith("instance")):
+                header = ParameterizedLine.fromheader(line)
+                if ("name" in header.properties and "part" in header.properties):
+                    instances[namekey(header.getproperty("name"))] = namekey(header.getproperty("part"))
+    return instances
+
+def labelscope(block, instances):
+    """
+        Part (as namekey) the labels of a block refer to: the part of its instance= property 
+        (None if not in instances, see instanceparts), else the part it belongs to
+    """
+    instance = headerproperty(block, "instance")
+    if (instance is not None):
+        return instances.get(namekey(instance), None)
+    return namekey(scopeof(block))
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from .parser import BlockReaderNode, BlockReaderElement, BlockReaderNset, BlockReaderElset, \
+                        BlockReaderMaterial, BlockReaderOrientation, BlockReaderAssembly, SectionChildBase
+    from .tree import iterblocks, scopeof, namekey, headerproperty, instanceparts, labelscope
+    from .metrics import METRICS
+except ImportError:
+    from parser import BlockReaderNode, BlockReaderElement, BlockReaderNset, BlockReaderElset, \
+                       BlockReaderMaterial, BlockReaderOrientation, BlockReaderAssembly, SectionChildBase
+    from tree import iterblocks, scopeof, namekey, headerproperty, instanceparts, labelscope
+    from metrics import METRICS
+
+MISSING_NODES = "missing nodes"             # element connectivity references undefined nodes
+MISSING_MEMBERS = "missing members"         # nset/elset members are not defined
+UNRESOLVED_ELSET = "unresolved elset"       # section elset= does not resolve
+UNRESOLVED_MATERIAL = "unresolved material"
+UNRESOLVED_ORIENTATION = "unresolved orientation"
+UNRESOLVED_INSTANCE = "unresolved instance" # set instance= does not resolve
+
+class Problem(object):
+    """
+        A dangling reference of a block: the kind (e.g. MISSING_NODES), the block
+        and the undefined labels or name
+    """
+    __slots__ = ("kind", "block", "labels", "name", "count")
+
+    def __init__(self, kind, block, labels = None, name = None, count = None):
+        self.kind = kind
+        self.block = block
+        self.labels = labels    # undefined labels (sorted, unique)
+        self.name = name        # unresolved name
+        self.count = count      # amount of referencing rows (e.g. elements), if not len(labels)
+
+    def __str__(self):
+        if (self.labels is not None):
+            detail = "{:d} labels{:s}: {:s}{:s}".format(len(self.labels),
+                        "" if self.count is None else " in {:d} elements".format(self.count),
+                        ", ".join(map(str, self.labels[:10].tolist())), ", ..." if len(self.labels) > 10 else "")
+        else:
+            detail = str(self.name)
+        return "{:s} [{:s}] line {!s}: {:s}".format(self.kind, self.block.getid(), self.block.getstartlinenumber(), detail)
+
+    def __repr__(self):
+        return self.__str__()
+
+def _sortedlabels(arrays):
+    labels = np.concatenate(arrays) if arrays else np.empty(0, dtype = np.int64)
+    labels.sort(kind = "stable")
+    return labels
+
+def _membership(labels):
+    """
+        Function testing whether values are in labels (sorted): a lookup table over the 
+        range of the labels when they are dense enough (as labels usually are), else a 
+        join by binary search
+    """
+    if (len(labels) == 0):
+        return lambda values: np.zeros(values.shape, dtype = bool)
+    first, last = int(labels[0]), int(labels[-1])
+    if (last - first < 8 * len(labels) + (1 << 20)):
+        table = np.zeros(last - first + 2, dtype = bool)
+        table[labels - first] = True
+        def _lookup(values):
+            # out of range values look up the last (False) entry
+            i = values - first
+            i[(i < 0) | (i > last - first)] = last - first + 1
+            return table[i]
+        return _lookup
+    def _join(values):
+        i = np.searchsorted(labels, values)
+        np.minimum(i, len(labels) - 1, out = i)
+        return labels[i] == values
+    return _join
+
+def _unique(values):
+    values = np.sort(values, axis = None)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+@METRICS.timed()
+def validate(root):
+    """
+    Find dangling references in a tree in a single pass: element nodes missing from
+    the Node blocks, Nset/Elset members missing from the Node/Element blocks, and section
+    elset=, material= and orientation= names which do not resolve.
+
+    Labels are joined per part (labels are only unique within a part) on sorted arrays,
+    names are resolved through an index (case insensitive) instead of a query per reference.
+    Sets with an instance= property are checked against the part of the instance.
+
+    e.g.
+        for problem in validate(root):
+            print(problem)
+
+    Parameters
+    ----------
+    root : INode
+
+    Returns
+    -------
+    list of Problem
+    """
+    nodes, elements, sets, sections, assemblies = OrderedDict(), OrderedDict(), [], [], []
+    elsetnames, materialnames, orientationnames = set(), set(), set()
+    for block in iterblocks(root):
+        if (isinstance(block, BlockReaderNode)):
+            nodes.setdefault(namekey(scopeof(block)), []).append(block)
+        elif (isinstance(block, BlockReaderElement)):
+            elements.setdefault(namekey(scopeof(block)), []).append(block)
+        elif (isinstance(block, (BlockReaderNset, BlockReaderElset))):
+            sets.append(block)
+            if (isinstance(block, BlockReaderElset)):
+                elsetnames.add((namekey(scopeof(block)), namekey(block.getsetname())))
+        elif (isinstance(block, SectionChildBase)):
+            sections.append(block)
+        elif (isinstance(block, BlockReaderMaterial)):
+            materialnames.add(namekey(headerproperty(block, "name")))
+        elif (isinstance(block, BlockReaderOrientation)):
+            orientationnames.add((namekey(scopeof(block)), namekey(headerproperty(block, "name"))))
+        elif (isinstance(block, BlockReaderAssembly)):
+            assemblies.append(block)
+
+    problems = []
+    # membership tests per part, built once
+    empty = _membership(np.empty(0, dtype = np.int64))
+    innodes = {scope: _membership(_sortedlabels([b.getlabels() for b in blocks])) for scope, blocks in nodes.items()}
+    inelements = {scope: _membership(_sortedlabels([b.getlabels() for b in blocks])) for scope, blocks in elements.items()}
+
+    for scope, blocks in elements.items():
+        for block in blocks:
+            labels, connectivity = block.toarray()
+            found = innodes.get(scope, empty)(connectivity)
+            if (not found.all()):
+                rows = ~found.all(axis = 1)
+                problems.append(Problem(MISSING_NODES, block, labels = _unique(connectivity[~found]), count = int(rows.sum())))
+
+    instances = instanceparts(assemblies) if assemblies else {}
+    for block in sets:
+        scope = labelscope(block, instances)
+        if (scope is None):
+            problems.append(Problem(UNRESOLVED_INSTANCE, block, name = headerproperty(block, "instance")))
+            continue
+        labels = block.toarray()
+        missing = _unique(labels[~(innodes if isinstance(block, BlockReaderNset) else inelements).get(scope, empty)(labels)])
+        if (len(missing) > 0):
+            problems.append(Problem(MISSING_MEMBERS, block, labels = missing))
+
+    for block in sections:
+        scope = namekey(scopeof(block))
+        for key, kind, resolves in [("elset", UNRESOLVED_ELSET, lambda name: (scope, name) in elsetnames),
+                                    ("material", UNRESOLVED_MATERIAL, lambda name: name in materialnames),
+                                    ("orientation", UNRESOLVED_ORIENTATION, lambda name: (scope, name) in orientationnames)]:
+            name = headerproperty(block, key)
+            if (name is not None and not resolves(namekey(name))):
+                problems.append(Problem(kind, block, name = name))
+    return problems
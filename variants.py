@@ -0,0 +1,258 @@
+import os
+import types
+import pickle
+import tempfile
+import multiprocessing
+
+try:
+    from . import parser as _parser
+    from .parser import BlockReaderBase, BlockReaderParameter, IncludeReader
+    from .tree import iterblocks
+except ImportError:
+    import parser as _parser
+    from parser import BlockReaderBase, BlockReaderParameter, IncludeReader
+    from tree import iterblocks
+
+PARAMETER_PREFIX = "$"      # "$name": value of a *Parameter definition
+PROPERTY_SEPARATOR = "@"    # "query@property": header property of the queried blocks
+
+def applyoverrides(root, overrides):
+    """
+    Apply parameter and header property overrides to a tree (in place)
+
+    e.g.
+        applyoverrides(root, {
+            "$E": 210000.,                              # E = 210000. in a *Parameter block
+            "Step[name=Step-1]@nlgeom": "YES",          # *Step, name=Step-1, nlgeom=YES
+            "Part > Elset[elset=E1]@internal": None,    # *Elset, elset=E1, internal
+        })
+
+    Parameters
+    ----------
+    root : INode
+        tree to alter.
+    overrides : dict
+        {key: value}, keys are "$name" for *Parameter values or "query@property"
+        for the header property of all blocks matching the query (see INode.query).
+        NaN values are skipped (e.g. empty cells of a DataFrame).
+
+    Raises
+    ------
+    KeyError
+        if a parameter is not defined or a query matches no block.
+    ValueError
+        if a key is neither a parameter nor a query@property.
+
+    Returns
+    -------
+    root : INode
+    """
+    parameters = None
+    for key, value in overrides.items():
+        if (isinstance(value, float) and value != value):
+            continue
+        if (hasattr(value, "item")):
+            # numpy scalar
+            value = value.item()
+        if (key.startswith(PARAMETER_PREFIX)):
+            name = key[len(PARAMETER_PREFIX):]
+            if (parameters is None):
+                parameters = [b for b in root.flatten() if isinstance(b, BlockReaderParameter)]
+            blocks = [b for b in parameters if name in b.getparameters()]
+            if (not blocks):
+                raise KeyError("Parameter {:s} is not defined".format(name))
+            for b in blocks:
+                b.setparameter(name, value)
+        elif (PROPERTY_SEPARATOR in key):
+            query, prop = key.rsplit(PROPERTY_SEPARATOR, 1)
+            blocks = [b for b in root.query(query.strip()) if b.getheader() is not None]
+            if (not blocks):
+                raise KeyError("Query {:s} matches no block".format(query))
+            for b in blocks:
+                b.getheader().setproperty(prop.strip(), value)
+        else:
+            raise ValueError("Override {:s} is neither {:s}parameter nor query{:s}property".format(
+                                key, PARAMETER_PREFIX, PROPERTY_SEPARATOR))
+    return root
+
+#--------------------------------------------------------------
+#
+# Serialized tree (for workers which cannot fork)
+#
+#--------------------------------------------------------------
+
+def _resolvers():
+    """
+        The resolver functions of the parser (which are closures, that cannot be pickled),
+        in a fixed order: found from the default resolver through the closures and reader prototypes
+    """
+    found = []
+    queue = [_parser.DEFAULT_RESOLVER, _parser.getdefaultresolver()]
+    while (queue):
+        item = queue.pop(0)
+        if (isinstance(item, types.FunctionType)):
+            if (any(item is f for f in found)):
+                continue
+            found.append(item)
+            queue += [cell.cell_contents for cell in (item.__closure__ or ())]
+        elif (isinstance(item, (list, tuple))):
+            queue += list(item)
+        elif (isinstance(item, BlockReaderBase) and item.childreaderresolver is not None):
+            queue.append(item.childreaderresolver)
+    return found
+
+class _TreePickler(pickle.Pickler):
+    def __init__(self, file, resolvers):
+        super().__init__(file, protocol = pickle.HIGHEST_PROTOCOL)
+        self._resolverids = {id(f): i for i, f in enumerate(resolvers)}
+
+    def persistent_id(self, obj):
+        if (isinstance(obj, types.FunctionType)):
+            return self._resolverids.get(id(obj), None)
+        return None
+
+class _TreeUnpickler(pickle.Unpickler):
+    def __init__(self, file, resolvers):
+        super().__init__(file)
+        self._resolvers = resolvers
+
+    def persistent_load(self, pid):
+        return self._resolvers[pid]
+
+def dumptree(root, filepath):
+    """
+    Serialize a parsed tree to a file (see loadtree), e.g. to share it with other processes
+    """
+    with open(filepath, "wb") as fout:
+        _TreePickler(fout, _resolvers()).dump(root)
+
+def loadtree(filepath):
+    """
+    Load a tree serialized by dumptree
+    """
+    with open(filepath, "rb") as fin:
+        return _TreeUnpickler(fin, _resolvers()).load()
+
+#--------------------------------------------------------------
+#
+# Variants
+#
+#--------------------------------------------------------------
+
+_BASE = None    # base tree of a worker process
+
+def _setbase(base = None, filepath = None):
+    global _BASE
+    _BASE = base if filepath is None else loadtree(filepath)
+
+def _ownincludes(variant, outfile, inline = False):
+    """
+        Make the includes of a variant independent of the base model: modified includes are 
+        relocated next to the variant (e.g. variant_0000.params.inp), the other Include lines 
+        refer to the files of the base relative to the variant. The files of the base are never written.
+    """
+    outdir = os.path.dirname(outfile)
+    stem = os.path.splitext(os.path.basename(outfile))[0]
+    names = set()
+    # an include containing a relocated include is modified as well: the contained includes first
+    for include in reversed([b for b in iterblocks(variant) if isinstance(b, IncludeReader) and not b.inline]):
+        if (inline):
+            include.setinline(True)
+        elif (include.iscontentmodified()):
+            name = "{:s}.{:s}".format(stem, os.path.basename(include._originfile))
+            while (name in names):
+                name = "{:s}.{:d}.{:s}".format(stem, len(names), os.path.basename(include._originfile))
+            names.add(name)
+            include.relocate(os.path.join(outdir, name), name)
+        else:
+            try:
+                path = os.path.relpath(include._originfile, outdir)
+            except ValueError:
+                # e.g. on another drive
+                path = include._originfile
+            if (path != include.getheader().getproperty("input")):
+                include.getheader().setproperty("input", path)
+    return variant
+
+def _writevariant(task):
+    outfile, overrides, incremental, inline = task
+    variant = _ownincludes(applyoverrides(_BASE.clone(), overrides), outfile, inline)
+    variant.savetofile(outfile, incremental = incremental, writeincludes = True)
+    return outfile
+
+def generatevariants(base, overrides, outdir, namefmt = "variant_{:04d}.inp", processes = None,
+                     method = None, incremental = True, inlineincludes = False):
+    """
+    Write a variant of a base model for every row of a table of overrides, in parallel processes.
+
+    The base is parsed once: forked workers share it copy-on-write, else (method "spawn")
+    it is serialized once and loaded once per worker. Every variant is a clone of the base
+    (see INode.clone) with the overrides applied (see applyoverrides), saved incrementally.
+    
+    The files of the base model are never written: includes altered by the overrides are 
+    written per variant next to it (e.g. variant_0000.params.inp) and the Include lines 
+    of the others refer to the files of the base relative to the output directory.
+
+    e.g.
+        base = parseinputfile("model.inp")
+        generatevariants(base, [{"$E": e, "Step[name=Step-1]@nlgeom": "YES"} for e in moduli], "out")
+
+    Parameters
+    ----------
+    base : RootReader
+        parsed base model.
+    overrides : list of dict or pandas.DataFrame
+        overrides per variant (see applyoverrides), a DataFrame has a column per key.
+    outdir : string
+        output directory, created if it does not exist.
+    namefmt : string, optional
+        file name of the variants, formatted with the index of the row. The default is "variant_{:04d}.inp".
+    processes : int, optional
+        amount of worker processes, 0 writes in this process. The default is None (cpu count).
+    method : string, optional
+        "fork" or "spawn". The default is None (fork where available).
+    incremental : boolean, optional
+        see RootReader.savetofile. The default is True.
+    inlineincludes : boolean, optional
+        write the content of all includes into the variants instead (see IncludeReader.setinline). 
+        The default is False.
+
+    Returns
+    -------
+    list of string
+        the written files, in order of the rows.
+    """
+    if (hasattr(overrides, "to_dict")):
+        overrides = overrides.to_dict("records")
+    os.makedirs(outdir, exist_ok = True)
+    tasks = [(os.path.abspath(os.path.join(outdir, namefmt.format(i))), dict(row), incremental, inlineincludes)
+             for i, row in enumerate(overrides)]
+    if (processes == 0 or len(tasks) <= 1):
+        _setbase(base)
+        try:
+            return [_writevariant(t) for t in tasks]
+        finally:
+            _setbase(None)
+
+    if (method is None):
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(method)
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    chunksize = max(1, len(tasks) // (4 * processes))
+    if (method == "fork"):
+        # workers inherit the parsed base (copy-on-write)
+        _setbase(base)
+        try:
+            with context.Pool(processes) as pool:
+                return pool.map(_writevariant, tasks, chunksize = chunksize)
+        finally:
+            _setbase(None)
+
+    fd, cachefile = tempfile.mkstemp(suffix = ".pickle")
+    os.close(fd)
+    try:
+        dumptree(base, cachefile)
+        with context.Pool(processes, initializer = _setbase, initargs = (None, cachefile)) as pool:
+            return pool.map(_writevariant, tasks, chunksize = chunksize)
+    finally:
+        os.remove(cachefile)